@@ -3,6 +3,8 @@ import logging
 import os
 import shutil
 import base64
+import threading
+import time
 import redis
 
 from datetime import datetime
@@ -212,9 +214,18 @@ class PersistentConfig(Generic[T]):
 
 
 class AppConfig:
+    """
+    Config values are served from memory. With Redis, every change is stored
+    under its key, counted in a version key and published on a channel; a
+    listener thread applies the published values and, when it detects a
+    missed version, marks all keys to be read from Redis again on next access.
+    """
+
     _state: dict[str, PersistentConfig]
     _redis: Optional[redis.Redis] = None
     _redis_key_prefix: str
+    _synced_keys: set
+    _version: int
 
     def __init__(
         self,
@@ -224,45 +235,118 @@ class AppConfig:
     ):
         super().__setattr__("_state", {})
         super().__setattr__("_redis_key_prefix", redis_key_prefix)
+        super().__setattr__("_synced_keys", set())
+        super().__setattr__("_version", 0)
         if redis_url:
             super().__setattr__(
                 "_redis",
                 get_redis_connection(redis_url, redis_sentinels, decode_responses=True),
             )
 
+            threading.Thread(
+                target=self._listen, name="config-listener", daemon=True
+            ).start()
+
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
             self._state[key] = value
+            self._synced_keys.discard(key)
         else:
             self._state[key].value = value
             self._state[key].save()
 
             if self._redis:
                 redis_key = f"{self._redis_key_prefix}:config:{key}"
-                self._redis.set(redis_key, json.dumps(self._state[key].value))
+                encoded_value = json.dumps(self._state[key].value)
+
+                pipe = self._redis.pipeline()
+                pipe.set(redis_key, encoded_value)
+                pipe.incr(f"{self._redis_key_prefix}:config:_version")
+                _, version = pipe.execute()
+
+                self._redis.publish(
+                    f"{self._redis_key_prefix}:config:_channel",
+                    json.dumps({"key": key, "value": encoded_value, "version": version}),
+                )
 
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available, check for an updated value
-        if self._redis:
+        # Read the value from Redis once, later changes are pushed by _listen
+        if self._redis and key not in self._synced_keys:
             redis_key = f"{self._redis_key_prefix}:config:{key}"
-            redis_value = self._redis.get(redis_key)
-
-            if redis_value is not None:
-                try:
-                    decoded_value = json.loads(redis_value)
+            try:
+                self._update(key, self._redis.get(redis_key))
+                self._synced_keys.add(key)
+            except redis.exceptions.RedisError as e:
+                log.error(f"Error reading {key} from Redis: {e}")
 
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
+        return self._state[key].value
 
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+    def _update(self, key: str, redis_value: Optional[str]):
+        if redis_value is None or key not in self._state:
+            return
 
-        return self._state[key].value
+        try:
+            decoded_value = json.loads(redis_value)
+
+            # Update the in-memory value if different
+            if self._state[key].value != decoded_value:
+                self._state[key].value = decoded_value
+                log.info(f"Updated {key} from Redis: {decoded_value}")
+
+        except json.JSONDecodeError:
+            log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+
+    def _sync_version(self, version: int):
+        if version != self._version + 1:
+            # Missed (or duplicate) updates, re-read every key on next access
+            log.debug(f"Config version {version}, expected {self._version + 1}")
+            self._synced_keys.clear()
+        super().__setattr__("_version", version)
+
+    def _listen(self):
+        channel = f"{self._redis_key_prefix}:config:_channel"
+        version_key = f"{self._redis_key_prefix}:config:_version"
+
+        pubsub = None
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+
+                # Anything published while not subscribed is lost, so resync
+                self._synced_keys.clear()
+                super().__setattr__("_version", int(self._redis.get(version_key) or 0))
+
+                checked_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        data = json.loads(message["data"])
+                        if data["version"] > self._version:
+                            self._sync_version(data["version"])
+                            self._update(data["key"], data["value"])
+                            self._synced_keys.add(data["key"])
+
+                    # Published messages are not guaranteed to arrive
+                    if time.monotonic() - checked_at > 30:
+                        checked_at = time.monotonic()
+                        version = int(self._redis.get(version_key) or 0)
+                        if version != self._version:
+                            # Messages of the versions seen here are ignored as
+                            # not newer if they arrive later, so re-read every key
+                            self._synced_keys.clear()
+                            super().__setattr__("_version", version)
+            except Exception as e:
+                log.warning(f"Config listener error, reconnecting: {e}")
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                time.sleep(1)
 
 
 ####################################
@@ -1097,14 +1181,17 @@ USER_PERMISSIONS_WORKSPACE_MODELS_ACCESS = (
 )
 
 # Soren Memories - Variable dinámica para memorias del sistema
-from open_webui.utils.soren_memories import get_soren_memories_cached
-
 def get_soren_memories():
     """Obtiene todas las memorias formateadas para usar en prompts"""
+    from open_webui.utils.soren_memories import get_soren_memories_cached
+
     return get_soren_memories_cached()
 
-# Variable global accesible
-SOREN_MEMORIES = get_soren_memories()
+# Variable global accesible, se lee en el primer uso y no al importar config
+def __getattr__(name):
+    if name == "SOREN_MEMORIES":
+        return get_soren_memories()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 USER_PERMISSIONS_WORKSPACE_KNOWLEDGE_ACCESS = (
     os.environ.get("USER_PERMISSIONS_WORKSPACE_KNOWLEDGE_ACCESS", "False").lower()
@@ -1953,6 +2040,22 @@ else:
     except Exception:
         PGVECTOR_POOL_RECYCLE = 3600
 
+# Rows written per transaction by pgvector inserts and upserts
+PGVECTOR_INSERT_BATCH_SIZE = os.environ.get("PGVECTOR_INSERT_BATCH_SIZE", 1000)
+
+try:
+    PGVECTOR_INSERT_BATCH_SIZE = max(int(PGVECTOR_INSERT_BATCH_SIZE), 1)
+except Exception:
+    PGVECTOR_INSERT_BATCH_SIZE = 1000
+
+# Write through COPY into a staging table (psycopg2 only)
+PGVECTOR_USE_COPY = os.environ.get("PGVECTOR_USE_COPY", "true").lower() == "true"
+
+# Index method of the vector column: "ivfflat" or "hnsw"
+PGVECTOR_INDEX_METHOD = os.environ.get("PGVECTOR_INDEX_METHOD", "ivfflat").lower()
+if PGVECTOR_INDEX_METHOD not in ("ivfflat", "hnsw"):
+    PGVECTOR_INDEX_METHOD = "ivfflat"
+
 # Pinecone
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY", None)
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", None)
@@ -2191,6 +2294,69 @@ RAG_HYBRID_BM25_WEIGHT = PersistentConfig(
     float(os.environ.get("RAG_HYBRID_BM25_WEIGHT", "0.5")),
 )
 
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{CACHE_DIR}/bm25")
+
+try:
+    RAG_BM25_INDEX_CACHE_SIZE = int(os.environ.get("RAG_BM25_INDEX_CACHE_SIZE", "16"))
+except ValueError:
+    RAG_BM25_INDEX_CACHE_SIZE = 16
+
+# Hybrid search only uses keyword indexes built while ingesting, collections
+# without one are searched by vector only instead of fetched whole to build it
+ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE = (
+    os.environ.get("ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE", "False").lower() == "true"
+)
+
+RAG_REINDEX_DIR = os.environ.get("RAG_REINDEX_DIR", f"{CACHE_DIR}/reindex")
+
+try:
+    RAG_REINDEX_WORKERS = int(os.environ.get("RAG_REINDEX_WORKERS", "4"))
+except ValueError:
+    RAG_REINDEX_WORKERS = 4
+
+# Number of chunks, possibly of several files, embedded together
+try:
+    RAG_REINDEX_BATCH_SIZE = int(os.environ.get("RAG_REINDEX_BATCH_SIZE", "512"))
+except ValueError:
+    RAG_REINDEX_BATCH_SIZE = 512
+
+# Process uploads and knowledge base adds in background workers instead of
+# the request. INGESTION_WORKERS can be 0 on API nodes when dedicated worker
+# nodes run `python -m open_webui.retrieval.ingestion`
+ENABLE_INGESTION_QUEUE = (
+    os.environ.get("ENABLE_INGESTION_QUEUE", "False").lower() == "true"
+)
+
+try:
+    INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", "2"))
+except ValueError:
+    INGESTION_WORKERS = 2
+
+# Lanes the workers of this process take jobs from, in order of priority
+INGESTION_LANES = [
+    lane.strip()
+    for lane in os.environ.get("INGESTION_LANES", "interactive,bulk").split(",")
+    if lane.strip()
+]
+
+try:
+    INGESTION_MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", "3"))
+except ValueError:
+    INGESTION_MAX_ATTEMPTS = 3
+
+# Seconds without a heartbeat after which a job is taken over by another worker
+try:
+    INGESTION_JOB_TIMEOUT = int(os.environ.get("INGESTION_JOB_TIMEOUT", "300"))
+except ValueError:
+    INGESTION_JOB_TIMEOUT = 300
+
+# Number of chunks of a file that are embedded and inserted at once, bounds
+# the memory used to ingest large files
+try:
+    RAG_INGESTION_BATCH_SIZE = int(os.environ.get("RAG_INGESTION_BATCH_SIZE", "256"))
+except ValueError:
+    RAG_INGESTION_BATCH_SIZE = 256
+
 ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     "ENABLE_RAG_HYBRID_SEARCH",
     "rag.enable_hybrid_search",
@@ -2299,6 +2465,54 @@ RAG_EMBEDDING_PREFIX_FIELD_NAME = os.environ.get(
     "RAG_EMBEDDING_PREFIX_FIELD_NAME", None
 )
 
+# Number of batches sent to a remote embedding engine at the same time
+try:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = int(
+        os.environ.get("RAG_EMBEDDING_CONCURRENT_REQUESTS", "4")
+    )
+except ValueError:
+    RAG_EMBEDDING_CONCURRENT_REQUESTS = 4
+
+# Estimated number of tokens per batch, 0 to only limit the number of texts
+try:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = int(
+        os.environ.get("RAG_EMBEDDING_BATCH_MAX_TOKENS", "100000")
+    )
+except ValueError:
+    RAG_EMBEDDING_BATCH_MAX_TOKENS = 100000
+
+try:
+    RAG_EMBEDDING_MAX_RETRIES = int(os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "5"))
+except ValueError:
+    RAG_EMBEDDING_MAX_RETRIES = 5
+
+ENABLE_RAG_EMBEDDING_CACHE = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE", "True").lower() == "true"
+)
+
+RAG_EMBEDDING_CACHE_DIR = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DIR", f"{CACHE_DIR}/embedding_cache"
+)
+
+# Number of embeddings kept in memory, and on disk
+try:
+    RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+except ValueError:
+    RAG_EMBEDDING_CACHE_SIZE = 10000
+
+try:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = int(
+        os.environ.get("RAG_EMBEDDING_CACHE_DISK_SIZE", "1000000")
+    )
+except ValueError:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = 1000000
+
+# Number of reranker scores kept in memory, 0 disables the cache
+try:
+    RAG_RERANKING_CACHE_SIZE = int(os.environ.get("RAG_RERANKING_CACHE_SIZE", "10000"))
+except ValueError:
+    RAG_RERANKING_CACHE_SIZE = 10000
+
 RAG_RERANKING_ENGINE = PersistentConfig(
     "RAG_RERANKING_ENGINE",
     "rag.reranking_engine",
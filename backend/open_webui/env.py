@@ -353,6 +353,35 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Realtime chat saves are buffered and written at most once per interval (in
+# seconds), or earlier once the content grew by the given number of characters
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1")
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+except ValueError:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_BUFFER_SIZE = os.environ.get(
+    "REALTIME_CHAT_SAVE_BUFFER_SIZE", "4096"
+)
+try:
+    REALTIME_CHAT_SAVE_BUFFER_SIZE = int(REALTIME_CHAT_SAVE_BUFFER_SIZE)
+except ValueError:
+    REALTIME_CHAT_SAVE_BUFFER_SIZE = 4096
+
+# Streamed content of a message is emitted to the client at most once per
+# interval (in seconds), 0 emits every delta
+CHAT_EVENT_EMIT_INTERVAL = os.environ.get("CHAT_EVENT_EMIT_INTERVAL", "0.04")
+try:
+    CHAT_EVENT_EMIT_INTERVAL = float(CHAT_EVENT_EMIT_INTERVAL)
+except ValueError:
+    CHAT_EVENT_EMIT_INTERVAL = 0.04
+
+# Emit only the text appended since the last event instead of the full content
+ENABLE_CHAT_EVENT_EMIT_DELTA = (
+    os.environ.get("ENABLE_CHAT_EVENT_EMIT_DELTA", "False").lower() == "true"
+)
+
 ####################################
 # REDIS
 ####################################
@@ -485,6 +514,40 @@ else:
         MODELS_CACHE_TTL = 1
 
 
+####################################
+# GROUPS
+####################################
+
+# Seconds a user's group memberships are cached across requests, 0 disables
+group_membership_cache_ttl = os.environ.get("GROUP_MEMBERSHIP_CACHE_TTL", "1")
+
+try:
+    GROUP_MEMBERSHIP_CACHE_TTL = float(group_membership_cache_ttl)
+except ValueError:
+    GROUP_MEMBERSHIP_CACHE_TTL = 1.0
+
+
+####################################
+# USERS
+####################################
+
+# Seconds an authenticated user is cached, 0 disables
+user_cache_ttl = os.environ.get("USER_CACHE_TTL", "60")
+
+try:
+    USER_CACHE_TTL = float(user_cache_ttl)
+except ValueError:
+    USER_CACHE_TTL = 60.0
+
+# Minimum seconds between two last_active_at writes of a user
+user_last_active_interval = os.environ.get("USER_LAST_ACTIVE_INTERVAL", "60")
+
+try:
+    USER_LAST_ACTIVE_INTERVAL = float(user_last_active_interval)
+except ValueError:
+    USER_LAST_ACTIVE_INTERVAL = 60.0
+
+
 ####################################
 # WEBSOCKET SUPPORT
 ####################################
@@ -505,10 +568,33 @@ try:
 except ValueError:
     WEBSOCKET_REDIS_LOCK_TIMEOUT = 60
 
+websocket_user_pool_cache_ttl = os.environ.get("WEBSOCKET_USER_POOL_CACHE_TTL", "1")
+
+try:
+    WEBSOCKET_USER_POOL_CACHE_TTL = float(websocket_user_pool_cache_ttl)
+except ValueError:
+    WEBSOCKET_USER_POOL_CACHE_TTL = 1.0
+
 WEBSOCKET_SENTINEL_HOSTS = os.environ.get("WEBSOCKET_SENTINEL_HOSTS", "")
 
 WEBSOCKET_SENTINEL_PORT = os.environ.get("WEBSOCKET_SENTINEL_PORT", "26379")
 
+# Updates of a collaborative document kept before they are merged into its
+# snapshot, and how often (seconds) all documents are compacted
+ydoc_compaction_threshold = os.environ.get("YDOC_COMPACTION_THRESHOLD", "500")
+
+try:
+    YDOC_COMPACTION_THRESHOLD = int(ydoc_compaction_threshold)
+except ValueError:
+    YDOC_COMPACTION_THRESHOLD = 500
+
+ydoc_compaction_interval = os.environ.get("YDOC_COMPACTION_INTERVAL", "300")
+
+try:
+    YDOC_COMPACTION_INTERVAL = float(ydoc_compaction_interval)
+except ValueError:
+    YDOC_COMPACTION_INTERVAL = 300.0
+
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
 if AIOHTTP_CLIENT_TIMEOUT == "":
@@ -557,6 +643,66 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+# Limits of the connection pool kept per upstream (Ollama / OpenAI base URL)
+AIOHTTP_CLIENT_POOL_SIZE = os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100")
+
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(AIOHTTP_CLIENT_POOL_SIZE)
+except ValueError:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = os.environ.get(
+    "AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30"
+)
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT)
+except ValueError:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
+AIOHTTP_CLIENT_DNS_CACHE_TTL = os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+
+try:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = int(AIOHTTP_CLIENT_DNS_CACHE_TTL)
+except ValueError:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
+####################################
+# OLLAMA ROUTING
+####################################
+
+# Seconds the models loaded on each Ollama node (/api/ps) are cached for
+OLLAMA_LOADED_MODELS_TTL = os.environ.get("OLLAMA_LOADED_MODELS_TTL", "10")
+
+try:
+    OLLAMA_LOADED_MODELS_TTL = float(OLLAMA_LOADED_MODELS_TTL)
+except ValueError:
+    OLLAMA_LOADED_MODELS_TTL = 10.0
+
+# Consecutive failures after which a node is ejected, and for how many seconds
+OLLAMA_CIRCUIT_BREAKER_THRESHOLD = os.environ.get(
+    "OLLAMA_CIRCUIT_BREAKER_THRESHOLD", "3"
+)
+
+try:
+    OLLAMA_CIRCUIT_BREAKER_THRESHOLD = int(OLLAMA_CIRCUIT_BREAKER_THRESHOLD)
+except ValueError:
+    OLLAMA_CIRCUIT_BREAKER_THRESHOLD = 3
+
+OLLAMA_CIRCUIT_BREAKER_COOLDOWN = os.environ.get(
+    "OLLAMA_CIRCUIT_BREAKER_COOLDOWN", "30"
+)
+
+try:
+    OLLAMA_CIRCUIT_BREAKER_COOLDOWN = float(OLLAMA_CIRCUIT_BREAKER_COOLDOWN)
+except ValueError:
+    OLLAMA_CIRCUIT_BREAKER_COOLDOWN = 30.0
+
+# Keep the turns of a chat on the same node, to reuse its KV cache
+ENABLE_OLLAMA_CHAT_AFFINITY = (
+    os.environ.get("ENABLE_OLLAMA_CHAT_AFFINITY", "True").lower() == "true"
+)
+
 
 ####################################
 # SENTENCE TRANSFORMERS
@@ -1,3 +1,6 @@
+# Installed before the other imports, to measure them
+from open_webui.utils.import_profiler import IMPORT_PROFILER
+
 import asyncio
 import inspect
 import json
@@ -12,6 +15,7 @@ from uuid import uuid4
 
 
 from contextlib import asynccontextmanager
+from functools import partial
 from urllib.parse import urlencode, parse_qs, urlparse
 from pydantic import BaseModel
 from sqlalchemy import text
@@ -58,6 +62,7 @@ from open_webui.socket.main import (
     app as socket_app,
     periodic_usage_pool_cleanup,
     get_models_in_use,
+    YDOC_MANAGER,
     get_active_user_ids,
 )
 from open_webui.routers import (
@@ -95,12 +100,14 @@ from open_webui.routers.retrieval import (
     get_ef,
     get_rf,
 )
+from open_webui.retrieval.utils import LazyModel
 
 from open_webui.internal.db import Session, engine
 
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 from open_webui.models.users import UserModel, Users
+from open_webui.models.groups import Groups
 from open_webui.models.chats import Chats
 
 from open_webui.config import (
@@ -214,6 +221,7 @@ from open_webui.config import (
     RAG_HYBRID_BM25_WEIGHT,
     RAG_ALLOWED_FILE_EXTENSIONS,
     RAG_FILE_MAX_COUNT,
+    ENABLE_INGESTION_QUEUE,
     RAG_FILE_MAX_SIZE,
     FILE_IMAGE_COMPRESSION_WIDTH,
     FILE_IMAGE_COMPRESSION_HEIGHT,
@@ -421,6 +429,7 @@ from open_webui.env import (
     ENABLE_WEBSOCKET_SUPPORT,
     BYPASS_MODEL_ACCESS_CONTROL,
     RESET_CONFIG_ON_START,
+    ENABLE_REALTIME_CHAT_SAVE,
     ENABLE_VERSION_UPDATE_CHECK,
     ENABLE_OTEL,
     EXTERNAL_PWA_MANIFEST_URL,
@@ -431,6 +440,7 @@ from open_webui.env import (
 from open_webui.utils.models import (
     get_all_models,
     get_all_base_models,
+    get_filtered_models,
     check_model_access,
 )
 from open_webui.utils.chat import (
@@ -440,7 +450,10 @@ from open_webui.utils.chat import (
 )
 from open_webui.utils.embeddings import generate_embeddings
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.chat_writer import CHAT_MESSAGE_WRITER
+from open_webui.utils.session_pool import SESSION_POOL
+from open_webui.retrieval.reindex import REINDEX_JOB
+from open_webui.retrieval.ingestion import INGESTION_QUEUE
 
 from open_webui.utils.auth import (
     get_license_data,
@@ -448,6 +461,7 @@ from open_webui.utils.auth import (
     decode_token,
     get_admin_user,
     get_verified_user,
+    LAST_ACTIVE_WRITER,
 )
 from open_webui.utils.plugin import install_tool_and_function_dependencies
 from open_webui.utils.oauth import OAuthManager
@@ -505,11 +519,22 @@ https://github.com/open-webui/open-webui
 )
 
 
+async def warm_up_model(model: LazyModel):
+    try:
+        await asyncio.to_thread(model.load)
+    except Exception as e:
+        log.error(f"Error loading model: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.instance_id = INSTANCE_ID
     start_logger()
 
+    if IMPORT_PROFILER.installed:
+        IMPORT_PROFILER.uninstall()
+        log.info(f"Import time profile:\n{IMPORT_PROFILER.get_report()}")
+
     if RESET_CONFIG_ON_START:
         reset_config()
 
@@ -540,6 +565,32 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    for model in [app.state.ef, app.state.rf]:
+        if isinstance(model, LazyModel):
+            asyncio.create_task(warm_up_model(model))
+
+    app.state.ydoc_compaction_task = asyncio.create_task(
+        YDOC_MANAGER.periodic_compaction()
+    )
+
+    app.state.last_active_writer_task = asyncio.create_task(
+        LAST_ACTIVE_WRITER.periodic_flush()
+    )
+
+    if ENABLE_REALTIME_CHAT_SAVE:
+        app.state.chat_message_writer_task = asyncio.create_task(
+            CHAT_MESSAGE_WRITER.periodic_flush()
+        )
+
+    # Continue a knowledge base reindex that was interrupted by a restart
+    try:
+        REINDEX_JOB.resume(Request({"type": "http", "app": app}))
+    except Exception as e:
+        log.error(f"Failed to resume knowledge base reindex: {e}")
+
+    if ENABLE_INGESTION_QUEUE:
+        INGESTION_QUEUE.start(app)
+
     # Initialize Task Scheduler
     try:
         from open_webui.services.task_scheduler import OpenWebUIScheduler, scheduler_instance
@@ -581,6 +632,21 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if hasattr(app.state, "chat_message_writer_task"):
+        app.state.chat_message_writer_task.cancel()
+
+    app.state.last_active_writer_task.cancel()
+    LAST_ACTIVE_WRITER.flush()
+
+    app.state.ydoc_compaction_task.cancel()
+
+    # Persist messages that are still buffered by in-flight generations
+    CHAT_MESSAGE_WRITER.flush_all()
+
+    await INGESTION_QUEUE.stop()
+
+    await SESSION_POOL.close()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -903,23 +969,29 @@ app.state.rf = None
 app.state.YOUTUBE_LOADER_TRANSLATION = None
 
 
-try:
-    app.state.ef = get_ef(
-        app.state.config.RAG_EMBEDDING_ENGINE,
-        app.state.config.RAG_EMBEDDING_MODEL,
-        RAG_EMBEDDING_MODEL_AUTO_UPDATE,
+# The local embedding and reranking models are built on first use, or by
+# the warm-up started with the app, instead of holding up the import
+if app.state.config.RAG_EMBEDDING_ENGINE == "":
+    app.state.ef = LazyModel(
+        partial(
+            get_ef,
+            app.state.config.RAG_EMBEDDING_ENGINE,
+            app.state.config.RAG_EMBEDDING_MODEL,
+            RAG_EMBEDDING_MODEL_AUTO_UPDATE,
+        )
     )
 
-    app.state.rf = get_rf(
-        app.state.config.RAG_RERANKING_ENGINE,
-        app.state.config.RAG_RERANKING_MODEL,
-        app.state.config.RAG_EXTERNAL_RERANKER_URL,
-        app.state.config.RAG_EXTERNAL_RERANKER_API_KEY,
-        RAG_RERANKING_MODEL_AUTO_UPDATE,
+if app.state.config.RAG_RERANKING_MODEL:
+    app.state.rf = LazyModel(
+        partial(
+            get_rf,
+            app.state.config.RAG_RERANKING_ENGINE,
+            app.state.config.RAG_RERANKING_MODEL,
+            app.state.config.RAG_EXTERNAL_RERANKER_URL,
+            app.state.config.RAG_EXTERNAL_RERANKER_API_KEY,
+            RAG_RERANKING_MODEL_AUTO_UPDATE,
+        )
     )
-except Exception as e:
-    log.error(f"Error updating models: {e}")
-    pass
 
 
 app.state.EMBEDDING_FUNCTION = get_embedding_function(
@@ -1147,6 +1219,13 @@ async def commit_session_after_request(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def scope_group_membership_cache(request: Request, call_next):
+    # Look up the groups of each user at most once per request
+    with Groups.membership_cache.request_scope():
+        return await call_next(request)
+
+
 @app.middleware("http")
 async def check_url(request: Request, call_next):
     start_time = int(time.time())
@@ -1255,29 +1334,6 @@ if audit_level != AuditLevel.NONE:
 async def get_models(
     request: Request, refresh: bool = False, user=Depends(get_verified_user)
 ):
-    def get_filtered_models(models, user):
-        filtered_models = []
-        for model in models:
-            if model.get("arena"):
-                if has_access(
-                    user.id,
-                    type="read",
-                    access_control=model.get("info", {})
-                    .get("meta", {})
-                    .get("access_control", {}),
-                ):
-                    filtered_models.append(model)
-                continue
-
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if user.id == model_info.user_id or has_access(
-                    user.id, type="read", access_control=model_info.access_control
-                ):
-                    filtered_models.append(model)
-
-        return filtered_models
-
     all_models = await get_all_models(request, refresh=refresh, user=user)
 
     models = []
@@ -0,0 +1,44 @@
+"""Add ingestion_job table
+
+Revision ID: 5b1e0d3c7a21
+Revises: e13c74ee8e4c
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "5b1e0d3c7a21"
+down_revision = "e13c74ee8e4c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.Text(), nullable=False, primary_key=True),
+        sa.Column("user_id", sa.Text(), nullable=True),
+        sa.Column("file_id", sa.Text(), nullable=True),
+        sa.Column("knowledge_id", sa.Text(), nullable=True),
+        sa.Column("lane", sa.Text(), nullable=True),
+        sa.Column("status", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("worker_id", sa.Text(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("scheduled_at", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+    )
+    op.create_index(
+        "ingestion_job_lane_status_idx", "ingestion_job", ["lane", "status"]
+    )
+    op.create_index("ingestion_job_file_id_idx", "ingestion_job", ["file_id"])
+
+
+def downgrade():
+    op.drop_index("ingestion_job_file_id_idx", table_name="ingestion_job")
+    op.drop_index("ingestion_job_lane_status_idx", table_name="ingestion_job")
+    op.drop_table("ingestion_job")
@@ -0,0 +1,56 @@
+"""Add group_member table
+
+Revision ID: b7d4e2a9c3f1
+Revises: 5b1e0d3c7a21
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+
+import json
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "b7d4e2a9c3f1"
+down_revision = "5b1e0d3c7a21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    group_member = op.create_table(
+        "group_member",
+        sa.Column("group_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("group_id", "user_id", name="pk_group_member"),
+    )
+    op.create_index("group_member_user_id_idx", "group_member", ["user_id"])
+
+    # Backfill the members from group.user_ids
+    group = table(
+        "group",
+        column("id", sa.Text()),
+        column("user_ids", sa.JSON()),
+    )
+
+    conn = op.get_bind()
+    now = int(time.time())
+    rows = []
+    for row in conn.execute(sa.select(group.c.id, group.c.user_ids)):
+        user_ids = row.user_ids
+        if isinstance(user_ids, str):
+            user_ids = json.loads(user_ids)
+
+        for user_id in set(user_ids or []):
+            rows.append({"group_id": row.id, "user_id": user_id, "created_at": now})
+
+    if rows:
+        op.bulk_insert(group_member, rows)
+
+
+def downgrade():
+    op.drop_index("group_member_user_id_idx", table_name="group_member")
+    op.drop_table("group_member")
@@ -0,0 +1,150 @@
+"""Add chat_search table
+
+Revision ID: c4e8f1a2b6d3
+Revises: b7d4e2a9c3f1
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "c4e8f1a2b6d3"
+down_revision = "b7d4e2a9c3f1"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# Frozen copy of open_webui.models.chat_search as of this revision, so that
+# later changes to the model do not change what this migration does
+MAX_CONTENT_LENGTH = 256 * 1024
+
+
+def get_chat_search_content(chat: dict) -> str:
+    messages = chat.get("history", {}).get("messages", {})
+    messages = list(messages.values()) if messages else chat.get("messages", [])
+
+    contents = []
+    length = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, str) or not content:
+            continue
+
+        contents.append(content)
+        length += len(content) + 1
+        if length >= MAX_CONTENT_LENGTH:
+            break
+
+    return "\n".join(contents)[:MAX_CONTENT_LENGTH].replace("\x00", "")
+
+
+def upgrade():
+    chat_search = op.create_table(
+        "chat_search",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_chat_search_chat_id", "chat_search", ["chat_id"], unique=True)
+    op.create_index("ix_chat_search_user_id", "chat_search", ["user_id"])
+
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE chat_search_fts USING fts5("
+                "title, content, content='chat_search', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        except Exception as e:
+            # Chat search falls back to LIKE queries without FTS5
+            print(f"FTS5 is not available, chat search will not be indexed: {e}")
+        else:
+            op.execute(
+                "CREATE TRIGGER chat_search_ai AFTER INSERT ON chat_search BEGIN "
+                "INSERT INTO chat_search_fts(rowid, title, content) "
+                "VALUES (new.id, new.title, new.content); END"
+            )
+            op.execute(
+                "CREATE TRIGGER chat_search_ad AFTER DELETE ON chat_search BEGIN "
+                "INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content) "
+                "VALUES ('delete', old.id, old.title, old.content); END"
+            )
+            op.execute(
+                "CREATE TRIGGER chat_search_au AFTER UPDATE ON chat_search BEGIN "
+                "INSERT INTO chat_search_fts(chat_search_fts, rowid, title, content) "
+                "VALUES ('delete', old.id, old.title, old.content); "
+                "INSERT INTO chat_search_fts(rowid, title, content) "
+                "VALUES (new.id, new.title, new.content); END"
+            )
+    elif conn.dialect.name == "postgresql":
+        # Must match get_postgres_document() in open_webui.models.chat_search
+        op.execute(
+            "CREATE INDEX chat_search_document_idx ON chat_search USING GIN (("
+            "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(content, '')), 'B')"
+            "))"
+        )
+
+    # Index the existing chats, in batches of BATCH_SIZE
+    chat = table(
+        "chat",
+        column("id", sa.String()),
+        column("user_id", sa.String()),
+        column("chat", sa.JSON()),
+    )
+
+    last_id = None
+    while True:
+        stmt = (
+            sa.select(chat.c.id, chat.c.user_id, chat.c.chat)
+            .where(sa.not_(chat.c.user_id.like("shared-%")))
+            .order_by(chat.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            stmt = stmt.where(chat.c.id > last_id)
+
+        rows = conn.execute(stmt).fetchall()
+        if not rows:
+            break
+
+        items = []
+        for row in rows:
+            data = row.chat
+            if isinstance(data, str):
+                data = json.loads(data)
+            data = data or {}
+
+            items.append(
+                {
+                    "chat_id": row.id,
+                    "user_id": row.user_id,
+                    "title": (data.get("title") or "").replace("\x00", ""),
+                    "content": get_chat_search_content(data),
+                }
+            )
+        op.bulk_insert(chat_search, items)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS chat_search_au")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ad")
+        op.execute("DROP TRIGGER IF EXISTS chat_search_ai")
+        op.execute("DROP TABLE IF EXISTS chat_search_fts")
+    elif conn.dialect.name == "postgresql":
+        op.drop_index("chat_search_document_idx", table_name="chat_search")
+
+    op.drop_index("ix_chat_search_user_id", table_name="chat_search")
+    op.drop_index("ix_chat_search_chat_id", table_name="chat_search")
+    op.drop_table("chat_search")
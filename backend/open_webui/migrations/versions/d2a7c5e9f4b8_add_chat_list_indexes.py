@@ -0,0 +1,26 @@
+"""Add chat list indexes
+
+Revision ID: d2a7c5e9f4b8
+Revises: c4e8f1a2b6d3
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+
+from alembic import op
+
+revision = "d2a7c5e9f4b8"
+down_revision = "c4e8f1a2b6d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "chat_user_id_updated_at_idx", "chat", ["user_id", "updated_at", "id"]
+    )
+    op.create_index("chat_folder_id_user_id_idx", "chat", ["folder_id", "user_id"])
+
+
+def downgrade():
+    op.drop_index("chat_folder_id_user_id_idx", table_name="chat")
+    op.drop_index("chat_user_id_updated_at_idx", table_name="chat")
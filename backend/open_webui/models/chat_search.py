@@ -0,0 +1,178 @@
+import logging
+import re
+from typing import Optional
+
+from open_webui.internal.db import Base
+from open_webui.env import SRC_LOG_LEVELS
+
+from sqlalchemy import Column, Integer, Text, func, literal_column, select, text
+from sqlalchemy.sql import column, table
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# Chat search index
+####################
+
+# Characters of message content indexed per chat. Postgres rejects tsvectors
+# over 1MB, and the tail of very long chats adds little to the ranking.
+MAX_CONTENT_LENGTH = 256 * 1024
+
+# Postgres text search config; "simple" lowercases without stemming, which
+# matches how the LIKE search behaved for every language
+TS_CONFIG = "simple"
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+chat_search_fts = table("chat_search_fts", column("rowid"))
+
+
+class ChatSearch(Base):
+    """
+    The searchable text of a chat, one row per chat.
+
+    On SQLite an external-content FTS5 table `chat_search_fts` indexes the
+    rows and is kept in sync by triggers; on Postgres a GIN index over the
+    weighted tsvector of title and content does. Both are created by the
+    migration of this table.
+    """
+
+    __tablename__ = "chat_search"
+
+    # Integer key so that SQLite can use it as the FTS5 rowid
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(Text, nullable=False, unique=True, index=True)
+    user_id = Column(Text, nullable=False, index=True)
+
+    title = Column(Text, nullable=True)
+    content = Column(Text, nullable=True)
+
+
+def get_chat_search_content(chat: dict) -> str:
+    messages = chat.get("history", {}).get("messages", {})
+    messages = list(messages.values()) if messages else chat.get("messages", [])
+
+    contents = []
+    length = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, str) or not content:
+            continue
+
+        contents.append(content)
+        length += len(content) + 1
+        if length >= MAX_CONTENT_LENGTH:
+            break
+
+    return "\n".join(contents)[:MAX_CONTENT_LENGTH].replace("\x00", "")
+
+
+def get_search_tokens(search_text: str) -> list[str]:
+    return WORD_PATTERN.findall(search_text.lower())
+
+
+def get_postgres_document():
+    # Rendered with literals only, so that it matches the expression of the
+    # GIN index created by the migration
+    def weighted(column, weight: str):
+        return func.setweight(
+            func.to_tsvector(
+                literal_column(f"'{TS_CONFIG}'::regconfig"),
+                func.coalesce(column, literal_column("''")),
+            ),
+            literal_column(f"'{weight}'"),
+        )
+
+    return weighted(ChatSearch.title, "A").op("||")(weighted(ChatSearch.content, "B"))
+
+
+class ChatSearchTable:
+    def __init__(self):
+        # Whether the FTS5 table exists, checked once per process on SQLite
+        self._sqlite_fts_available: Optional[bool] = None
+
+    def is_available(self, db) -> bool:
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "postgresql":
+            return True
+
+        if dialect_name == "sqlite":
+            if self._sqlite_fts_available is None:
+                self._sqlite_fts_available = (
+                    db.execute(
+                        text(
+                            "SELECT 1 FROM sqlite_master "
+                            "WHERE type = 'table' AND name = 'chat_search_fts'"
+                        )
+                    ).first()
+                    is not None
+                )
+                if not self._sqlite_fts_available:
+                    log.warning("FTS5 chat search index missing, using LIKE search")
+            return self._sqlite_fts_available
+
+        return False
+
+    def index_chat(self, db, chat_id: str, user_id: str, chat: dict) -> None:
+        """Add or replace the search row of a chat in the session `db`."""
+        db.query(ChatSearch).filter_by(chat_id=chat_id).delete()
+        db.add(
+            ChatSearch(
+                chat_id=chat_id,
+                user_id=user_id,
+                title=(chat.get("title") or "").replace("\x00", ""),
+                content=get_chat_search_content(chat),
+            )
+        )
+
+    def delete_chats(self, db, chat_ids) -> None:
+        """
+        Delete the search rows of `chat_ids`, a list of ids or a subquery
+        selecting them.
+        """
+        db.query(ChatSearch).filter(ChatSearch.chat_id.in_(chat_ids)).delete(
+            synchronize_session=False
+        )
+
+    def get_search_subquery(self, db, user_id: str, tokens: list[str]):
+        """
+        Select (chat_id, rank) of the chats of a user that contain every token
+        as a word prefix, in the title or any message. Lower ranks are better.
+        Returns None if the index is not available.
+        """
+        if not self.is_available(db):
+            return None
+
+        if db.bind.dialect.name == "sqlite":
+            match = " ".join(f'"{token}"*' for token in tokens)
+            return (
+                select(
+                    ChatSearch.chat_id.label("chat_id"),
+                    # Title matches weigh ten times as much as content matches
+                    literal_column("bm25(chat_search_fts, 10.0, 1.0)").label("rank"),
+                )
+                .select_from(ChatSearch)
+                .join(chat_search_fts, chat_search_fts.c.rowid == ChatSearch.id)
+                .where(ChatSearch.user_id == user_id)
+                .where(text("chat_search_fts MATCH :match").bindparams(match=match))
+                .subquery()
+            )
+
+        query = func.to_tsquery(
+            literal_column(f"'{TS_CONFIG}'::regconfig"),
+            " & ".join(f"{token}:*" for token in tokens),
+        )
+        document = get_postgres_document()
+        return (
+            select(
+                ChatSearch.chat_id.label("chat_id"),
+                (-func.ts_rank(document, query)).label("rank"),
+            )
+            .where(ChatSearch.user_id == user_id)
+            .where(document.op("@@")(query))
+            .subquery()
+        )
+
+
+ChatSearches = ChatSearchTable()
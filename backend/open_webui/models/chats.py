@@ -6,10 +6,20 @@ from typing import Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
+from open_webui.models.chat_search import ChatSearches, get_search_tokens
 from open_webui.env import SRC_LOG_LEVELS
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Index,
+    String,
+    Text,
+    JSON,
+    PrimaryKeyConstraint,
+)
 from sqlalchemy import or_, func, select, and_, text
 from sqlalchemy.sql import exists
 from sqlalchemy.sql.expression import bindparam
@@ -40,6 +50,101 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Chat lists, paginated by (updated_at, id)
+        Index("chat_user_id_updated_at_idx", "user_id", "updated_at", "id"),
+        Index("chat_folder_id_user_id_idx", "folder_id", "user_id"),
+    )
+
+
+class ChatMessage(Base):
+    """
+    Messages updated by the server (e.g. while streaming a response), stored
+    one row per message so they can be updated without rewriting the `chat`
+    JSON. Rows take precedence over `chat.history.messages` when reading and
+    are folded back into the JSON on the next full chat update.
+    """
+
+    __tablename__ = "chat_message"
+
+    id = Column(Text)
+    chat_id = Column(Text)
+
+    parent_id = Column(Text, nullable=True)
+    role = Column(Text, nullable=True)
+    content = Column(Text, nullable=True)
+    model = Column(Text, nullable=True)
+    status_history = Column(JSON, nullable=True)
+
+    # Remaining message fields
+    data = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger)  # time_ns
+    updated_at = Column(BigInteger, nullable=True)  # time_ns
+
+    __table_args__ = (
+        PrimaryKeyConstraint("chat_id", "id", name="pk_chat_message_chat_id_id"),
+    )
+
+
+# Message keys stored in their own chat_message columns
+CHAT_MESSAGE_COLUMNS = {
+    "parentId": "parent_id",
+    "role": "role",
+    "content": "content",
+    "model": "model",
+    "statusHistory": "status_history",
+}
+
+
+def set_chat_message_fields(chat_message: ChatMessage, message: dict):
+    data = dict(message)
+    for key, column in CHAT_MESSAGE_COLUMNS.items():
+        value = data.get(key)
+        # Keep non-string content (and explicit nulls) in `data` as is
+        if value is None or (key == "content" and not isinstance(value, str)):
+            setattr(chat_message, column, None)
+        else:
+            setattr(chat_message, column, data.pop(key))
+
+    chat_message.data = data
+
+
+def get_message_from_chat_message(chat_message: ChatMessage) -> dict:
+    message = dict(chat_message.data or {})
+    for key, column in CHAT_MESSAGE_COLUMNS.items():
+        value = getattr(chat_message, column)
+        if value is not None:
+            message[key] = value
+    return message
+
+
+def apply_chat_messages(chat: "ChatModel", chat_messages: list) -> "ChatModel":
+    if not chat_messages:
+        return chat
+
+    history = {**chat.chat.get("history", {})}
+    history["messages"] = {
+        **history.get("messages", {}),
+        **{
+            chat_message.id: get_message_from_chat_message(chat_message)
+            for chat_message in chat_messages
+        },
+    }
+
+    # The last upserted message is the current one, as with a full update
+    upserted_messages = [
+        chat_message
+        for chat_message in chat_messages
+        if chat_message.updated_at is not None
+    ]
+    if upserted_messages:
+        history["currentId"] = max(
+            upserted_messages, key=lambda chat_message: chat_message.updated_at
+        ).id
+
+    return chat.model_copy(update={"chat": {**chat.chat, "history": history}})
+
 
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -107,7 +212,37 @@ class ChatTitleIdResponse(BaseModel):
     created_at: int
 
 
+def decode_chat_cursor(cursor: str) -> tuple[int, str]:
+    """
+    Parse a list cursor, "<updated_at>:<id>" of the last chat of the previous
+    page. Raises ValueError if malformed.
+    """
+    updated_at, id = cursor.split(":", 1)
+    return int(updated_at), id
+
+
 class ChatTable:
+    def _get_chat_models(self, db, chats: list, chat_ids=None) -> list[ChatModel]:
+        """
+        Validate chat rows, overlaying the messages stored in `chat_message`.
+        `chat_ids` can be a subquery selecting the ids of `chats`.
+        """
+        if chat_ids is None:
+            chat_ids = [chat.id for chat in chats]
+
+        chat_messages = {}
+        for chat_message in db.query(ChatMessage).filter(
+            ChatMessage.chat_id.in_(chat_ids)
+        ):
+            chat_messages.setdefault(chat_message.chat_id, []).append(chat_message)
+
+        return [
+            apply_chat_messages(
+                ChatModel.model_validate(chat), chat_messages.get(chat.id)
+            )
+            for chat in chats
+        ]
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -129,6 +264,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            ChatSearches.index_chat(db, id, user_id, form_data.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -166,6 +302,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            ChatSearches.index_chat(db, id, user_id, form_data.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -177,6 +314,10 @@ class ChatTable:
                 chat_item.chat = chat
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+
+                # The full chat supersedes the individually stored messages
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
+                ChatSearches.index_chat(db, id, chat_item.user_id, chat)
                 db.commit()
                 db.refresh(chat_item)
 
@@ -184,6 +325,23 @@ class ChatTable:
         except Exception:
             return None
 
+    def update_chat_search_by_id(self, id: str) -> None:
+        """
+        Reindex a chat including the messages stored in `chat_message`, which
+        a full chat update would otherwise only pick up once folded back.
+        """
+        try:
+            with get_db() as db:
+                chat = db.get(Chat, id)
+                if chat is None:
+                    return
+
+                chat = self._get_chat_models(db, [chat])[0]
+                ChatSearches.index_chat(db, id, chat.user_id, chat.chat)
+                db.commit()
+        except Exception as e:
+            log.exception(f"Error updating the search index of chat {id}: {e}")
+
     def update_chat_title_by_id(self, id: str, title: str) -> Optional[ChatModel]:
         chat = self.get_chat_by_id(id)
         if chat is None:
@@ -231,61 +389,92 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
+        with get_db() as db:
+            chat_message = db.get(ChatMessage, (id, message_id))
+            if chat_message:
+                return get_message_from_chat_message(chat_message)
+
+            chat = db.get(Chat, id)
+            if chat is None:
+                return None
+
+            return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+
+    def _get_or_create_chat_message(
+        self, db, id: str, message_id: str, create: bool = True
+    ) -> Optional[ChatMessage]:
+        chat_message = db.get(ChatMessage, (id, message_id))
+        if chat_message:
+            return chat_message
+
+        # Seed the row from the message stored in the chat JSON, if any
+        chat = db.get(Chat, id)
         if chat is None:
             return None
 
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
+        message = chat.chat.get("history", {}).get("messages", {}).get(message_id)
+        if message is None and not create:
+            return None
+
+        chat_message = ChatMessage(
+            id=message_id, chat_id=id, created_at=int(time.time_ns())
+        )
+        set_chat_message_fields(chat_message, message or {})
+        db.add(chat_message)
+        return chat_message
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
+    ) -> Optional[dict]:
         # Sanitize message content for null characters before upserting
         if isinstance(message.get("content"), str):
             message["content"] = message["content"].replace("\x00", "")
 
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+        try:
+            with get_db() as db:
+                chat_message = self._get_or_create_chat_message(db, id, message_id)
+                if chat_message is None:
+                    return None
 
-        history["currentId"] = message_id
+                message = {
+                    **get_message_from_chat_message(chat_message),
+                    **message,
+                }
+                set_chat_message_fields(chat_message, message)
+                chat_message.updated_at = int(time.time_ns())
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                db.query(Chat).filter_by(id=id).update({"updated_at": int(time.time())})
+                db.commit()
+                return message
+        except Exception as e:
+            log.exception(f"Error upserting message {message_id} of chat {id}: {e}")
+            return None
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+    ) -> Optional[dict]:
+        try:
+            with get_db() as db:
+                chat_message = self._get_or_create_chat_message(
+                    db, id, message_id, create=False
+                )
+                if chat_message is None:
+                    return None
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                chat_message.status_history = [
+                    *(chat_message.status_history or []),
+                    status,
+                ]
+                db.commit()
+                return get_message_from_chat_message(chat_message)
+        except Exception as e:
+            log.exception(f"Error adding status to message {message_id}: {e}")
+            return None
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
             # Get the existing chat to share
-            chat = db.get(Chat, chat_id)
+            chat = self._get_chat_models(db, [db.get(Chat, chat_id)])[0]
             # Check if the chat is already shared
             if chat.share_id:
                 return self.get_chat_by_id_and_user_id(chat.share_id, "shared")
@@ -317,7 +506,7 @@ class ChatTable:
     def update_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
-                chat = db.get(Chat, chat_id)
+                chat = self._get_chat_models(db, [db.get(Chat, chat_id)])[0]
                 shared_chat = (
                     db.query(Chat).filter_by(user_id=f"shared-{chat_id}").first()
                 )
@@ -355,7 +544,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -367,7 +556,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -379,7 +568,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -392,6 +581,80 @@ class ChatTable:
         except Exception:
             return False
 
+    def _get_chat_list_query(
+        self,
+        db,
+        user_id: str,
+        include_archived: bool = False,
+        archived_only: bool = False,
+        filter: Optional[dict] = None,
+    ):
+        query = db.query(Chat).filter_by(user_id=user_id)
+        if archived_only:
+            query = query.filter_by(archived=True)
+        elif not include_archived:
+            query = query.filter_by(archived=False)
+
+        filter = filter or {}
+
+        query_key = filter.get("query")
+        if query_key:
+            query = query.filter(Chat.title.ilike(f"%{query_key}%"))
+
+        order_by = filter.get("order_by")
+        direction = filter.get("direction")
+
+        if order_by and direction and getattr(Chat, order_by):
+            if direction.lower() == "asc":
+                query = query.order_by(getattr(Chat, order_by).asc())
+            elif direction.lower() == "desc":
+                query = query.order_by(getattr(Chat, order_by).desc())
+            else:
+                raise ValueError("Invalid direction for ordering")
+        else:
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+
+        return query
+
+    def _paginate(
+        self,
+        query,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ):
+        """
+        Paginate a query ordered by (updated_at, id) descending, by offset or
+        by the cursor of the last chat of the previous page.
+        """
+        if cursor:
+            updated_at, id = decode_chat_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Chat.updated_at < updated_at,
+                    and_(Chat.updated_at == updated_at, Chat.id < id),
+                )
+            )
+        elif skip:
+            query = query.offset(skip)
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    def _get_title_id_list(self, query) -> list[ChatTitleIdResponse]:
+        # Select only the listed columns, never the chat JSON
+        return [
+            ChatTitleIdResponse(
+                id=chat.id,
+                title=chat.title,
+                updated_at=chat.updated_at,
+                created_at=chat.created_at,
+            )
+            for chat in query.with_entities(
+                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
+            ).all()
+        ]
+
     def get_archived_chat_list_by_user_id(
         self,
         user_id: str,
@@ -401,33 +664,25 @@ class ChatTable:
     ) -> list[ChatModel]:
 
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id, archived=True)
-
-            if filter:
-                query_key = filter.get("query")
-                if query_key:
-                    query = query.filter(Chat.title.ilike(f"%{query_key}%"))
-
-                order_by = filter.get("order_by")
-                direction = filter.get("direction")
-
-                if order_by and direction and getattr(Chat, order_by):
-                    if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
-                    elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
-                    else:
-                        raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+            query = self._get_chat_list_query(
+                db, user_id, archived_only=True, filter=filter
+            )
+            all_chats = self._paginate(query, skip, limit).all()
+            return self._get_chat_models(db, all_chats)
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+    def get_archived_chat_title_id_list_by_user_id(
+        self,
+        user_id: str,
+        filter: Optional[dict] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> list[ChatTitleIdResponse]:
+        with get_db() as db:
+            query = self._get_chat_list_query(
+                db, user_id, archived_only=True, filter=filter
+            )
+            return self._get_title_id_list(self._paginate(query, skip, limit, cursor))
 
     def get_chat_list_by_user_id(
         self,
@@ -438,35 +693,26 @@ class ChatTable:
         limit: int = 50,
     ) -> list[ChatModel]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
-            if not include_archived:
-                query = query.filter_by(archived=False)
-
-            if filter:
-                query_key = filter.get("query")
-                if query_key:
-                    query = query.filter(Chat.title.ilike(f"%{query_key}%"))
-
-                order_by = filter.get("order_by")
-                direction = filter.get("direction")
-
-                if order_by and direction and getattr(Chat, order_by):
-                    if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
-                    elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
-                    else:
-                        raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
+            query = self._get_chat_list_query(
+                db, user_id, include_archived=include_archived, filter=filter
+            )
+            all_chats = self._paginate(query, skip, limit).all()
+            return self._get_chat_models(db, all_chats)
 
-            all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+    def get_filtered_chat_title_id_list_by_user_id(
+        self,
+        user_id: str,
+        include_archived: bool = False,
+        filter: Optional[dict] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> list[ChatTitleIdResponse]:
+        with get_db() as db:
+            query = self._get_chat_list_query(
+                db, user_id, include_archived=include_archived, filter=filter
+            )
+            return self._get_title_id_list(self._paginate(query, skip, limit, cursor))
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -474,6 +720,7 @@ class ChatTable:
         include_archived: bool = False,
         skip: Optional[int] = None,
         limit: Optional[int] = None,
+        cursor: Optional[str] = None,
     ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id).filter_by(folder_id=None)
@@ -482,29 +729,8 @@ class ChatTable:
             if not include_archived:
                 query = query.filter_by(archived=False)
 
-            query = query.order_by(Chat.updated_at.desc()).with_entities(
-                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
-            )
-
-            if skip:
-                query = query.offset(skip)
-            if limit:
-                query = query.limit(limit)
-
-            all_chats = query.all()
-
-            # result has to be destructured from sqlalchemy `row` and mapped to a dict since the `ChatModel`is not the returned dataclass.
-            return [
-                ChatTitleIdResponse.model_validate(
-                    {
-                        "id": chat[0],
-                        "title": chat[1],
-                        "updated_at": chat[2],
-                        "created_at": chat[3],
-                    }
-                )
-                for chat in all_chats
-            ]
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+            return self._get_title_id_list(self._paginate(query, skip, limit, cursor))
 
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
@@ -517,13 +743,13 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -545,7 +771,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -556,7 +782,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats.all(), select(Chat.id))
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -565,7 +791,9 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(
+                db, all_chats.all(), select(Chat.id).filter_by(user_id=user_id)
+            )
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -573,8 +801,20 @@ class ChatTable:
                 db.query(Chat)
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
+                .all()
+            )
+            return self._get_chat_models(db, all_chats)
+
+    def get_pinned_chat_title_id_list_by_user_id(
+        self, user_id: str
+    ) -> list[ChatTitleIdResponse]:
+        with get_db() as db:
+            query = (
+                db.query(Chat)
+                .filter_by(user_id=user_id, pinned=True, archived=False)
+                .order_by(Chat.updated_at.desc(), Chat.id.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_title_id_list(query)
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -583,7 +823,11 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(
+                db,
+                all_chats.all(),
+                select(Chat.id).filter_by(user_id=user_id, archived=True),
+            )
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -594,7 +838,9 @@ class ChatTable:
         limit: int = 60,
     ) -> list[ChatModel]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Search the titles and messages of a user's chats, through the full-text
+        index when available. `tag:name` words filter by tag. Paginated using
+        skip and limit.
         """
         search_text = search_text.replace("\u0000", "").lower().strip()
 
@@ -603,6 +849,39 @@ class ChatTable:
                 user_id, include_archived, filter={}, skip=skip, limit=limit
             )
 
+        with get_db() as db:
+            query = self._get_search_query(db, user_id, search_text, include_archived)
+
+            # Perform pagination at the SQL level
+            all_chats = query.offset(skip).limit(limit).all()
+
+            log.info(f"The number of chats: {len(all_chats)}")
+
+            # Validate and return chats
+            return self._get_chat_models(db, all_chats)
+
+    def get_chat_title_id_list_by_user_id_and_search_text(
+        self,
+        user_id: str,
+        search_text: str,
+        include_archived: bool = False,
+        skip: int = 0,
+        limit: int = 60,
+    ) -> list[ChatTitleIdResponse]:
+        search_text = search_text.replace("\u0000", "").lower().strip()
+
+        if not search_text:
+            return self.get_filtered_chat_title_id_list_by_user_id(
+                user_id, include_archived, filter={}, skip=skip, limit=limit
+            )
+
+        with get_db() as db:
+            query = self._get_search_query(db, user_id, search_text, include_archived)
+            return self._get_title_id_list(query.offset(skip).limit(limit))
+
+    def _get_search_query(
+        self, db, user_id: str, search_text: str, include_archived: bool = False
+    ):
         search_text_words = search_text.split(" ")
 
         # search_text might contain 'tag:tag_name' format so we need to extract the tag_name, split the search_text and remove the tags
@@ -618,120 +897,88 @@ class ChatTable:
 
         search_text = " ".join(search_text_words)
 
-        with get_db() as db:
-            query = db.query(Chat).filter(Chat.user_id == user_id)
+        query = db.query(Chat).filter(Chat.user_id == user_id)
 
-            if not include_archived:
-                query = query.filter(Chat.archived == False)
+        if not include_archived:
+            query = query.filter(Chat.archived == False)
 
-            query = query.order_by(Chat.updated_at.desc())
+        query = self._filter_by_tag_ids(db, query, tag_ids)
 
-            # Check if the database dialect is either 'sqlite' or 'postgresql'
-            dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                sqlite_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_each(Chat.chat, '$.messages') AS message "
-                    "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                sqlite_content_clause = text(sqlite_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+        tokens = get_search_tokens(search_text)
+        search_subquery = (
+            ChatSearches.get_search_subquery(db, user_id, tokens) if tokens else None
+        )
 
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_each(Chat.meta, '$.tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_each(Chat.meta, '$.tags') AS tag
-                                        WHERE tag.value = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
+        if search_subquery is not None:
+            # Best ranked first, the most recent among equally ranked
+            return query.join(
+                search_subquery, search_subquery.c.chat_id == Chat.id
+            ).order_by(search_subquery.c.rank.asc(), Chat.updated_at.desc())
 
-            elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                postgres_content_sql = (
-                    "EXISTS ("
-                    "    SELECT 1 "
-                    "    FROM json_array_elements(Chat.chat->'messages') AS message "
-                    "    WHERE LOWER(message->>'content') LIKE '%' || :content_key || '%'"
-                    ")"
-                )
-                postgres_content_clause = text(postgres_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+        query = query.order_by(Chat.updated_at.desc())
 
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
+        if search_text:
+            # Without the index, scan titles and message contents
+            query = self._filter_by_content_like(db, query, search_text)
+        return query
+
+    def _filter_by_tag_ids(self, db, query, tag_ids: list[str]):
+        """Keep the chats with all of `tag_ids`, or without tags for "none"."""
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            tags_sql = "json_each(Chat.meta, '$.tags') AS tag"
+            tag_value = "tag.value"
+        elif dialect_name == "postgresql":
+            tags_sql = "json_array_elements_text(Chat.meta->'tags') AS tag"
+            tag_value = "tag"
+        else:
+            raise NotImplementedError(f"Unsupported dialect: {db.bind.dialect.name}")
+
+        # Check if there are any tags to filter, it should have all the tags
+        if "none" in tag_ids:
+            query = query.filter(text(f"NOT EXISTS (SELECT 1 FROM {tags_sql})"))
+        elif tag_ids:
+            query = query.filter(
+                and_(
+                    *[
                         text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                                        WHERE tag = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
-            else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
+                            f"EXISTS (SELECT 1 FROM {tags_sql} "
+                            f"WHERE {tag_value} = :tag_id_{tag_idx})"
+                        ).params(**{f"tag_id_{tag_idx}": tag_id})
+                        for tag_idx, tag_id in enumerate(tag_ids)
+                    ]
                 )
+            )
+        return query
+
+    def _filter_by_content_like(self, db, query, search_text: str):
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "sqlite":
+            # SQLite case: using JSON1 extension for JSON searching
+            content_sql = (
+                "EXISTS ("
+                "    SELECT 1 "
+                "    FROM json_each(Chat.chat, '$.messages') AS message "
+                "    WHERE LOWER(message.value->>'content') LIKE '%' || :content_key || '%'"
+                ")"
+            )
+        elif dialect_name == "postgresql":
+            # PostgreSQL relies on proper JSON query for search
+            content_sql = (
+                "EXISTS ("
+                "    SELECT 1 "
+                "    FROM json_array_elements(Chat.chat->'messages') AS message "
+                "    WHERE LOWER(message->>'content') LIKE '%' || :content_key || '%'"
+                ")"
+            )
+        else:
+            raise NotImplementedError(f"Unsupported dialect: {db.bind.dialect.name}")
 
-            # Perform pagination at the SQL level
-            all_chats = query.offset(skip).limit(limit).all()
-
-            log.info(f"The number of chats: {len(all_chats)}")
-
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+        return query.filter(
+            or_(Chat.title.ilike(bindparam("title_key")), text(content_sql)).params(
+                title_key=f"%{search_text}%", content_key=search_text
+            )
+        )
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -744,7 +991,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -759,7 +1006,38 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
+
+    def get_chat_title_id_lists_by_folder_ids_and_user_id(
+        self, folder_ids: list[str], user_id: str
+    ) -> dict[str, list[ChatTitleIdResponse]]:
+        """
+        Get the chats of several folders in one query, as lists keyed by
+        folder id. Folders without chats are left out.
+        """
+        if not folder_ids:
+            return {}
+
+        with get_db() as db:
+            query = db.query(
+                Chat.folder_id, Chat.id, Chat.title, Chat.updated_at, Chat.created_at
+            ).filter(Chat.folder_id.in_(folder_ids), Chat.user_id == user_id)
+            query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
+            query = query.filter_by(archived=False)
+
+            query = query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+
+            chats_by_folder_id = {}
+            for chat in query.all():
+                chats_by_folder_id.setdefault(chat.folder_id, []).append(
+                    ChatTitleIdResponse(
+                        id=chat.id,
+                        title=chat.title,
+                        updated_at=chat.updated_at,
+                        created_at=chat.created_at,
+                    )
+                )
+            return chats_by_folder_id
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -772,7 +1050,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -811,7 +1089,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -832,7 +1110,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._get_chat_models(db, [chat])[0]
         except Exception:
             return None
 
@@ -909,6 +1187,8 @@ class ChatTable:
         try:
             with get_db() as db:
                 db.query(Chat).filter_by(id=id).delete()
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
+                ChatSearches.delete_chats(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -918,7 +1198,9 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if db.query(Chat).filter_by(id=id, user_id=user_id).delete():
+                    db.query(ChatMessage).filter_by(chat_id=id).delete()
+                    ChatSearches.delete_chats(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -930,6 +1212,12 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(select(Chat.id).filter_by(user_id=user_id))
+                ).delete(synchronize_session=False)
+                ChatSearches.delete_chats(
+                    db, select(Chat.id).filter_by(user_id=user_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -942,6 +1230,14 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).filter_by(user_id=user_id, folder_id=folder_id)
+                    )
+                ).delete(synchronize_session=False)
+                ChatSearches.delete_chats(
+                    db, select(Chat.id).filter_by(user_id=user_id, folder_id=folder_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -164,6 +164,21 @@ class FunctionsTable:
         except Exception:
             return None
 
+    def get_functions_stamp(self) -> tuple:
+        """Fingerprint of all functions that changes when any is added, removed or updated."""
+        with get_db() as db:
+            return tuple(
+                tuple(row)
+                for row in db.query(
+                    Function.id,
+                    Function.updated_at,
+                    Function.is_active,
+                    Function.is_global,
+                )
+                .order_by(Function.id)
+                .all()
+            )
+
     def get_functions(self, active_only=False) -> list[FunctionModel]:
         with get_db() as db:
             if active_only:
@@ -1,17 +1,26 @@
 import json
 import logging
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional
 import uuid
 
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import GROUP_MEMBERSHIP_CACHE_TTL, SRC_LOG_LEVELS
 
 from open_webui.models.files import FileMetadataResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON, func
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Index,
+    PrimaryKeyConstraint,
+    Text,
+    JSON,
+)
 
 
 log = logging.getLogger(__name__)
@@ -41,6 +50,24 @@ class Group(Base):
     updated_at = Column(BigInteger)
 
 
+class GroupMember(Base):
+    """
+    One row per (group, user), kept in sync with Group.user_ids so that the
+    groups of a user can be found through an index.
+    """
+
+    __tablename__ = "group_member"
+
+    group_id = Column(Text, nullable=False)
+    user_id = Column(Text, nullable=False)
+    created_at = Column(BigInteger)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("group_id", "user_id", name="pk_group_member"),
+        Index("group_member_user_id_idx", "user_id"),
+    )
+
+
 class GroupModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
@@ -91,7 +118,110 @@ class GroupUpdateForm(GroupForm, UserIdsForm):
     pass
 
 
+####################
+# Membership cache
+####################
+
+
+# Groups looked up during the current request, by user id
+_request_groups: ContextVar[Optional[dict]] = ContextVar("request_groups", default=None)
+
+
+class GroupMembershipCache:
+    """
+    Caches the groups of each user for GROUP_MEMBERSHIP_CACHE_TTL seconds,
+    and for the whole request inside a request_scope() regardless of the TTL.
+
+    Every group write clears the cache of this process. Other processes pick
+    up the change once their entries expire.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, list[GroupModel]]] = {}
+
+    @contextmanager
+    def request_scope(self):
+        token = _request_groups.set({})
+        try:
+            yield
+        finally:
+            _request_groups.reset(token)
+
+    def get(self, user_id: str) -> Optional[list[GroupModel]]:
+        request_groups = _request_groups.get()
+        if request_groups is not None and user_id in request_groups:
+            return request_groups[user_id]
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, groups = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+
+        if request_groups is not None:
+            request_groups[user_id] = groups
+        return groups
+
+    def set(self, user_id: str, groups: list[GroupModel]) -> None:
+        request_groups = _request_groups.get()
+        if request_groups is not None:
+            request_groups[user_id] = groups
+
+        if self.ttl > 0:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + self.ttl, groups)
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        request_groups = _request_groups.get()
+        if request_groups is not None:
+            request_groups.clear()
+
+
 class GroupTable:
+    def __init__(self):
+        self.membership_cache = GroupMembershipCache(GROUP_MEMBERSHIP_CACHE_TTL)
+
+    def _set_group_members(self, db, group_id: str, user_ids: list[str]) -> None:
+        """Sync the group_member rows of a group with its user_ids."""
+        user_ids = set(user_ids or [])
+        existing_user_ids = {
+            row.user_id
+            for row in db.query(GroupMember.user_id).filter(
+                GroupMember.group_id == group_id
+            )
+        }
+
+        removed_user_ids = existing_user_ids - user_ids
+        if removed_user_ids:
+            db.query(GroupMember).filter(
+                GroupMember.group_id == group_id,
+                GroupMember.user_id.in_(removed_user_ids),
+            ).delete(synchronize_session=False)
+
+        now = int(time.time())
+        db.add_all(
+            GroupMember(group_id=group_id, user_id=user_id, created_at=now)
+            for user_id in user_ids - existing_user_ids
+        )
+
+    def _get_groups_by_member_id(self, db, user_id: str) -> list[GroupModel]:
+        return [
+            GroupModel.model_validate(group)
+            for group in db.query(Group)
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .filter(GroupMember.user_id == user_id)
+            .order_by(Group.updated_at.desc())
+            .all()
+        ]
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -109,8 +239,10 @@ class GroupTable:
             try:
                 result = Group(**group.model_dump())
                 db.add(result)
+                self._set_group_members(db, result.id, group.user_ids)
                 db.commit()
                 db.refresh(result)
+                self.membership_cache.invalidate()
                 if result:
                     return GroupModel.model_validate(result)
                 else:
@@ -127,19 +259,16 @@ class GroupTable:
             ]
 
     def get_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
-        with get_db() as db:
-            return [
-                GroupModel.model_validate(group)
-                for group in db.query(Group)
-                .filter(
-                    func.json_array_length(Group.user_ids) > 0
-                )  # Ensure array exists
-                .filter(
-                    Group.user_ids.cast(String).like(f'%"{user_id}"%')
-                )  # String-based check
-                .order_by(Group.updated_at.desc())
-                .all()
-            ]
+        """
+        Get the groups of a user. The result is cached and shared between
+        callers, so it must not be modified.
+        """
+        groups = self.membership_cache.get(user_id)
+        if groups is None:
+            with get_db() as db:
+                groups = self._get_groups_by_member_id(db, user_id)
+            self.membership_cache.set(user_id, groups)
+        return list(groups)
 
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
@@ -167,7 +296,10 @@ class GroupTable:
                         "updated_at": int(time.time()),
                     }
                 )
+                if form_data.user_ids is not None:
+                    self._set_group_members(db, id, form_data.user_ids)
                 db.commit()
+                self.membership_cache.invalidate()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -177,7 +309,9 @@ class GroupTable:
         try:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
+                db.query(GroupMember).filter_by(group_id=id).delete()
                 db.commit()
+                self.membership_cache.invalidate()
                 return True
         except Exception:
             return False
@@ -186,7 +320,9 @@ class GroupTable:
         with get_db() as db:
             try:
                 db.query(Group).delete()
+                db.query(GroupMember).delete()
                 db.commit()
+                self.membership_cache.invalidate()
 
                 return True
             except Exception:
@@ -195,7 +331,7 @@ class GroupTable:
     def remove_user_from_all_groups(self, user_id: str) -> bool:
         with get_db() as db:
             try:
-                groups = self.get_groups_by_member_id(user_id)
+                groups = self._get_groups_by_member_id(db, user_id)
 
                 for group in groups:
                     group.user_ids.remove(user_id)
@@ -205,7 +341,9 @@ class GroupTable:
                             "updated_at": int(time.time()),
                         }
                     )
-                    db.commit()
+                db.query(GroupMember).filter_by(user_id=user_id).delete()
+                db.commit()
+                self.membership_cache.invalidate()
 
                 return True
             except Exception:
@@ -250,7 +388,7 @@ class GroupTable:
                 group_ids = [group.id for group in groups]
 
                 # Remove user from groups not in the new list
-                existing_groups = self.get_groups_by_member_id(user_id)
+                existing_groups = self._get_groups_by_member_id(db, user_id)
 
                 for group in existing_groups:
                     if group.id not in group_ids:
@@ -261,19 +399,23 @@ class GroupTable:
                                 "updated_at": int(time.time()),
                             }
                         )
+                        self._set_group_members(db, group.id, group.user_ids)
 
                 # Add user to new groups
                 for group in groups:
-                    if user_id not in group.user_ids:
-                        group.user_ids.append(user_id)
+                    user_ids = group.user_ids or []
+                    if user_id not in user_ids:
+                        user_ids = [*user_ids, user_id]
                         db.query(Group).filter_by(id=group.id).update(
                             {
-                                "user_ids": group.user_ids,
+                                "user_ids": user_ids,
                                 "updated_at": int(time.time()),
                             }
                         )
+                        self._set_group_members(db, group.id, user_ids)
 
                 db.commit()
+                self.membership_cache.invalidate()
                 return True
             except Exception as e:
                 log.exception(e)
@@ -288,16 +430,18 @@ class GroupTable:
                 if not group:
                     return None
 
-                if not group.user_ids:
-                    group.user_ids = []
-
+                group_user_ids = list(group.user_ids or [])
                 for user_id in user_ids:
-                    if user_id not in group.user_ids:
-                        group.user_ids.append(user_id)
+                    if user_id not in group_user_ids:
+                        group_user_ids.append(user_id)
 
+                # Assign a new list, in-place changes of a JSON column aren't tracked
+                group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
+                self._set_group_members(db, id, group_user_ids)
                 db.commit()
                 db.refresh(group)
+                self.membership_cache.invalidate()
                 return GroupModel.model_validate(group)
         except Exception as e:
             log.exception(e)
@@ -315,13 +459,16 @@ class GroupTable:
                 if not group.user_ids:
                     return GroupModel.model_validate(group)
 
-                for user_id in user_ids:
-                    if user_id in group.user_ids:
-                        group.user_ids.remove(user_id)
+                group_user_ids = [
+                    user_id for user_id in group.user_ids if user_id not in user_ids
+                ]
 
+                group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
+                self._set_group_members(db, id, group_user_ids)
                 db.commit()
                 db.refresh(group)
+                self.membership_cache.invalidate()
                 return GroupModel.model_validate(group)
         except Exception as e:
             log.exception(e)
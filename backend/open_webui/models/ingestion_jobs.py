@@ -0,0 +1,307 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+from open_webui.env import SRC_LOG_LEVELS
+
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Column, Index, Integer, String, Text, JSON
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import aliased
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+####################
+# IngestionJob DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String)
+    file_id = Column(String)
+    # Set for jobs that add the file to a knowledge base
+    knowledge_id = Column(String, nullable=True)
+
+    lane = Column(String)
+    # pending, processing, completed or failed
+    status = Column(String)
+    attempts = Column(Integer)
+    error = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)
+    data = Column(JSON, nullable=True)
+
+    # Not picked up before, to back off between attempts
+    scheduled_at = Column(BigInteger)
+    created_at = Column(BigInteger)
+    # Doubles as the heartbeat of the worker processing the job
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        Index("ingestion_job_lane_status_idx", "lane", "status"),
+        Index("ingestion_job_file_id_idx", "file_id"),
+    )
+
+
+class IngestionJobModel(BaseModel):
+    id: str
+    user_id: str
+    file_id: str
+    knowledge_id: Optional[str] = None
+
+    lane: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    data: Optional[dict] = None
+
+    scheduled_at: int  # timestamp in epoch
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+####################
+# Forms
+####################
+
+
+class IngestionJobsTable:
+    def insert_new_job(
+        self,
+        user_id: str,
+        file_id: str,
+        knowledge_id: Optional[str] = None,
+        lane: str = "interactive",
+        data: Optional[dict] = None,
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            now = int(time.time())
+            job = IngestionJobModel(
+                **{
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "file_id": file_id,
+                    "knowledge_id": knowledge_id,
+                    "lane": lane,
+                    "status": "pending",
+                    "attempts": 0,
+                    "data": data,
+                    "scheduled_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+            try:
+                result = IngestionJob(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                if result:
+                    return IngestionJobModel.model_validate(result)
+                else:
+                    return None
+            except Exception as e:
+                log.exception(f"Error inserting ingestion job: {e}")
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            try:
+                job = db.get(IngestionJob, id)
+                return IngestionJobModel.model_validate(job)
+            except Exception:
+                return None
+
+    def get_jobs_by_user_id(
+        self, user_id: str, skip: int = 0, limit: int = 50
+    ) -> list[IngestionJobModel]:
+        with get_db() as db:
+            jobs = (
+                db.query(IngestionJob)
+                .filter_by(user_id=user_id)
+                .order_by(IngestionJob.created_at.desc())
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+            return [IngestionJobModel.model_validate(job) for job in jobs]
+
+    def has_unfinished_upload_job(self, file_id: str) -> bool:
+        with get_db() as db:
+            return (
+                db.query(IngestionJob)
+                .filter(
+                    IngestionJob.file_id == file_id,
+                    IngestionJob.knowledge_id.is_(None),
+                    IngestionJob.status.in_(["pending", "processing"]),
+                )
+                .first()
+                is not None
+            )
+
+    def claim_next_job(
+        self, worker_id: str, lanes: list[str], timeout: int, max_attempts: int
+    ) -> Optional[IngestionJobModel]:
+        """
+        Claim the oldest due job of the first lane that has one. Jobs whose
+        worker stopped sending heartbeats for `timeout` seconds are claimed
+        again, unless they were attempted `max_attempts` times already: those
+        fail, as the file may be what killed their workers. Knowledge base jobs
+        wait for the upload job of their file.
+
+        A job is claimed with a conditional update, so that only one of the
+        workers polling the same job gets it.
+        """
+        now = int(time.time())
+        upload_job = aliased(IngestionJob)
+
+        with get_db() as db:
+            failed = (
+                db.query(IngestionJob)
+                .filter(
+                    IngestionJob.lane.in_(lanes),
+                    IngestionJob.status == "processing",
+                    IngestionJob.updated_at < now - timeout,
+                    IngestionJob.attempts >= max_attempts,
+                )
+                .update(
+                    {
+                        "status": "failed",
+                        "error": "The worker processing the file stopped responding",
+                        "updated_at": now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if failed:
+                log.error(f"Failed {failed} ingestion jobs whose workers stopped")
+
+            for lane in lanes:
+                candidates = (
+                    db.query(IngestionJob)
+                    .filter(
+                        IngestionJob.lane == lane,
+                        or_(
+                            and_(
+                                IngestionJob.status == "pending",
+                                IngestionJob.scheduled_at <= now,
+                            ),
+                            and_(
+                                IngestionJob.status == "processing",
+                                IngestionJob.updated_at < now - timeout,
+                                IngestionJob.attempts < max_attempts,
+                            ),
+                        ),
+                        or_(
+                            IngestionJob.knowledge_id.is_(None),
+                            ~exists().where(
+                                upload_job.file_id == IngestionJob.file_id,
+                                upload_job.knowledge_id.is_(None),
+                                upload_job.status.in_(["pending", "processing"]),
+                            ),
+                        ),
+                    )
+                    .order_by(IngestionJob.created_at)
+                    .limit(5)
+                    .all()
+                )
+
+                for job in candidates:
+                    claimed = (
+                        db.query(IngestionJob)
+                        .filter_by(
+                            id=job.id,
+                            status=job.status,
+                            attempts=job.attempts,
+                            updated_at=job.updated_at,
+                        )
+                        .update(
+                            {
+                                "status": "processing",
+                                "attempts": job.attempts + 1,
+                                "worker_id": worker_id,
+                                "updated_at": now,
+                            },
+                            synchronize_session=False,
+                        )
+                    )
+                    db.commit()
+
+                    if claimed:
+                        return self.get_job_by_id(job.id)
+
+        return None
+
+    def touch_job_by_id(self, id: str, worker_id: str) -> bool:
+        with get_db() as db:
+            updated = (
+                db.query(IngestionJob)
+                .filter_by(id=id, worker_id=worker_id, status="processing")
+                .update({"updated_at": int(time.time())})
+            )
+            db.commit()
+            return updated > 0
+
+    def update_job_status_by_id(
+        self,
+        id: str,
+        status: str,
+        error: Optional[str] = None,
+        scheduled_at: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ) -> Optional[IngestionJobModel]:
+        """
+        Update the status of a job. With `worker_id`, only while that worker
+        is processing it, so that a worker whose job was taken over cannot
+        overwrite the status set by the new one. Returns None if not updated.
+        """
+        with get_db() as db:
+            now = int(time.time())
+            query = db.query(IngestionJob).filter_by(id=id)
+            if worker_id is not None:
+                query = query.filter_by(worker_id=worker_id, status="processing")
+
+            updated = query.update(
+                {
+                    "status": status,
+                    "error": error,
+                    "scheduled_at": scheduled_at if scheduled_at is not None else now,
+                    "updated_at": now,
+                }
+            )
+            db.commit()
+            return self.get_job_by_id(id) if updated else None
+
+    def retry_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            now = int(time.time())
+            db.query(IngestionJob).filter_by(id=id, status="failed").update(
+                {
+                    "status": "pending",
+                    "attempts": 0,
+                    "error": None,
+                    "scheduled_at": now,
+                    "updated_at": now,
+                }
+            )
+            db.commit()
+            return self.get_job_by_id(id)
+
+    def delete_jobs_by_file_id(self, file_id: str) -> bool:
+        with get_db() as db:
+            db.query(IngestionJob).filter_by(file_id=file_id).delete()
+            db.commit()
+            return True
+
+
+IngestionJobs = IngestionJobsTable()
@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 import time
 from typing import Optional
 import uuid
@@ -19,6 +20,10 @@ from open_webui.utils.access_control import has_access
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
+# Serializes read-modify-writes of knowledge data within the process, the row
+# lock does the same across processes where the database supports it
+_data_lock = threading.Lock()
+
 ####################
 # Knowledge DB Schema
 ####################
@@ -198,6 +203,33 @@ class KnowledgeTable:
             log.exception(e)
             return None
 
+    def add_file_ids_to_knowledge_by_id(
+        self, id: str, file_ids: list[str]
+    ) -> Optional[KnowledgeModel]:
+        """Add files to a knowledge base without losing concurrent additions."""
+        try:
+            with _data_lock, get_db() as db:
+                knowledge = (
+                    db.query(Knowledge).filter_by(id=id).with_for_update().first()
+                )
+                if knowledge is None:
+                    return None
+
+                data = dict(knowledge.data or {})
+                existing_file_ids = list(data.get("file_ids", []))
+                for file_id in file_ids:
+                    if file_id not in existing_file_ids:
+                        existing_file_ids.append(file_id)
+                data["file_ids"] = existing_file_ids
+
+                knowledge.data = data
+                knowledge.updated_at = int(time.time())
+                db.commit()
+            return self.get_knowledge_by_id(id=id)
+        except Exception as e:
+            log.exception(e)
+            return None
+
     def delete_knowledge_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
@@ -173,6 +173,16 @@ class ModelsTable:
         with get_db() as db:
             return [ModelModel.model_validate(model) for model in db.query(Model).all()]
 
+    def get_models_stamp(self) -> tuple:
+        """Fingerprint of all models that changes when any is added, removed or updated."""
+        with get_db() as db:
+            return tuple(
+                tuple(row)
+                for row in db.query(Model.id, Model.updated_at, Model.is_active)
+                .order_by(Model.id)
+                .all()
+            )
+
     def get_models(self) -> list[ModelUserResponse]:
         with get_db() as db:
             models = []
@@ -238,7 +248,12 @@ class ModelsTable:
                 result = (
                     db.query(Model)
                     .filter_by(id=id)
-                    .update(model.model_dump(exclude={"id"}))
+                    .update(
+                        {
+                            **model.model_dump(exclude={"id"}),
+                            "updated_at": int(time.time()),
+                        }
+                    )
                 )
                 db.commit()
 
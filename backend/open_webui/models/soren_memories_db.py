@@ -42,10 +42,14 @@ class SorenMemoriesDB:
             db_path = "/mnt/c/Users/raini/Documents/Programas/soren_def/sorendb.db"
         
         self.db_path = db_path
-        self._ensure_schema()
+        # La tabla se crea con la primera conexión, no al importar el módulo
+        self._schema_ensured = False
         
     def _get_connection(self):
         """Obtiene una conexión a la BD"""
+        if not self._schema_ensured:
+            self._ensure_schema()
+            self._schema_ensured = True
         return sqlite3.connect(self.db_path)
 
     def _ensure_schema(self):
@@ -2,10 +2,19 @@ import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.env import (
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    USER_CACHE_TTL,
+)
 
 
 from open_webui.models.chats import Chats
 from open_webui.models.groups import Groups
+from open_webui.utils.redis import get_sentinels_from_env
+from open_webui.utils.user_cache import UserCache
 
 
 from pydantic import BaseModel, ConfigDict
@@ -115,6 +124,18 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self):
+        # Users resolved by the auth dependencies, invalidated by every write
+        # below that changes a user
+        self.cache = UserCache(
+            USER_CACHE_TTL,
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+            redis_key_prefix=REDIS_KEY_PREFIX,
+        )
+
     def insert_new_user(
         self,
         id: str,
@@ -287,6 +308,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.cache.invalidate(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -301,6 +323,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -320,6 +343,15 @@ class UsersTable:
         except Exception:
             return None
 
+    def update_users_last_active_by_ids(
+        self, ids: list[str], last_active_at: int
+    ) -> None:
+        with get_db() as db:
+            db.query(User).filter(User.id.in_(ids)).update(
+                {"last_active_at": last_active_at}, synchronize_session=False
+            )
+            db.commit()
+
     def update_user_oauth_sub_by_id(
         self, id: str, oauth_sub: str
     ) -> Optional[UserModel]:
@@ -327,6 +359,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -338,6 +371,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -357,6 +391,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                self.cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -375,6 +410,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                self.cache.invalidate(id)
 
                 return True
             else:
@@ -387,6 +423,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.cache.invalidate(id)
                 return True if result == 1 else False
         except Exception:
             return False
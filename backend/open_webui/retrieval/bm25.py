@@ -0,0 +1,401 @@
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from typing import Any, Optional
+
+from open_webui.config import RAG_BM25_INDEX_DIR, RAG_BM25_INDEX_CACHE_SIZE
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def tokenize(text: str) -> list[str]:
+    # Same preprocessing as langchain's BM25Retriever
+    return text.split() if text else []
+
+
+class BM25Index:
+    """
+    Inverted index of a single collection, scored like rank_bm25's BM25Okapi.
+
+    Documents are added and removed in place, only the idf floor for terms that
+    occur in more than half of the documents is recomputed after a change.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # id -> (text, metadata, length)
+        self.documents: dict[str, tuple[str, Any, int]] = {}
+        # term -> {id: term frequency}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_length = 0
+
+        self._average_idf = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, items: list[tuple[str, str, Any]]) -> int:
+        """Add (id, text, metadata) items, replacing documents with the same id."""
+        replaced = 0
+        with self._lock:
+            for id, text, metadata in items:
+                if id in self.documents:
+                    self._remove(id)
+                    replaced += 1
+
+                tokens = tokenize(text)
+                for term, frequency in Counter(tokens).items():
+                    self.postings.setdefault(term, {})[id] = frequency
+
+                self.documents[id] = (text, metadata, len(tokens))
+                self.total_length += len(tokens)
+
+            self._average_idf = None
+        return replaced
+
+    def _remove(self, id: str):
+        text, _, length = self.documents.pop(id)
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= length
+
+    def remove(self, ids: list[str]) -> int:
+        removed = 0
+        with self._lock:
+            for id in ids:
+                if id in self.documents:
+                    self._remove(id)
+                    removed += 1
+
+            self._average_idf = None
+        return removed
+
+    def get_ids_by_filter(self, filter: dict) -> list[str]:
+        with self._lock:
+            return [
+                id
+                for id, (_, metadata, _) in self.documents.items()
+                if isinstance(metadata, dict)
+                and all(metadata.get(key) == value for key, value in filter.items())
+            ]
+
+    def items(self) -> list[tuple[str, str, Any]]:
+        with self._lock:
+            return [
+                (id, text, metadata)
+                for id, (text, metadata, _) in self.documents.items()
+            ]
+
+    def _get_idf(self, frequency: int) -> float:
+        count = len(self.documents)
+        return math.log(count - frequency + 0.5) - math.log(frequency + 0.5)
+
+    def _get_average_idf(self) -> float:
+        if self._average_idf is None:
+            self._average_idf = (
+                sum(self._get_idf(len(posting)) for posting in self.postings.values())
+                / len(self.postings)
+                if self.postings
+                else 0.0
+            )
+        return self._average_idf
+
+    def search(self, query: str, k: int) -> list[tuple[str, Any, float]]:
+        """
+        Return up to k (text, metadata, score) tuples of the best matching
+        documents. Unlike BM25Okapi.get_top_n, documents that share no term with
+        the query are never returned.
+        """
+        with self._lock:
+            if not self.documents:
+                return []
+
+            average_length = self.total_length / len(self.documents) or 1
+            scores = {}
+            for term in tokenize(query):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+
+                idf = self._get_idf(len(posting))
+                if idf < 0:
+                    idf = self.epsilon * self._get_average_idf()
+
+                for id, frequency in posting.items():
+                    length = self.documents[id][2]
+                    scores[id] = scores.get(id, 0.0) + idf * (
+                        frequency
+                        * (self.k1 + 1)
+                        / (
+                            frequency
+                            + self.k1 * (1 - self.b + self.b * length / average_length)
+                        )
+                    )
+
+            results = []
+            for id, score in heapq.nlargest(k, scores.items(), key=itemgetter(1)):
+                text, metadata, _ = self.documents[id]
+                # Callers annotate the metadata (e.g. with the rerank score)
+                results.append((text, dict(metadata) if metadata else {}, float(score)))
+            return results
+
+
+class BM25IndexManager:
+    """
+    Keeps one BM25Index per collection on disk and the `max_size` most recently
+    used ones in memory.
+
+    Every collection is stored as an append-only log of add/delete operations,
+    so inserts only write the new chunks. Logs can be appended to by other
+    workers as well: a loaded index replays the new tail of its log before it
+    is used, and is reloaded when the log was compacted or deleted meanwhile.
+
+    A collection without a log has not been indexed yet and is built from the
+    vector DB the first time it is searched.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+
+        # collection_name -> {"index", "inode", "offset", "removed"}
+        self._indexes: OrderedDict[str, dict] = OrderedDict()
+        # Bumped by every change, to discard indexes built from a stale fetch
+        self._generations: dict[str, int] = {}
+        self._resets = 0
+        self._lock = threading.RLock()
+
+    def _get_path(self, collection_name: str) -> str:
+        return os.path.join(
+            self.path, f"{hashlib.sha256(collection_name.encode()).hexdigest()}.jsonl"
+        )
+
+    @staticmethod
+    def _apply(entry: dict, operation: dict):
+        index = entry["index"]
+        if "add" in operation:
+            entry["removed"] += index.add(operation["add"])
+        if "delete" in operation:
+            entry["removed"] += index.remove(operation["delete"])
+
+    def _load(self, collection_name: str) -> Optional[dict]:
+        path = self._get_path(collection_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._indexes.pop(collection_name, None)
+            return None
+
+        entry = self._indexes.get(collection_name)
+        if (
+            entry is None
+            or entry["inode"] != stat.st_ino
+            or entry["offset"] > stat.st_size
+        ):
+            entry = {
+                "index": BM25Index(),
+                "inode": stat.st_ino,
+                "offset": 0,
+                "removed": 0,
+            }
+
+        if entry["offset"] < stat.st_size:
+            with open(path, "rb") as f:
+                f.seek(entry["offset"])
+                data = f.read()
+
+            # Ignore a trailing line that is still being written
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if line.strip():
+                    self._apply(entry, json.loads(line))
+            entry["offset"] += end
+
+        self._indexes[collection_name] = entry
+        self._indexes.move_to_end(collection_name)
+        while len(self._indexes) > self.max_size:
+            self._indexes.popitem(last=False)
+
+        return entry
+
+    def _write(self, collection_name: str, items: list[tuple[str, str, Any]]):
+        os.makedirs(self.path, exist_ok=True)
+
+        path = self._get_path(collection_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"add": items}, default=str) + "\n")
+        os.replace(tmp_path, path)
+
+        self._indexes.pop(collection_name, None)
+
+    def _append(self, collection_name: str, operation: dict):
+        entry = self._load(collection_name)
+        if entry is None:
+            return
+
+        with open(self._get_path(collection_name), "ab") as f:
+            f.write((json.dumps(operation, default=str) + "\n").encode("utf-8"))
+
+        entry = self._load(collection_name)
+        if entry is not None and entry["removed"] > max(len(entry["index"]), 1000):
+            # Most of the log is dead weight, rewrite it with the live documents
+            self._write(collection_name, entry["index"].items())
+
+    def _drop(self, collection_name: str):
+        self._indexes.pop(collection_name, None)
+        try:
+            os.remove(self._get_path(collection_name))
+        except FileNotFoundError:
+            pass
+
+    def _bump(self, collection_name: str):
+        self._generations[collection_name] = (
+            self._generations.get(collection_name, 0) + 1
+        )
+
+    def _get_generation(self, collection_name: str) -> tuple[int, int]:
+        return self._resets, self._generations.get(collection_name, 0)
+
+    def get(self, collection_name: str, build: bool = True) -> Optional[BM25Index]:
+        """
+        Return the index of a collection. Without `build`, a collection that
+        was not indexed yet is not fetched to build it and None is returned.
+        """
+        with self._lock:
+            entry = self._load(collection_name)
+            if entry is not None:
+                return entry["index"]
+            if not build:
+                return None
+            generation = self._get_generation(collection_name)
+
+        return self._build(collection_name, generation)
+
+    def rebuild(self, collection_name: str) -> Optional[BM25Index]:
+        """
+        Build the index of a collection from the vector DB again, e.g. after its
+        chunks were replaced. The existing index is used until the new one is
+        complete and replaces it.
+        """
+        with self._lock:
+            generation = self._get_generation(collection_name)
+
+        return self._build(collection_name, generation, drop_if_changed=True)
+
+    def _build(
+        self,
+        collection_name: str,
+        generation: tuple[int, int],
+        drop_if_changed: bool = False,
+    ) -> Optional[BM25Index]:
+        log.debug(f"BM25IndexManager:building index for collection {collection_name}")
+        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        if result is None:
+            return None
+
+        index = BM25Index()
+        items = list(zip(result.ids[0], result.documents[0], result.metadatas[0]))
+        index.add(items)
+
+        with self._lock:
+            if self._get_generation(collection_name) == generation:
+                try:
+                    self._write(collection_name, items)
+                except Exception as e:
+                    log.exception(
+                        f"Error saving BM25 index of collection {collection_name}: {e}"
+                    )
+            elif drop_if_changed:
+                # The fetch may have missed the change, build it when searched
+                self._bump(collection_name)
+                self._drop(collection_name)
+        return index
+
+    def add(self, collection_name: str, items: list[dict], create: bool = False):
+        """
+        Add vector items to the index of a collection. With `create`, the items
+        are the whole collection and replace any existing index, otherwise they
+        are only added to an index that already exists.
+        """
+        items = [(item["id"], item["text"], item["metadata"]) for item in items]
+        with self._lock:
+            self._bump(collection_name)
+            try:
+                if create:
+                    self._write(collection_name, items)
+                else:
+                    self._append(collection_name, {"add": items})
+            except Exception as e:
+                log.exception(
+                    f"Error updating BM25 index of collection {collection_name}: {e}"
+                )
+                self._drop(collection_name)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        with self._lock:
+            self._bump(collection_name)
+            try:
+                entry = self._load(collection_name)
+                if entry is None:
+                    return
+
+                if ids is None and filter is None:
+                    self._drop(collection_name)
+                    return
+
+                if filter:
+                    ids = [
+                        *(ids or []),
+                        *entry["index"].get_ids_by_filter(filter),
+                    ]
+                if ids:
+                    self._append(collection_name, {"delete": ids})
+            except Exception as e:
+                log.exception(
+                    f"Error updating BM25 index of collection {collection_name}: {e}"
+                )
+                self._drop(collection_name)
+
+    def delete_collection(self, collection_name: str):
+        with self._lock:
+            self._bump(collection_name)
+            self._drop(collection_name)
+
+    def reset(self):
+        with self._lock:
+            self._resets += 1
+            self._generations.clear()
+            self._indexes.clear()
+
+            if os.path.isdir(self.path):
+                for filename in os.listdir(self.path):
+                    try:
+                        os.remove(os.path.join(self.path, filename))
+                    except OSError as e:
+                        log.warning(f"Error removing BM25 index {filename}: {e}")
+
+
+BM25_INDEXES = BM25IndexManager(RAG_BM25_INDEX_DIR, RAG_BM25_INDEX_CACHE_SIZE)
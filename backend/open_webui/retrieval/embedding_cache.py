@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional, Union
+
+from open_webui.config import (
+    ENABLE_RAG_EMBEDDING_CACHE,
+    RAG_EMBEDDING_CACHE_DIR,
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_DISK_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Keeps the number of SQL variables per lookup below SQLite's limit
+LOOKUP_BATCH_SIZE = 500
+# Number of inserts between checks of the size of the disk store
+PRUNE_INTERVAL = 1000
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embeddings, keyed by the engine, model, prefix
+    and text they were generated from.
+
+    The most recently used embeddings are kept in memory, all of them in a
+    SQLite database that is shared by the workers and survives restarts. The
+    vectors are stored as float32, which is what the embedding models return.
+    """
+
+    def __init__(self, path: str, max_size: int, max_disk_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._embeddings: OrderedDict[str, list[float]] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        return hashlib.sha256(
+            json.dumps([engine, model, prefix, text]).encode("utf-8")
+        ).hexdigest()
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.path, exist_ok=True)
+            db = sqlite3.connect(
+                os.path.join(self.path, "embeddings.db"),
+                timeout=30,
+                check_same_thread=False,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, vector: list[float]):
+        self._embeddings[key] = vector
+        self._embeddings.move_to_end(key)
+        while len(self._embeddings) > self.max_size:
+            self._embeddings.popitem(last=False)
+
+    def _load(self, keys: list[str]) -> dict[str, list[float]]:
+        vectors = {}
+        db = self._get_db()
+        for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[i : i + LOOKUP_BATCH_SIZE]
+            rows = db.execute(
+                f"SELECT key, vector FROM embedding WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                vectors[key] = vector.tolist()
+        return vectors
+
+    def _store(self, vectors: dict[str, list[float]]):
+        db = self._get_db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO embedding (key, vector) VALUES (?, ?)",
+                [
+                    (key, array("f", vector).tobytes())
+                    for key, vector in vectors.items()
+                ],
+            )
+
+        self._inserts += len(vectors)
+        if self._inserts >= PRUNE_INTERVAL:
+            self._inserts = 0
+            # Rows are replaced on insert, so the lowest rowids are the oldest
+            with db:
+                db.execute(
+                    "DELETE FROM embedding WHERE rowid <= (SELECT MAX(rowid) FROM embedding) - ?",
+                    (self.max_disk_size,),
+                )
+
+    def get_embeddings(
+        self,
+        engine: str,
+        model: str,
+        text: Union[str, list[str]],
+        prefix: Optional[str],
+        embed: Callable[[list[str]], Optional[list[list[float]]]],
+    ):
+        """
+        Return the embeddings of `text` like the embedding function would,
+        calling `embed` with the texts that are not cached only.
+        """
+        texts = [text] if isinstance(text, str) else text
+        keys = [self.get_key(engine, model, prefix, t) for t in texts]
+
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._embeddings:
+                    self._embeddings.move_to_end(key)
+                    vectors[key] = self._embeddings[key]
+
+        missing_keys = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing_keys:
+            try:
+                with self._lock:
+                    loaded = self._load(missing_keys)
+                    for key, vector in loaded.items():
+                        self._remember(key, vector)
+                vectors.update(loaded)
+            except sqlite3.Error as e:
+                log.warning(f"Error reading the embedding cache: {e}")
+
+        # Embed every missing text once, even if it occurs several times
+        missing_texts = {}
+        for key, t in zip(keys, texts):
+            if key not in vectors:
+                missing_texts.setdefault(key, t)
+
+        self.hits += len(texts) - len(missing_texts)
+        self.misses += len(missing_texts)
+
+        if missing_texts:
+            embeddings = embed(list(missing_texts.values()))
+            if embeddings is None:
+                return None
+            if len(embeddings) != len(missing_texts):
+                # zip() would silently cache vectors under the wrong texts
+                raise ValueError(
+                    f"Expected {len(missing_texts)} embeddings from {engine} model {model}, got {len(embeddings)}"
+                )
+
+            new_vectors = dict(zip(missing_texts.keys(), embeddings))
+            vectors.update(new_vectors)
+            try:
+                with self._lock:
+                    for key, vector in new_vectors.items():
+                        self._remember(key, vector)
+                    self._store(new_vectors)
+            except sqlite3.Error as e:
+                log.warning(f"Error writing the embedding cache: {e}")
+
+        embeddings = [vectors[key] for key in keys]
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+
+EMBEDDING_CACHE = (
+    EmbeddingCache(
+        RAG_EMBEDDING_CACHE_DIR, RAG_EMBEDDING_CACHE_SIZE, RAG_EMBEDDING_CACHE_DISK_SIZE
+    )
+    if ENABLE_RAG_EMBEDDING_CACHE
+    else None
+)
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Request
+
+from open_webui.config import (
+    INGESTION_WORKERS,
+    INGESTION_LANES,
+    INGESTION_MAX_ATTEMPTS,
+    INGESTION_JOB_TIMEOUT,
+)
+from open_webui.constants import ERROR_MESSAGES
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.models.files import Files
+from open_webui.models.ingestion_jobs import IngestionJobModel, IngestionJobs
+from open_webui.models.knowledge import Knowledges
+from open_webui.models.users import Users
+from open_webui.routers.files import process_uploaded_file
+from open_webui.routers.retrieval import ProcessFileForm, process_file
+from open_webui.socket.main import sio, USER_POOL
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Seconds between polls of an idle worker
+POLL_INTERVAL = 1
+HEARTBEAT_INTERVAL = 30
+# Delay before the second attempt of a failed job, doubled for every attempt
+RETRY_DELAY = 10
+
+
+class JobError(Exception):
+    """An error that retrying the job would not fix."""
+
+
+class IngestionQueue:
+    """
+    Processes file uploads and knowledge base additions in the background.
+
+    Jobs are persisted in the ingestion_job table, so workers can run in the
+    API processes as well as on dedicated nodes that share the database. A
+    worker takes jobs from its lanes in order, e.g. interactive uploads before
+    bulk knowledge base imports, keeps a heartbeat on the job it processes,
+    and retries failed jobs with an exponential backoff. Status changes are
+    sent to the user as `ingestion-events` over the socket.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        lanes: list[str],
+        max_attempts: int,
+        timeout: int,
+    ):
+        self.workers = workers
+        self.lanes = lanes
+        self.max_attempts = max(max_attempts, 1)
+        self.timeout = timeout
+
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, app: FastAPI):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for idx in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._work(app, f"{prefix}:{idx}")))
+
+        if self.workers > 0:
+            log.info(f"Started {self.workers} ingestion workers for {self.lanes}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def serve(self, app: FastAPI):
+        """Run the workers until cancelled, for dedicated worker nodes."""
+        self.start(app)
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def _emit(self, job: IngestionJobModel):
+        try:
+            session_ids = await USER_POOL.aget_cached(job.user_id, [])
+            if session_ids:
+                await sio.emit(
+                    "ingestion-events",
+                    {
+                        "job_id": job.id,
+                        "file_id": job.file_id,
+                        "knowledge_id": job.knowledge_id,
+                        "status": job.status,
+                        "attempts": job.attempts,
+                        "error": job.error,
+                    },
+                    to=session_ids,
+                )
+        except Exception as e:
+            log.debug(f"Error sending ingestion event of job {job.id}: {e}")
+
+    async def _heartbeat(self, job: IngestionJobModel, worker_id: str):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await asyncio.to_thread(IngestionJobs.touch_job_by_id, job.id, worker_id)
+
+    async def _work(self, app: FastAPI, worker_id: str):
+        request = Request({"type": "http", "app": app})
+        while True:
+            try:
+                job = await asyncio.to_thread(
+                    IngestionJobs.claim_next_job,
+                    worker_id,
+                    self.lanes,
+                    self.timeout,
+                    self.max_attempts,
+                )
+            except Exception as e:
+                log.error(f"Error claiming an ingestion job: {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            log.info(f"Processing ingestion job {job.id} of file {job.file_id}")
+            await self._emit(job)
+
+            heartbeat = asyncio.create_task(self._heartbeat(job, worker_id))
+            try:
+                await asyncio.to_thread(self._process, request, job)
+                job = await asyncio.to_thread(
+                    IngestionJobs.update_job_status_by_id,
+                    job.id,
+                    "completed",
+                    worker_id=worker_id,
+                )
+            except asyncio.CancelledError:
+                # Picked up again by a worker once its heartbeat times out
+                raise
+            except Exception as e:
+                job = await asyncio.to_thread(self._fail, job, e)
+            finally:
+                heartbeat.cancel()
+
+            if job is not None:
+                await self._emit(job)
+            else:
+                log.warning(f"Ingestion job was taken over from worker {worker_id}")
+
+    def _fail(
+        self, job: IngestionJobModel, error: Exception
+    ) -> Optional[IngestionJobModel]:
+        error_message = str(error.detail) if hasattr(error, "detail") else str(error)
+        if isinstance(error, JobError) or job.attempts >= self.max_attempts:
+            log.error(f"Ingestion job {job.id} failed: {error_message}")
+            return IngestionJobs.update_job_status_by_id(
+                job.id, "failed", error=error_message, worker_id=job.worker_id
+            )
+
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        log.warning(
+            f"Ingestion job {job.id} failed, retrying in {delay}s: {error_message}"
+        )
+        return IngestionJobs.update_job_status_by_id(
+            job.id,
+            "pending",
+            error=error_message,
+            scheduled_at=int(time.time()) + delay,
+            worker_id=job.worker_id,
+        )
+
+    def _process(self, request: Request, job: IngestionJobModel):
+        user = Users.get_user_by_id(job.user_id)
+        file = Files.get_file_by_id(job.file_id)
+        if user is None or file is None:
+            raise JobError(ERROR_MESSAGES.NOT_FOUND)
+
+        if job.knowledge_id is None:
+            process_uploaded_file(
+                request, file, (job.data or {}).get("metadata", {}), user
+            )
+            return
+
+        if Knowledges.get_knowledge_by_id(id=job.knowledge_id) is None:
+            raise JobError(ERROR_MESSAGES.NOT_FOUND)
+        if not file.data:
+            raise JobError(ERROR_MESSAGES.FILE_NOT_PROCESSED)
+
+        process_file(
+            request,
+            ProcessFileForm(file_id=file.id, collection_name=job.knowledge_id),
+            user=user,
+        )
+        if (
+            Knowledges.add_file_ids_to_knowledge_by_id(job.knowledge_id, [file.id])
+            is None
+        ):
+            raise Exception(ERROR_MESSAGES.DEFAULT("knowledge"))
+
+
+INGESTION_QUEUE = IngestionQueue(
+    INGESTION_WORKERS, INGESTION_LANES, INGESTION_MAX_ATTEMPTS, INGESTION_JOB_TIMEOUT
+)
+
+
+if __name__ == "__main__":
+    # Dedicated worker node: loads the app for its configuration and models,
+    # without serving any requests
+    from open_webui.main import app
+    from open_webui.retrieval.ingestion import INGESTION_QUEUE
+
+    asyncio.run(INGESTION_QUEUE.serve(app))
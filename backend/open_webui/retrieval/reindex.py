@@ -0,0 +1,497 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import Request
+from langchain_core.documents import Document
+
+from open_webui.config import (
+    RAG_EMBEDDING_CONTENT_PREFIX,
+    RAG_REINDEX_DIR,
+    RAG_REINDEX_WORKERS,
+    RAG_REINDEX_BATCH_SIZE,
+)
+from open_webui.constants import ERROR_MESSAGES
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.models.files import Files
+from open_webui.models.knowledge import Knowledges
+from open_webui.models.users import Users
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.routers.retrieval import get_docs_metadatas, split_docs
+from open_webui.utils.misc import calculate_sha256_string
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# A lock that was not refreshed for this long belongs to a job that died
+LOCK_TIMEOUT = 120
+HEARTBEAT_INTERVAL = 30
+
+
+class KnowledgeReindexJob:
+    """
+    Re-embeds the files of all knowledge bases in the background, e.g. after
+    the embedding model was changed.
+
+    A pool of workers embeds the chunks of several files per call. Knowledge
+    bases are reindexed one after another, and the collection of a knowledge
+    base is dropped right before the first of its new chunks is inserted: the
+    new model may have another dimension than the vectors in the collection,
+    and vector DBs fix the dimension of a collection when creating it. The
+    keyword index of a knowledge base keeps serving its old chunks until all of
+    its files are done, then it is rebuilt from the new collection.
+
+    Progress is checkpointed to disk after every batch. The job runs in one
+    worker process at a time, guarded by a lock file that it keeps touching,
+    and a job interrupted by a restart resumes with the files it had not
+    finished. Any worker can cancel it by creating a cancel file, which the
+    job checks between batches.
+    """
+
+    def __init__(self, path: str, workers: int, batch_size: int):
+        self.path = path
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+
+        self.state: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._clear_lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._stopped = threading.Event()
+        # knowledge_id -> number of files left to reindex
+        self._remaining = Counter()
+
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.path, "state.json")
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self.path, "lock")
+
+    @property
+    def _cancel_path(self) -> str:
+        return os.path.join(self.path, "cancel")
+
+    def _read_state(self) -> Optional[dict]:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Error reading reindex state: {e}")
+            return None
+
+    def _save_state(self):
+        with self._lock:
+            self.state["updated_at"] = int(time.time())
+
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self._state_path)
+
+    def _is_locked(self) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self._lock_path) < LOCK_TIMEOUT
+        except FileNotFoundError:
+            return False
+
+    def _acquire(self) -> bool:
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.exists(self._lock_path) and not self._is_locked():
+            log.info("Removing stale reindex lock")
+            try:
+                os.remove(self._lock_path)
+            except FileNotFoundError:
+                pass
+
+        try:
+            fd = os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _release(self):
+        try:
+            os.remove(self._lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _heartbeat(self):
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                os.utime(self._lock_path)
+            except OSError as e:
+                log.warning(f"Error refreshing reindex lock: {e}")
+
+    def get_status(self) -> Optional[dict]:
+        # The job may be running in another worker, so always read the checkpoint
+        state = self._read_state()
+        if state is None:
+            return None
+
+        if state["status"] == "running" and not self._is_locked():
+            state["status"] = "interrupted"
+
+        tasks = state.pop("tasks", None)
+        done = state.pop("done", [])
+        return {
+            **state,
+            "total_files": len(tasks) if tasks is not None else None,
+            "processed_files": len(done),
+        }
+
+    def start(self, request: Request, user) -> bool:
+        """
+        Start reindexing all knowledge bases, or resume an interrupted job that
+        used the same embedding model. Returns False if a job is running.
+        """
+        if not self._acquire():
+            return False
+
+        try:
+            state = self._read_state()
+            if (
+                state is None
+                or state["status"] != "running"
+                or state["embedding_engine"]
+                != request.app.state.config.RAG_EMBEDDING_ENGINE
+                or state["embedding_model"]
+                != request.app.state.config.RAG_EMBEDDING_MODEL
+            ):
+                state = {
+                    "id": str(uuid.uuid4()),
+                    "status": "running",
+                    "user_id": user.id,
+                    "embedding_engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
+                    "embedding_model": request.app.state.config.RAG_EMBEDDING_MODEL,
+                    "tasks": None,
+                    "done": [],
+                    "failed_files": [],
+                    "deleted_knowledge_bases": [],
+                    "cleared_knowledge_bases": [],
+                    "error": None,
+                    "created_at": int(time.time()),
+                    "updated_at": int(time.time()),
+                }
+
+            self.state = state
+            self._save_state()
+        except Exception:
+            self._release()
+            raise
+
+        self._run_in_background(request)
+        return True
+
+    def resume(self, request: Request) -> bool:
+        """Resume a job that was interrupted, e.g. by a restart."""
+        state = self._read_state()
+        if state is None or state["status"] != "running" or self._is_locked():
+            return False
+
+        if not self._acquire():
+            return False
+
+        self.state = self._read_state()
+        if self.state is None or self.state["status"] != "running":
+            self._release()
+            return False
+
+        log.info(f"Resuming knowledge base reindex {self.state['id']}")
+        self._run_in_background(request)
+        return True
+
+    def cancel(self) -> bool:
+        # The job may be running in another worker, which checks the cancel file
+        status = self.get_status()
+        if status is None or status["status"] != "running":
+            return False
+
+        self._cancel.set()
+        with open(self._cancel_path, "w"):
+            pass
+        return True
+
+    def _is_cancelled(self) -> bool:
+        if not self._cancel.is_set() and os.path.exists(self._cancel_path):
+            self._cancel.set()
+        return self._cancel.is_set()
+
+    def _clear_cancel(self):
+        self._cancel.clear()
+        try:
+            os.remove(self._cancel_path)
+        except FileNotFoundError:
+            pass
+
+    def _run_in_background(self, request: Request):
+        self._clear_cancel()
+        self._stopped.clear()
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+        threading.Thread(target=self._run, args=(request,), daemon=True).start()
+
+    def _plan(self):
+        knowledge_bases = Knowledges.get_knowledge_bases()
+        log.info(f"Starting reindexing for {len(knowledge_bases)} knowledge bases")
+
+        tasks = []
+        for knowledge_base in knowledge_bases:
+            # -- Robust error handling for missing or invalid data
+            if not knowledge_base.data or not isinstance(knowledge_base.data, dict):
+                log.warning(
+                    f"Knowledge base {knowledge_base.id} has no data or invalid data ({knowledge_base.data!r}). Deleting."
+                )
+                try:
+                    Knowledges.delete_knowledge_by_id(id=knowledge_base.id)
+                    self.state["deleted_knowledge_bases"].append(knowledge_base.id)
+                except Exception as e:
+                    log.error(
+                        f"Failed to delete invalid knowledge base {knowledge_base.id}: {e}"
+                    )
+                continue
+
+            files = Files.get_file_metadatas_by_ids(
+                knowledge_base.data.get("file_ids", [])
+            )
+            tasks.extend([knowledge_base.id, file.id] for file in files)
+
+        self.state["tasks"] = tasks
+
+    def _run(self, request: Request):
+        try:
+            if self.state["tasks"] is None:
+                self._plan()
+                self._save_state()
+
+            user = Users.get_user_by_id(self.state["user_id"])
+
+            done = set(self.state["done"])
+            pending = queue.Queue()
+            self._remaining = Counter()
+            for knowledge_id, file_id in self.state["tasks"]:
+                if f"{knowledge_id}/{file_id}" not in done:
+                    pending.put((knowledge_id, file_id))
+                    self._remaining[knowledge_id] += 1
+
+            # Knowledge bases whose files were all done before a restart
+            for knowledge_id in self.state["cleared_knowledge_bases"]:
+                if not self._remaining[knowledge_id]:
+                    self._index_knowledge_base(knowledge_id)
+
+            log.info(
+                f"Reindexing {pending.qsize()} of {len(self.state['tasks'])} files with {self.workers} workers"
+            )
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(self._work, request, user, pending)
+                    for _ in range(self.workers)
+                ]
+                for future in futures:
+                    future.result()
+
+            self.state["status"] = "cancelled" if self._is_cancelled() else "completed"
+            log.info(
+                f"Reindexing {self.state['status']}. Deleted {len(self.state['deleted_knowledge_bases'])} invalid knowledge bases: {self.state['deleted_knowledge_bases']}"
+            )
+        except Exception as e:
+            log.exception(f"Error reindexing knowledge bases: {e}")
+            self.state["status"] = "failed"
+            self.state["error"] = str(e)
+        finally:
+            try:
+                # Knowledge bases left unfinished by a cancel or an error
+                for knowledge_id in self.state["cleared_knowledge_bases"]:
+                    if self._remaining[knowledge_id]:
+                        self._index_knowledge_base(knowledge_id)
+
+                self._save_state()
+            finally:
+                self._stopped.set()
+                self._clear_cancel()
+                self._release()
+
+    def _work(self, request: Request, user, pending: queue.Queue):
+        while not self._is_cancelled():
+            batch = []
+            size = 0
+            while size < self.batch_size:
+                try:
+                    task = pending.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    texts, metadatas = self._prepare(request, *task)
+                    batch.append((task, texts, metadatas))
+                    size += len(texts)
+                except Exception as e:
+                    self._finish(task, e)
+
+            if not batch:
+                break
+
+            try:
+                self._save_batch(request, user, batch)
+            except Exception as e:
+                log.exception(f"Error reindexing batch of {len(batch)} files: {e}")
+                for task, _, _ in batch:
+                    self._finish(task, e)
+
+            self._save_state()
+
+    def _prepare(
+        self, request: Request, knowledge_id: str, file_id: str
+    ) -> tuple[list[str], list[dict]]:
+        file = Files.get_file_by_id(file_id)
+        if file is None:
+            raise ValueError(ERROR_MESSAGES.NOT_FOUND)
+
+        # Same source as adding a file to a knowledge base, see process_file
+        result = VECTOR_DB_CLIENT.query(
+            collection_name=f"file-{file.id}", filter={"file_id": file.id}
+        )
+
+        if result is not None and len(result.ids[0]) > 0:
+            docs = [
+                Document(
+                    page_content=result.documents[0][idx],
+                    metadata=result.metadatas[0][idx],
+                )
+                for idx, id in enumerate(result.ids[0])
+            ]
+        else:
+            docs = [
+                Document(
+                    page_content=file.data.get("content", ""),
+                    metadata={
+                        **file.meta,
+                        "name": file.filename,
+                        "created_by": file.user_id,
+                        "file_id": file.id,
+                        "source": file.filename,
+                    },
+                )
+            ]
+
+        docs = split_docs(request, docs)
+        if len(docs) == 0:
+            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+
+        texts = [doc.page_content for doc in docs]
+        metadatas = get_docs_metadatas(
+            request,
+            docs,
+            {
+                "file_id": file.id,
+                "name": file.filename,
+                "hash": calculate_sha256_string(file.data.get("content", "")),
+            },
+        )
+        return texts, metadatas
+
+    def _save_batch(self, request: Request, user, batch: list[tuple]):
+        # Embed the chunks of all files of the batch together
+        embeddings = request.app.state.EMBEDDING_FUNCTION(
+            [text.replace("\n", " ") for _, texts, _ in batch for text in texts],
+            prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+            user=user,
+        )
+
+        offset = 0
+        for task, texts, metadatas in batch:
+            items = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "text": text,
+                    "vector": embeddings[offset + idx],
+                    "metadata": metadatas[idx],
+                }
+                for idx, text in enumerate(texts)
+            ]
+            offset += len(texts)
+
+            try:
+                self._save_file_items(*task, items)
+                self._finish(task)
+            except Exception as e:
+                self._finish(task, e)
+
+    def _clear_knowledge_base(self, knowledge_id: str):
+        """Drop the old collection of a knowledge base, once per job."""
+        with self._clear_lock:
+            if knowledge_id in self.state["cleared_knowledge_bases"]:
+                return
+
+            if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_id):
+                VECTOR_DB_CLIENT.delete_collection(collection_name=knowledge_id)
+
+            with self._lock:
+                self.state["cleared_knowledge_bases"].append(knowledge_id)
+            # Checkpoint it, a resumed job must not drop the new chunks
+            self._save_state()
+
+    def _save_file_items(self, knowledge_id: str, file_id: str, items: list[dict]):
+        self._clear_knowledge_base(knowledge_id)
+
+        # Items left behind by an interrupted run of this file
+        if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_id):
+            VECTOR_DB_CLIENT.delete(
+                collection_name=knowledge_id, filter={"file_id": file_id}
+            )
+
+        VECTOR_DB_CLIENT.insert(collection_name=knowledge_id, items=items)
+
+    def _index_knowledge_base(self, knowledge_id: str):
+        """Replace the keyword index of a knowledge base with its new chunks."""
+        if knowledge_id not in self.state["cleared_knowledge_bases"]:
+            return
+
+        try:
+            if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_id):
+                BM25_INDEXES.rebuild(knowledge_id)
+            else:
+                BM25_INDEXES.delete_collection(knowledge_id)
+        except Exception as e:
+            log.exception(f"Error rebuilding keyword index of {knowledge_id}: {e}")
+            # Built from the vector DB when searched
+            BM25_INDEXES.delete_collection(knowledge_id)
+
+    def _finish(self, task: tuple[str, str], error: Optional[Exception] = None):
+        knowledge_id, file_id = task
+        with self._lock:
+            self.state["done"].append(f"{knowledge_id}/{file_id}")
+            if error is not None:
+                log.error(f"Error reindexing file {file_id} of {knowledge_id}: {error}")
+                self.state["failed_files"].append(
+                    {
+                        "knowledge_id": knowledge_id,
+                        "file_id": file_id,
+                        "error": str(error),
+                    }
+                )
+
+            self._remaining[knowledge_id] -= 1
+            finished = self._remaining[knowledge_id] == 0
+
+        if finished:
+            self._index_knowledge_base(knowledge_id)
+
+
+REINDEX_JOB = KnowledgeReindexJob(
+    RAG_REINDEX_DIR, RAG_REINDEX_WORKERS, RAG_REINDEX_BATCH_SIZE
+)
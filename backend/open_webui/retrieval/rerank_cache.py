@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from open_webui.config import RAG_RERANKING_CACHE_SIZE
+
+
+class RerankScoreCache:
+    """
+    In-memory LRU cache of reranker scores, keyed by the engine, model, query
+    and chunk content they were computed from.
+
+    Follow-up questions and generated queries tend to retrieve the same chunks
+    for the same queries again, which then skip the reranker.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._scores: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(engine: str, model: str, query: str, document: str) -> str:
+        return hashlib.sha256(
+            json.dumps([engine, model, query, document]).encode("utf-8")
+        ).hexdigest()
+
+    def get_scores(
+        self,
+        engine: str,
+        model: str,
+        sentences: list[tuple[str, str]],
+        predict: Callable[[list[tuple[str, str]]], list[float]],
+    ) -> list[float]:
+        """
+        Return the scores of the (query, document) pairs like the reranking
+        function would, calling `predict` with the pairs that are not cached only.
+        """
+        keys = [self.get_key(engine, model, query, doc) for query, doc in sentences]
+
+        scores = {}
+        with self._lock:
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[key] = self._scores[key]
+
+        missing_sentences = {}
+        for key, sentence in zip(keys, sentences):
+            if key not in scores:
+                missing_sentences.setdefault(key, sentence)
+
+        self.hits += len(sentences) - len(missing_sentences)
+        self.misses += len(missing_sentences)
+
+        if missing_sentences:
+            new_scores = predict(list(missing_sentences.values()))
+            if not isinstance(new_scores, list):
+                new_scores = new_scores.tolist()
+
+            with self._lock:
+                for key, score in zip(missing_sentences.keys(), new_scores):
+                    scores[key] = float(score)
+                    self._scores[key] = float(score)
+                    self._scores.move_to_end(key)
+                while len(self._scores) > self.max_size:
+                    self._scores.popitem(last=False)
+
+        return [scores[key] for key in keys]
+
+
+RERANK_SCORE_CACHE = (
+    RerankScoreCache(RAG_RERANKING_CACHE_SIZE) if RAG_RERANKING_CACHE_SIZE > 0 else None
+)
@@ -4,16 +4,26 @@ from typing import Optional, Union
 
 import requests
 import hashlib
+import asyncio
+import random
+import re
+import threading
 from concurrent.futures import ThreadPoolExecutor
 import time
 
+import aiohttp
+import numpy as np
+
 from urllib.parse import quote
 from huggingface_hub import snapshot_download
-from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+from langchain.retrievers import EnsembleRetriever
 from langchain_core.documents import Document
 
-from open_webui.config import VECTOR_DB
+from open_webui.config import VECTOR_DB, ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE
+from open_webui.retrieval.bm25 import BM25_INDEXES, BM25Index
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.models.base_reranker import BaseReranker
+from open_webui.retrieval.rerank_cache import RERANK_SCORE_CACHE
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 
 from open_webui.models.users import UserModel
@@ -21,7 +31,6 @@ from open_webui.models.files import Files
 from open_webui.models.knowledge import Knowledges
 from open_webui.models.notes import Notes
 
-from open_webui.retrieval.vector.main import GetResult
 from open_webui.utils.access_control import has_access
 
 
@@ -34,7 +43,11 @@ from open_webui.config import (
     RAG_EMBEDDING_QUERY_PREFIX,
     RAG_EMBEDDING_CONTENT_PREFIX,
     RAG_EMBEDDING_PREFIX_FIELD_NAME,
+    RAG_EMBEDDING_CONCURRENT_REQUESTS,
+    RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    RAG_EMBEDDING_MAX_RETRIES,
 )
+from open_webui.utils.session_pool import SESSION_POOL
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
@@ -78,6 +91,22 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    top_k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return [
+            Document(metadata=metadata, page_content=text)
+            for text, metadata, _ in self.index.search(query, self.top_k)
+        ]
+
+
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -112,9 +141,130 @@ def get_doc(collection_name: str, user: UserModel = None):
         raise e
 
 
+def get_hybrid_search_candidates(
+    collection_name: str,
+    bm25_index: Optional[BM25Index],
+    query: str,
+    embedding_function,
+    k: int,
+    hybrid_bm25_weight: float,
+) -> list[Document]:
+    log.debug(f"get_hybrid_search_candidates:doc {collection_name}")
+    bm25_retriever = BM25IndexRetriever(index=bm25_index, top_k=k)
+
+    # Both retrievers only return their top k candidates, which are fused
+    # by weighted reciprocal rank before reranking
+    vector_search_retriever = VectorSearchRetriever(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        top_k=k,
+    )
+
+    if hybrid_bm25_weight <= 0 or bm25_index is None:
+        # No keyword index, see ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[vector_search_retriever], weights=[1.0]
+        )
+    elif hybrid_bm25_weight >= 1:
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[bm25_retriever], weights=[1.0]
+        )
+    else:
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[bm25_retriever, vector_search_retriever],
+            weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
+        )
+
+    return ensemble_retriever.invoke(query)
+
+
+def get_rerank_scores(
+    query_documents: list[tuple[str, list[Document]]],
+    embedding_function,
+    reranking_function,
+) -> list[list[float]]:
+    """
+    Score the candidates of several queries at once. Every distinct (query,
+    chunk) pair is only scored once, with a single call to the reranker (one
+    per query for rerankers scoring a single query per call), or without one a
+    single embedding call for the queries and one for the chunks.
+    """
+    pairs = list(
+        dict.fromkeys(
+            (query, doc.page_content)
+            for query, documents in query_documents
+            for doc in documents
+        )
+    )
+    if not pairs:
+        return [[] for _ in query_documents]
+
+    if reranking_function is not None:
+        scores = reranking_function(pairs)
+        if not isinstance(scores, list):
+            scores = scores.tolist()
+        pair_scores = dict(zip(pairs, scores))
+    else:
+        queries = list(dict.fromkeys(query for query, _ in pairs))
+        contents = list(dict.fromkeys(content for _, content in pairs))
+
+        # The chunks were embedded on ingestion, these are embedding cache hits
+        query_embeddings = np.asarray(
+            embedding_function(queries, RAG_EMBEDDING_QUERY_PREFIX), dtype=np.float32
+        )
+        content_embeddings = np.asarray(
+            embedding_function(contents, RAG_EMBEDDING_CONTENT_PREFIX),
+            dtype=np.float32,
+        )
+
+        # Cosine similarity of every query with every chunk
+        query_embeddings /= np.maximum(
+            np.linalg.norm(query_embeddings, axis=1, keepdims=True), 1e-12
+        )
+        content_embeddings /= np.maximum(
+            np.linalg.norm(content_embeddings, axis=1, keepdims=True), 1e-12
+        )
+        similarities = query_embeddings @ content_embeddings.T
+
+        query_idx = {query: i for i, query in enumerate(queries)}
+        content_idx = {content: i for i, content in enumerate(contents)}
+        pair_scores = {
+            (query, content): similarities[query_idx[query], content_idx[content]]
+            for query, content in pairs
+        }
+
+    return [
+        [float(pair_scores[(query, doc.page_content)]) for doc in documents]
+        for query, documents in query_documents
+    ]
+
+
+def get_reranked_result(
+    documents: list[Document], scores: list[float], top_n: int, r: float
+) -> dict:
+    docs_with_scores = list(zip(documents, scores))
+    if r:
+        docs_with_scores = [(d, s) for d, s in docs_with_scores if s >= r]
+
+    docs_with_scores = sorted(
+        docs_with_scores, key=operator.itemgetter(1), reverse=True
+    )[:top_n]
+
+    return {
+        "distances": [[score for _, score in docs_with_scores]],
+        "documents": [[doc.page_content for doc, _ in docs_with_scores]],
+        "metadatas": [
+            [
+                {**(doc.metadata or {}), "score": score}
+                for doc, score in docs_with_scores
+            ]
+        ],
+    }
+
+
 def query_doc_with_hybrid_search(
     collection_name: str,
-    collection_result: GetResult,
+    bm25_index: Optional[BM25Index],
     query: str,
     embedding_function,
     k: int,
@@ -125,62 +275,20 @@ def query_doc_with_hybrid_search(
 ) -> dict:
     try:
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=collection_result.documents[0],
-            metadatas=collection_result.metadatas[0],
-        )
-        bm25_retriever.k = k
-
-        vector_search_retriever = VectorSearchRetriever(
+        documents = get_hybrid_search_candidates(
             collection_name=collection_name,
+            bm25_index=bm25_index,
+            query=query,
             embedding_function=embedding_function,
-            top_k=k,
+            k=k,
+            hybrid_bm25_weight=hybrid_bm25_weight,
         )
-
-        if hybrid_bm25_weight <= 0:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[vector_search_retriever], weights=[1.0]
-            )
-        elif hybrid_bm25_weight >= 1:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever], weights=[1.0]
-            )
-        else:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever, vector_search_retriever],
-                weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
-            )
-
-        compressor = RerankCompressor(
-            embedding_function=embedding_function,
-            top_n=k_reranker,
-            reranking_function=reranking_function,
-            r_score=r,
-        )
-
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor, base_retriever=ensemble_retriever
+        [scores] = get_rerank_scores(
+            [(query, documents)], embedding_function, reranking_function
         )
 
-        result = compression_retriever.invoke(query)
-
-        distances = [d.metadata.get("score") for d in result]
-        documents = [d.page_content for d in result]
-        metadatas = [d.metadata for d in result]
-
-        # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
-        if k < k_reranker:
-            sorted_items = sorted(
-                zip(distances, metadatas, documents), key=lambda x: x[0], reverse=True
-            )
-            sorted_items = sorted_items[:k]
-            distances, documents, metadatas = map(list, zip(*sorted_items))
-
-        result = {
-            "distances": [distances],
-            "documents": [documents],
-            "metadatas": [metadatas],
-        }
+        # retrieve only min(k, k_reranker) items
+        result = get_reranked_result(documents, scores, min(k, k_reranker), r)
 
         log.info(
             "query_doc_with_hybrid_search:result "
@@ -334,20 +442,31 @@ def query_collection_with_hybrid_search(
 ) -> dict:
     results = []
     error = False
-    # Fetch collection data once per collection sequentially
-    # Avoid fetching the same data multiple times later
-    collection_results = {}
+    # Load the BM25 index of each collection sequentially
+    # Collections that were never indexed are fetched and indexed once here,
+    # unless in two-stage mode which never fetches a whole collection
+    bm25_indexes = {}
+    failed_collection_names = set()
     for collection_name in collection_names:
         try:
             log.debug(
-                f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
+                f"query_collection_with_hybrid_search:BM25_INDEXES.get:collection {collection_name}"
             )
-            collection_results[collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=collection_name
+            bm25_indexes[collection_name] = BM25_INDEXES.get(
+                collection_name, build=not ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE
             )
+            if bm25_indexes[collection_name] is None:
+                if ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE:
+                    log.info(
+                        f"Collection {collection_name} has no keyword index, searching by vector only"
+                    )
+                else:
+                    failed_collection_names.add(collection_name)
         except Exception as e:
-            log.exception(f"Failed to fetch collection {collection_name}: {e}")
-            collection_results[collection_name] = None
+            log.exception(f"Failed to load collection {collection_name}: {e}")
+            bm25_indexes[collection_name] = None
+            if not ENABLE_RAG_HYBRID_SEARCH_TWO_STAGE:
+                failed_collection_names.add(collection_name)
 
     log.info(
         f"Starting hybrid search for {len(queries)} queries in {len(collection_names)} collections..."
@@ -355,28 +474,25 @@ def query_collection_with_hybrid_search(
 
     def process_query(collection_name, query):
         try:
-            result = query_doc_with_hybrid_search(
+            documents = get_hybrid_search_candidates(
                 collection_name=collection_name,
-                collection_result=collection_results[collection_name],
+                bm25_index=bm25_indexes[collection_name],
                 query=query,
                 embedding_function=embedding_function,
                 k=k,
-                reranking_function=reranking_function,
-                k_reranker=k_reranker,
-                r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
             )
-            return result, None
+            return documents, None
         except Exception as e:
             log.exception(f"Error when querying the collection with hybrid_search: {e}")
             return None, e
 
     # Prepare tasks for all collections and queries
-    # Avoid running any tasks for collections that failed to fetch data (have assigned None)
+    # Avoid running any tasks for collections that failed to load
     tasks = [
         (cn, q)
         for cn in collection_names
-        if collection_results[cn] is not None
+        if cn not in failed_collection_names
         for q in queries
     ]
 
@@ -384,11 +500,29 @@ def query_collection_with_hybrid_search(
         future_results = [executor.submit(process_query, cn, q) for cn, q in tasks]
         task_results = [future.result() for future in future_results]
 
-    for result, err in task_results:
+    query_documents = []
+    for (_, query), (documents, err) in zip(tasks, task_results):
         if err is not None:
             error = True
-        elif result is not None:
-            results.append(result)
+        elif documents is not None:
+            query_documents.append((query, documents))
+
+    # Rerank the candidates of all collections and queries in one batch, the
+    # same chunk is often retrieved for several queries and collections
+    if query_documents:
+        try:
+            scores = get_rerank_scores(
+                query_documents, embedding_function, reranking_function
+            )
+            for (_, documents), document_scores in zip(query_documents, scores):
+                results.append(
+                    get_reranked_result(
+                        documents, document_scores, min(k, k_reranker), r
+                    )
+                )
+        except Exception as e:
+            log.exception(f"Error when reranking the hybrid search results: {e}")
+            error = True
 
     if error and not results:
         raise Exception(
@@ -398,6 +532,39 @@ def query_collection_with_hybrid_search(
     return merge_and_sort_query_results(results, k=k)
 
 
+class LazyModel:
+    """
+    Stands in for a local embedding or reranking model and builds it with
+    `factory` on first use, so that loading it does not hold up startup.
+    Attributes are looked up on the built model. If building fails, the error
+    is raised on every use until the model is replaced.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None and self._error is None:
+            with self._lock:
+                if self._model is None and self._error is None:
+                    try:
+                        self._model = self._factory()
+                    except Exception as e:
+                        self._error = e
+
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
 def get_embedding_function(
     embedding_engine,
     embedding_model,
@@ -408,52 +575,93 @@ def get_embedding_function(
     azure_api_version=None,
 ):
     if embedding_engine == "":
-        return lambda query, prefix=None, user=None: embedding_function.encode(
+        func = lambda query, prefix=None, user=None: embedding_function.encode(
             query, **({"prompt": prefix} if prefix else {})
         ).tolist()
     elif embedding_engine in ["ollama", "openai", "azure_openai"]:
-        func = lambda query, prefix=None, user=None: generate_embeddings(
-            engine=embedding_engine,
-            model=embedding_model,
-            text=query,
-            prefix=prefix,
-            url=url,
-            key=key,
-            user=user,
-            azure_api_version=azure_api_version,
-        )
-
-        def generate_multiple(query, prefix, user, func):
-            if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(
-                        func(
-                            query[i : i + embedding_batch_size],
-                            prefix=prefix,
-                            user=user,
-                        )
-                    )
-                return embeddings
-            else:
-                return func(query, prefix, user)
-
-        return lambda query, prefix=None, user=None: generate_multiple(
-            query, prefix, user, func
+        # Batches are sent concurrently by the async pipeline
+        func = lambda query, prefix=None, user=None: run_embedding_coroutine(
+            agenerate_embeddings(
+                engine=embedding_engine,
+                model=embedding_model,
+                text=query,
+                prefix=prefix,
+                url=url,
+                key=key,
+                user=user,
+                azure_api_version=azure_api_version,
+                batch_size=embedding_batch_size,
+            )
         )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
+    if EMBEDDING_CACHE is None:
+        return func
+
+    # Only embed the texts that were not embedded with this model before
+    return lambda query, prefix=None, user=None: EMBEDDING_CACHE.get_embeddings(
+        embedding_engine,
+        embedding_model,
+        query,
+        prefix,
+        lambda texts: func(texts, prefix=prefix, user=user),
+    )
+
+
+def predict_by_query(predict, sentences: list[tuple[str, str]]):
+    """
+    Score (query, document) pairs of several queries with a reranker that only
+    takes the documents of a single query per call.
+    """
+    positions = {}
+    for idx, (query, _) in enumerate(sentences):
+        positions.setdefault(query, []).append(idx)
+    if len(positions) <= 1:
+        return predict(sentences)
+
+    scores = [0.0] * len(sentences)
+    for query, idxs in positions.items():
+        query_scores = predict([sentences[idx] for idx in idxs])
+        if query_scores is None:
+            return None
+        for idx, score in zip(idxs, query_scores):
+            scores[idx] = float(score)
+    return scores
+
 
 def get_reranking_function(reranking_engine, reranking_model, reranking_function):
     if reranking_function is None:
         return None
     if reranking_engine == "external":
-        return lambda sentences, user=None: reranking_function.predict(
+        predict = lambda sentences, user=None: reranking_function.predict(
             sentences, user=user
         )
     else:
-        return lambda sentences, user=None: reranking_function.predict(sentences)
+        predict = lambda sentences, user=None: reranking_function.predict(sentences)
+
+    def func(sentences, user=None):
+        # Checked on use, a LazyModel is only built on its first prediction
+        model = reranking_function
+        if isinstance(model, LazyModel):
+            model = model.load()
+
+        if isinstance(model, BaseReranker):
+            # ColBERT and external rerankers score every pair against the first query
+            return predict_by_query(
+                lambda sentences: predict(sentences, user=user), sentences
+            )
+        return predict(sentences, user=user)
+
+    if RERANK_SCORE_CACHE is None:
+        return func
+
+    return lambda sentences, user=None: RERANK_SCORE_CACHE.get_scores(
+        reranking_engine,
+        reranking_model,
+        sentences,
+        lambda sentences: func(sentences, user=user),
+    )
 
 
 def get_sources_from_items(
@@ -917,6 +1125,232 @@ def generate_embeddings(
         return embeddings[0] if isinstance(text, str) else embeddings
 
 
+# Error messages of engines rejecting a request for its number or length of
+# inputs, e.g. OpenAI's "maximum context length is 8192 tokens", Azure's "Too
+# many inputs" or Ollama's "the input length exceeds the context length"
+EMBEDDING_TOO_LARGE_PATTERN = re.compile(
+    r"context length|too long|too many (inputs|tokens)|less than \d+ tokens"
+    r"|tokens per request|batch size",
+    re.IGNORECASE,
+)
+
+
+class EmbeddingRequestError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"HTTP {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+    @property
+    def too_large(self) -> bool:
+        """Whether smaller requests may succeed. Ollama reports it as a 500."""
+        if self.status == 413:
+            return True
+        return self.status in (400, 422, 500) and bool(
+            EMBEDDING_TOO_LARGE_PATTERN.search(self.detail or "")
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token, good enough to size batches
+    return len(text) // 4 + 1
+
+
+def get_embedding_batches(
+    texts: list[str], batch_size: int, max_tokens: int = RAG_EMBEDDING_BATCH_MAX_TOKENS
+) -> list[tuple[int, int]]:
+    """Split texts into (start, end) batches of at most batch_size texts and max_tokens tokens."""
+    batches = []
+    start = 0
+    tokens = 0
+    for idx, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if idx > start and (
+            idx - start >= batch_size
+            or (max_tokens > 0 and tokens + text_tokens > max_tokens)
+        ):
+            batches.append((start, idx))
+            start = idx
+            tokens = 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+async def agenerate_batch_embeddings(
+    engine: str,
+    model: str,
+    texts: list[str],
+    url: str,
+    key: str = "",
+    prefix: str = None,
+    user: UserModel = None,
+    azure_api_version: str = "",
+) -> list[list[float]]:
+    """
+    Embed one batch with a remote embedding engine, retrying rate limited and
+    failed requests with exponential backoff. Raises on failure.
+    """
+    log.debug(f"agenerate_batch_embeddings:{engine} {model} batch size: {len(texts)}")
+
+    headers = {
+        "Content-Type": "application/json",
+        **(
+            {
+                "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                "X-OpenWebUI-User-Id": user.id,
+                "X-OpenWebUI-User-Email": user.email,
+                "X-OpenWebUI-User-Role": user.role,
+            }
+            if ENABLE_FORWARD_USER_INFO_HEADERS and user
+            else {}
+        ),
+    }
+    json_data = {"input": texts}
+    if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
+        json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
+
+    if engine == "ollama":
+        request_url = f"{url}/api/embed"
+        headers["Authorization"] = f"Bearer {key}"
+        json_data["model"] = model
+    elif engine == "openai":
+        request_url = f"{url}/embeddings"
+        headers["Authorization"] = f"Bearer {key}"
+        json_data["model"] = model
+    elif engine == "azure_openai":
+        request_url = f"{url}/openai/deployments/{model}/embeddings?api-version={azure_api_version}"
+        headers["api-key"] = key
+    else:
+        raise ValueError(f"Unknown embedding engine: {engine}")
+
+    session = SESSION_POOL.get_session(request_url)
+    for attempt in range(RAG_EMBEDDING_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            async with session.post(
+                request_url, headers=headers, json=json_data
+            ) as response:
+                if response.status == 429 or response.status >= 500:
+                    retry_after = response.headers.get("Retry-After")
+                    error = EmbeddingRequestError(
+                        response.status, await response.text()
+                    )
+                    # Retrying the same request would fail the same way
+                    if error.too_large:
+                        raise error
+                elif response.status >= 400:
+                    raise EmbeddingRequestError(response.status, await response.text())
+                else:
+                    data = await response.json()
+                    if "embeddings" in data:
+                        return data["embeddings"]
+                    elif "data" in data:
+                        return [
+                            elem["embedding"]
+                            for elem in sorted(
+                                data["data"], key=lambda elem: elem.get("index", 0)
+                            )
+                        ]
+                    raise Exception("Something went wrong :/")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            error = e
+
+        if attempt == RAG_EMBEDDING_MAX_RETRIES:
+            raise error
+
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(2**attempt, 30) + random.random()
+        log.warning(
+            f"Embedding request failed ({error}), retrying in {delay:.1f}s ({attempt + 1}/{RAG_EMBEDDING_MAX_RETRIES})"
+        )
+        await asyncio.sleep(delay)
+
+
+async def agenerate_embeddings(
+    engine: str,
+    model: str,
+    text: Union[str, list[str]],
+    prefix: Union[str, None] = None,
+    batch_size: int = 1,
+    **kwargs,
+):
+    """
+    Async counterpart of generate_embeddings for lists of any size: the texts
+    are split into batches by count and estimated tokens, which are sent
+    RAG_EMBEDDING_CONCURRENT_REQUESTS at a time. A batch rejected for its size
+    is split in half and retried, other errors fail the whole call.
+    """
+    texts = text if isinstance(text, list) else [text]
+    if prefix is not None and RAG_EMBEDDING_PREFIX_FIELD_NAME is None:
+        texts = [f"{prefix}{text_element}" for text_element in texts]
+
+    semaphore = asyncio.Semaphore(max(RAG_EMBEDDING_CONCURRENT_REQUESTS, 1))
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        try:
+            async with semaphore:
+                return await agenerate_batch_embeddings(
+                    engine,
+                    model,
+                    batch,
+                    kwargs.get("url", ""),
+                    kwargs.get("key", ""),
+                    prefix,
+                    kwargs.get("user"),
+                    kwargs.get("azure_api_version", ""),
+                )
+        except EmbeddingRequestError as e:
+            if e.too_large and len(batch) > 1:
+                middle = len(batch) // 2
+                log.info(
+                    f"Embedding batch of {len(batch)} texts was rejected, splitting it"
+                )
+                first, second = await asyncio.gather(
+                    embed_batch(batch[:middle]), embed_batch(batch[middle:])
+                )
+                return first + second
+            raise
+
+    try:
+        results = await asyncio.gather(
+            *[
+                embed_batch(texts[start:end])
+                for start, end in get_embedding_batches(texts, max(batch_size, 1))
+            ]
+        )
+    except Exception as e:
+        log.exception(f"Error generating {engine} embeddings: {e}")
+        return None
+
+    embeddings = [embedding for result in results for embedding in result]
+    return embeddings if isinstance(text, list) else embeddings[0]
+
+
+_embedding_loop = None
+_embedding_loop_lock = threading.Lock()
+
+
+def run_embedding_coroutine(coroutine):
+    """
+    Run an embedding coroutine for a sync caller and wait for its result. The
+    coroutines share one background event loop, and with it the pooled HTTP
+    sessions to the embedding engines.
+    """
+    global _embedding_loop
+    with _embedding_loop_lock:
+        if _embedding_loop is None:
+            _embedding_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_embedding_loop.run_forever, name="embeddings", daemon=True
+            ).start()
+
+    return asyncio.run_coroutine_threadsafe(coroutine, _embedding_loop).result()
+
+
 import operator
 from typing import Optional, Sequence
 
@@ -940,24 +1374,13 @@ class RerankCompressor(BaseDocumentCompressor):
         query: str,
         callbacks: Optional[Callbacks] = None,
     ) -> Sequence[Document]:
-        reranking = self.reranking_function is not None
-
-        if reranking:
-            scores = self.reranking_function(
-                [(query, doc.page_content) for doc in documents]
-            )
-        else:
-            from sentence_transformers import util
-
-            query_embedding = self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
-            document_embedding = self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
-            )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
-
-        docs_with_scores = list(
-            zip(documents, scores.tolist() if not isinstance(scores, list) else scores)
+        [scores] = get_rerank_scores(
+            [(query, list(documents))],
+            self.embedding_function,
+            self.reranking_function,
         )
+
+        docs_with_scores = list(zip(documents, scores))
         if self.r_score:
             docs_with_scores = [
                 (d, s) for d, s in docs_with_scores if s >= self.r_score
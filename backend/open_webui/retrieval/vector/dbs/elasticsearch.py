@@ -1,8 +1,9 @@
-from elasticsearch import Elasticsearch, BadRequestError
+from elasticsearch import AsyncElasticsearch, Elasticsearch, BadRequestError
 from typing import Optional
 import ssl
 from elasticsearch.helpers import bulk, scan
 from open_webui.retrieval.vector.main import (
+    AsyncClientCache,
     VectorDBBase,
     VectorItem,
     SearchResult,
@@ -30,17 +31,21 @@ class ElasticsearchClient(VectorDBBase):
 
     def __init__(self):
         self.index_prefix = ELASTICSEARCH_INDEX_PREFIX
-        self.client = Elasticsearch(
-            hosts=[ELASTICSEARCH_URL],
-            ca_certs=ELASTICSEARCH_CA_CERTS,
-            api_key=ELASTICSEARCH_API_KEY,
-            cloud_id=ELASTICSEARCH_CLOUD_ID,
-            basic_auth=(
+        client_kwargs = {
+            "hosts": [ELASTICSEARCH_URL],
+            "ca_certs": ELASTICSEARCH_CA_CERTS,
+            "api_key": ELASTICSEARCH_API_KEY,
+            "cloud_id": ELASTICSEARCH_CLOUD_ID,
+            "basic_auth": (
                 (ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD)
                 if ELASTICSEARCH_USERNAME and ELASTICSEARCH_PASSWORD
                 else None
             ),
-            ssl_assert_fingerprint=SSL_ASSERT_FINGERPRINT,
+            "ssl_assert_fingerprint": SSL_ASSERT_FINGERPRINT,
+        }
+        self.client = Elasticsearch(**client_kwargs)
+        self.async_clients = AsyncClientCache(
+            lambda: AsyncElasticsearch(**client_kwargs)
         )
 
     # Status: works
@@ -131,29 +136,44 @@ class ElasticsearchClient(VectorDBBase):
         for i in range(0, len(items), batch_size):
             yield items[i : min(i + batch_size, len(items))]
 
-    # Status: works
-    def has_collection(self, collection_name) -> bool:
+    def _get_collection_body(self, collection_name: str) -> dict:
         query_body = {"query": {"bool": {"filter": []}}}
         query_body["query"]["bool"]["filter"].append(
             {"term": {"collection": collection_name}}
         )
+        return query_body
 
+    # Status: works
+    def has_collection(self, collection_name) -> bool:
         try:
-            result = self.client.count(index=f"{self.index_prefix}*", body=query_body)
+            result = self.client.count(
+                index=f"{self.index_prefix}*",
+                body=self._get_collection_body(collection_name),
+            )
 
             return result.body["count"] > 0
         except Exception as e:
             return None
 
+    async def ahas_collection(self, collection_name) -> bool:
+        try:
+            result = await self.async_clients.get().count(
+                index=f"{self.index_prefix}*",
+                body=self._get_collection_body(collection_name),
+            )
+
+            return result.body["count"] > 0
+        except Exception:
+            return None
+
     def delete_collection(self, collection_name: str):
         query = {"query": {"term": {"collection": collection_name}}}
         self.client.delete_by_query(index=f"{self.index_prefix}*", body=query)
 
-    # Status: works
-    def search(
+    def _get_search_body(
         self, collection_name: str, vectors: list[list[float]], limit: int
-    ) -> Optional[SearchResult]:
-        query = {
+    ) -> dict:
+        return {
             "size": limit,
             "_source": ["text", "metadata"],
             "query": {
@@ -171,19 +191,28 @@ class ElasticsearchClient(VectorDBBase):
             },
         }
 
+    # Status: works
+    def search(
+        self, collection_name: str, vectors: list[list[float]], limit: int
+    ) -> Optional[SearchResult]:
         result = self.client.search(
-            index=self._get_index_name(len(vectors[0])), body=query
+            index=self._get_index_name(len(vectors[0])),
+            body=self._get_search_body(collection_name, vectors, limit),
         )
 
         return self._result_to_search_result(result)
 
-    # Status: only tested halfwat
-    def query(
-        self, collection_name: str, filter: dict, limit: Optional[int] = None
-    ) -> Optional[GetResult]:
-        if not self.has_collection(collection_name):
-            return None
+    async def asearch(
+        self, collection_name: str, vectors: list[list[float]], limit: int
+    ) -> Optional[SearchResult]:
+        result = await self.async_clients.get().search(
+            index=self._get_index_name(len(vectors[0])),
+            body=self._get_search_body(collection_name, vectors, limit),
+        )
 
+        return self._result_to_search_result(result)
+
+    def _get_query_body(self, collection_name: str, filter: dict) -> dict:
         query_body = {
             "query": {"bool": {"filter": []}},
             "_source": ["text", "metadata"],
@@ -194,12 +223,21 @@ class ElasticsearchClient(VectorDBBase):
         query_body["query"]["bool"]["filter"].append(
             {"term": {"collection": collection_name}}
         )
+        return query_body
+
+    # Status: only tested halfwat
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not self.has_collection(collection_name):
+            return None
+
         size = limit if limit else 10
 
         try:
             result = self.client.search(
                 index=f"{self.index_prefix}*",
-                body=query_body,
+                body=self._get_query_body(collection_name, filter),
                 size=size,
             )
 
@@ -208,6 +246,26 @@ class ElasticsearchClient(VectorDBBase):
         except Exception as e:
             return None
 
+    async def aquery(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not await self.ahas_collection(collection_name):
+            return None
+
+        size = limit if limit else 10
+
+        try:
+            result = await self.async_clients.get().search(
+                index=f"{self.index_prefix}*",
+                body=self._get_query_body(collection_name, filter),
+                size=size,
+            )
+
+            return self._result_to_get_result(result)
+
+        except Exception:
+            return None
+
     # Status: works
     def _has_index(self, dimension: int):
         return self.client.indices.exists(
@@ -1,8 +1,9 @@
-from opensearchpy import OpenSearch
+from opensearchpy import AsyncOpenSearch, OpenSearch
 from opensearchpy.helpers import bulk
 from typing import Optional
 
 from open_webui.retrieval.vector.main import (
+    AsyncClientCache,
     VectorDBBase,
     VectorItem,
     SearchResult,
@@ -20,12 +21,14 @@ from open_webui.config import (
 class OpenSearchClient(VectorDBBase):
     def __init__(self):
         self.index_prefix = "open_webui"
-        self.client = OpenSearch(
-            hosts=[OPENSEARCH_URI],
-            use_ssl=OPENSEARCH_SSL,
-            verify_certs=OPENSEARCH_CERT_VERIFY,
-            http_auth=(OPENSEARCH_USERNAME, OPENSEARCH_PASSWORD),
-        )
+        client_kwargs = {
+            "hosts": [OPENSEARCH_URI],
+            "use_ssl": OPENSEARCH_SSL,
+            "verify_certs": OPENSEARCH_CERT_VERIFY,
+            "http_auth": (OPENSEARCH_USERNAME, OPENSEARCH_PASSWORD),
+        }
+        self.client = OpenSearch(**client_kwargs)
+        self.async_clients = AsyncClientCache(lambda: AsyncOpenSearch(**client_kwargs))
 
     def _get_index_name(self, collection_name: str) -> str:
         return f"{self.index_prefix}_{collection_name}"
@@ -106,11 +109,34 @@ class OpenSearchClient(VectorDBBase):
         # We are simply adapting to the norms of the other DBs.
         return self.client.indices.exists(index=self._get_index_name(collection_name))
 
+    async def ahas_collection(self, collection_name: str) -> bool:
+        return await self.async_clients.get().indices.exists(
+            index=self._get_index_name(collection_name)
+        )
+
     def delete_collection(self, collection_name: str):
         # delete_collection here means delete index.
         # We are simply adapting to the norms of the other DBs.
         self.client.indices.delete(index=self._get_index_name(collection_name))
 
+    def _get_search_body(self, vectors: list[list[float | int]], limit: int) -> dict:
+        return {
+            "size": limit,
+            "_source": ["text", "metadata"],
+            "query": {
+                "script_score": {
+                    "query": {"match_all": {}},
+                    "script": {
+                        "source": "(cosineSimilarity(params.query_value, doc[params.field]) + 1.0) / 2.0",
+                        "params": {
+                            "field": "vector",
+                            "query_value": vectors[0],
+                        },  # Assuming single query vector
+                    },
+                }
+            },
+        }
+
     def search(
         self, collection_name: str, vectors: list[list[float | int]], limit: int
     ) -> Optional[SearchResult]:
@@ -118,25 +144,9 @@ class OpenSearchClient(VectorDBBase):
             if not self.has_collection(collection_name):
                 return None
 
-            query = {
-                "size": limit,
-                "_source": ["text", "metadata"],
-                "query": {
-                    "script_score": {
-                        "query": {"match_all": {}},
-                        "script": {
-                            "source": "(cosineSimilarity(params.query_value, doc[params.field]) + 1.0) / 2.0",
-                            "params": {
-                                "field": "vector",
-                                "query_value": vectors[0],
-                            },  # Assuming single query vector
-                        },
-                    }
-                },
-            }
-
             result = self.client.search(
-                index=self._get_index_name(collection_name), body=query
+                index=self._get_index_name(collection_name),
+                body=self._get_search_body(vectors, limit),
             )
 
             return self._result_to_search_result(result)
@@ -144,12 +154,24 @@ class OpenSearchClient(VectorDBBase):
         except Exception as e:
             return None
 
-    def query(
-        self, collection_name: str, filter: dict, limit: Optional[int] = None
-    ) -> Optional[GetResult]:
-        if not self.has_collection(collection_name):
+    async def asearch(
+        self, collection_name: str, vectors: list[list[float | int]], limit: int
+    ) -> Optional[SearchResult]:
+        try:
+            if not await self.ahas_collection(collection_name):
+                return None
+
+            result = await self.async_clients.get().search(
+                index=self._get_index_name(collection_name),
+                body=self._get_search_body(vectors, limit),
+            )
+
+            return self._result_to_search_result(result)
+
+        except Exception:
             return None
 
+    def _get_query_body(self, filter: dict) -> dict:
         query_body = {
             "query": {"bool": {"filter": []}},
             "_source": ["text", "metadata"],
@@ -159,13 +181,20 @@ class OpenSearchClient(VectorDBBase):
             query_body["query"]["bool"]["filter"].append(
                 {"term": {"metadata." + str(field) + ".keyword": value}}
             )
+        return query_body
+
+    def query(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not self.has_collection(collection_name):
+            return None
 
         size = limit if limit else 10000
 
         try:
             result = self.client.search(
                 index=self._get_index_name(collection_name),
-                body=query_body,
+                body=self._get_query_body(filter),
                 size=size,
             )
 
@@ -174,6 +203,26 @@ class OpenSearchClient(VectorDBBase):
         except Exception as e:
             return None
 
+    async def aquery(
+        self, collection_name: str, filter: dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        if not await self.ahas_collection(collection_name):
+            return None
+
+        size = limit if limit else 10000
+
+        try:
+            result = await self.async_clients.get().search(
+                index=self._get_index_name(collection_name),
+                body=self._get_query_body(filter),
+                size=size,
+            )
+
+            return self._result_to_get_result(result)
+
+        except Exception:
+            return None
+
     def _create_index_if_not_exists(self, collection_name: str, dimension: int):
         if not self.has_collection(collection_name):
             self._create_index(collection_name, dimension)
@@ -1,6 +1,10 @@
-from typing import Optional, List, Dict, Any
+from contextlib import contextmanager
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+import io
 import logging
 import json
+import math
 from sqlalchemy import (
     func,
     literal,
@@ -19,14 +23,17 @@ from sqlalchemy import (
 )
 from sqlalchemy.sql import true
 from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
-from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.dialects.postgresql import JSONB, array, insert as pg_insert
 from pgvector.sqlalchemy import Vector
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.exc import NoSuchTableError
 
 from open_webui.retrieval.vector.main import (
+    AsyncClientCache,
     VectorDBBase,
     VectorItem,
     SearchResult,
@@ -41,9 +48,17 @@ from open_webui.config import (
     PGVECTOR_POOL_MAX_OVERFLOW,
     PGVECTOR_POOL_TIMEOUT,
     PGVECTOR_POOL_RECYCLE,
+    PGVECTOR_INSERT_BATCH_SIZE,
+    PGVECTOR_USE_COPY,
+    PGVECTOR_INDEX_METHOD,
 )
 
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import DATABASE_URL, SRC_LOG_LEVELS
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
 
 VECTOR_LENGTH = PGVECTOR_INITIALIZE_MAX_VECTOR_LENGTH
 Base = declarative_base()
@@ -52,6 +67,49 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
 
+def get_async_engine_args(url: str) -> Optional[tuple[Any, dict]]:
+    """
+    Return the URL and connect args of an asyncpg engine for a PostgreSQL
+    URL, or None if it can't be opened with asyncpg.
+    """
+    if asyncpg is None:
+        return None
+
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return None
+
+    connect_args = {}
+    query = dict(url.query)
+    # asyncpg takes the libpq sslmode values as its ssl argument
+    if "sslmode" in query:
+        connect_args["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def vector_literal(vector: List[float]) -> str:
+    # pgvector's text representation, e.g. "[1.0,2.0,3.0]"
+    return "[" + ",".join(str(float(value)) for value in vector) + "]"
+
+
+def copy_escape(value: Optional[str]) -> str:
+    # Escape a value for COPY's text format, where NULL is \N
+    if value is None:
+        return "\\N"
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
 def pgcrypto_encrypt(val, key):
     return func.pgp_sym_encrypt(val, literal(key))
 
@@ -107,6 +165,20 @@ class PgvectorClient(VectorDBBase):
             )
             self.session = scoped_session(SessionLocal)
 
+        # Searches from the event loop go through a separate asyncpg engine
+        self.async_engines = None
+        async_engine_args = get_async_engine_args(PGVECTOR_DB_URL or DATABASE_URL)
+        if async_engine_args is not None:
+            async_url, connect_args = async_engine_args
+            self.async_engines = AsyncClientCache(
+                lambda: create_async_engine(
+                    async_url,
+                    pool_pre_ping=True,
+                    pool_recycle=PGVECTOR_POOL_RECYCLE,
+                    connect_args=connect_args,
+                )
+            )
+
         try:
             # Ensure the pgvector extension is available
             self.session.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
@@ -130,12 +202,7 @@ class PgvectorClient(VectorDBBase):
             Base.metadata.create_all(bind=connection)
 
             # Create an index on the vector column if it doesn't exist
-            self.session.execute(
-                text(
-                    "CREATE INDEX IF NOT EXISTS idx_document_chunk_vector "
-                    "ON document_chunk USING ivfflat (vector vector_cosine_ops) WITH (lists = 100);"
-                )
-            )
+            self.session.execute(text(self._get_vector_index_sql(lists=100)))
             self.session.execute(
                 text(
                     "CREATE INDEX IF NOT EXISTS idx_document_chunk_collection_name "
@@ -195,125 +262,326 @@ class PgvectorClient(VectorDBBase):
             vector = vector[:VECTOR_LENGTH]
         return vector
 
-    def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+    def _get_vector_index_sql(self, lists: int) -> str:
+        if PGVECTOR_INDEX_METHOD == "hnsw":
+            return (
+                "CREATE INDEX IF NOT EXISTS idx_document_chunk_vector "
+                "ON document_chunk USING hnsw (vector vector_cosine_ops);"
+            )
+        return (
+            "CREATE INDEX IF NOT EXISTS idx_document_chunk_vector "
+            f"ON document_chunk USING ivfflat (vector vector_cosine_ops) WITH (lists = {lists});"
+        )
+
+    def rebuild_vector_index(self) -> None:
+        """
+        Drop and recreate the vector index with PGVECTOR_INDEX_METHOD.
+
+        IVFFlat lists are sized from the current row count as recommended by
+        pgvector (rows / 1000 up to 1M rows, sqrt(rows) above), so this also
+        fixes an index that was created while the table was still small.
+        """
         try:
+            rows = self.session.execute(
+                text("SELECT count(*) FROM document_chunk")
+            ).scalar()
+            lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+            lists = max(lists, 10)
+
+            self.session.execute(text("DROP INDEX IF EXISTS idx_document_chunk_vector"))
+            self.session.execute(text(self._get_vector_index_sql(lists=lists)))
+            self.session.commit()
+            log.info(f"Rebuilt {PGVECTOR_INDEX_METHOD} vector index over {rows} rows.")
+        except Exception as e:
+            self.session.rollback()
+            log.exception(f"Error during vector index rebuild: {e}")
+            raise
+
+    @contextmanager
+    def deferred_vector_index(self):
+        """
+        Drop the vector index for the duration of a bulk load and rebuild it
+        once at the end, instead of updating it for every inserted row.
+
+        Searches of all collections fall back to exact scans until the index
+        is rebuilt, so use this for large offline loads only.
+        """
+        try:
+            self.session.execute(text("DROP INDEX IF EXISTS idx_document_chunk_vector"))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        try:
+            yield
+        finally:
+            self.rebuild_vector_index()
+
+    def _dedupe(self, items: List[VectorItem], keep_last: bool) -> List[VectorItem]:
+        # A single INSERT ... ON CONFLICT can't touch the same id twice
+        by_id = {}
+        for item in items:
+            if keep_last or item["id"] not in by_id:
+                by_id[item["id"]] = item
+        return list(by_id.values())
+
+    def _copy_batch(self, collection_name: str, items: List[VectorItem], update: bool):
+        """
+        COPY a batch into a temporary staging table and move it into
+        document_chunk with a single INSERT ... SELECT ... ON CONFLICT.
+        """
+        dbapi_connection = self.session.connection().connection.dbapi_connection
+        buffer = io.StringIO()
+        for item in items:
+            vector = self.adjust_vector_length(item["vector"])
+            buffer.write(
+                "\t".join(
+                    [
+                        copy_escape(item["id"]),
+                        vector_literal(vector),
+                        copy_escape(item["text"]),
+                        copy_escape(json.dumps(item["metadata"])),
+                    ]
+                )
+            )
+            buffer.write("\n")
+        buffer.seek(0)
+
+        self.session.execute(
+            text(
+                "CREATE TEMP TABLE IF NOT EXISTS document_chunk_staging "
+                "(id text, vector text, text text, vmetadata text) ON COMMIT DELETE ROWS"
+            )
+        )
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY document_chunk_staging (id, vector, text, vmetadata) FROM STDIN",
+                buffer,
+            )
+
+        if PGVECTOR_PGCRYPTO:
+            text_expr = "pgp_sym_encrypt(text, :key)"
+            metadata_expr = "pgp_sym_encrypt(vmetadata, :key)"
+        else:
+            text_expr = "text"
+            metadata_expr = "vmetadata::jsonb"
+
+        if update:
+            conflict = (
+                "DO UPDATE SET vector = EXCLUDED.vector, "
+                "collection_name = EXCLUDED.collection_name, "
+                "text = EXCLUDED.text, vmetadata = EXCLUDED.vmetadata"
+            )
+        else:
+            conflict = "DO NOTHING"
+
+        self.session.execute(
+            text(
+                f"""
+                INSERT INTO document_chunk (id, vector, collection_name, text, vmetadata)
+                SELECT id, vector::vector, :collection_name, {text_expr}, {metadata_expr}
+                FROM document_chunk_staging
+                ON CONFLICT (id) {conflict}
+            """
+            ),
+            {"collection_name": collection_name, "key": PGVECTOR_PGCRYPTO_KEY},
+        )
+
+    def _insert_batch(
+        self, collection_name: str, items: List[VectorItem], update: bool
+    ):
+        """
+        Write a batch with a single multi-row INSERT ... ON CONFLICT.
+        """
+        rows = []
+        for item in items:
+            vector = self.adjust_vector_length(item["vector"])
             if PGVECTOR_PGCRYPTO:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    # Use raw SQL for BYTEA/pgcrypto
-                    self.session.execute(
-                        text(
-                            """
-                            INSERT INTO document_chunk
-                            (id, vector, collection_name, text, vmetadata)
-                            VALUES (
-                                :id, :vector, :collection_name,
-                                pgp_sym_encrypt(:text, :key),
-                                pgp_sym_encrypt(:metadata::text, :key)
-                            )
-                            ON CONFLICT (id) DO NOTHING
-                        """
+                rows.append(
+                    {
+                        "id": item["id"],
+                        "vector": vector,
+                        "collection_name": collection_name,
+                        "text": pgcrypto_encrypt(item["text"], PGVECTOR_PGCRYPTO_KEY),
+                        "vmetadata": pgcrypto_encrypt(
+                            json.dumps(item["metadata"]), PGVECTOR_PGCRYPTO_KEY
                         ),
-                        {
-                            "id": item["id"],
-                            "vector": vector,
-                            "collection_name": collection_name,
-                            "text": item["text"],
-                            "metadata": json.dumps(item["metadata"]),
-                            "key": PGVECTOR_PGCRYPTO_KEY,
-                        },
-                    )
-                self.session.commit()
-                log.info(f"Encrypted & inserted {len(items)} into '{collection_name}'")
-
+                    }
+                )
             else:
-                new_items = []
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    new_chunk = DocumentChunk(
-                        id=item["id"],
-                        vector=vector,
-                        collection_name=collection_name,
-                        text=item["text"],
-                        vmetadata=item["metadata"],
-                    )
-                    new_items.append(new_chunk)
-                self.session.bulk_save_objects(new_items)
-                self.session.commit()
-                log.info(
-                    f"Inserted {len(new_items)} items into collection '{collection_name}'."
+                rows.append(
+                    {
+                        "id": item["id"],
+                        "vector": vector,
+                        "collection_name": collection_name,
+                        "text": item["text"],
+                        "vmetadata": item["metadata"],
+                    }
                 )
+
+        stmt = pg_insert(DocumentChunk.__table__).values(rows)
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={
+                    "vector": stmt.excluded.vector,
+                    "collection_name": stmt.excluded.collection_name,
+                    "text": stmt.excluded.text,
+                    "vmetadata": stmt.excluded.vmetadata,
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["id"])
+        self.session.execute(stmt)
+
+    def _can_copy(self) -> bool:
+        # copy_expert is psycopg2's COPY API
+        return (
+            PGVECTOR_USE_COPY and self.session.get_bind().dialect.driver == "psycopg2"
+        )
+
+    def _write(
+        self, collection_name: str, items: Iterable[VectorItem], update: bool
+    ) -> int:
+        """
+        Write items in transactions of PGVECTOR_INSERT_BATCH_SIZE rows, through
+        COPY when the driver supports it and multi-row INSERTs otherwise.
+        """
+        use_copy = self._can_copy()
+        written = 0
+        for batch in batched(items, PGVECTOR_INSERT_BATCH_SIZE):
+            batch = self._dedupe(batch, keep_last=update)
+            try:
+                if use_copy:
+                    self._copy_batch(collection_name, batch, update)
+                else:
+                    self._insert_batch(collection_name, batch, update)
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            written += len(batch)
+        return written
+
+    def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        try:
+            written = self._write(collection_name, items, update=False)
+            log.info(f"Inserted {written} items into collection '{collection_name}'.")
         except Exception as e:
-            self.session.rollback()
             log.exception(f"Error during insert: {e}")
             raise
 
     def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
         try:
-            if PGVECTOR_PGCRYPTO:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    self.session.execute(
-                        text(
-                            """
-                            INSERT INTO document_chunk
-                            (id, vector, collection_name, text, vmetadata)
-                            VALUES (
-                                :id, :vector, :collection_name,
-                                pgp_sym_encrypt(:text, :key),
-                                pgp_sym_encrypt(:metadata::text, :key)
-                            )
-                            ON CONFLICT (id) DO UPDATE SET
-                              vector = EXCLUDED.vector,
-                              collection_name = EXCLUDED.collection_name,
-                              text = EXCLUDED.text,
-                              vmetadata = EXCLUDED.vmetadata
-                        """
-                        ),
-                        {
-                            "id": item["id"],
-                            "vector": vector,
-                            "collection_name": collection_name,
-                            "text": item["text"],
-                            "metadata": json.dumps(item["metadata"]),
-                            "key": PGVECTOR_PGCRYPTO_KEY,
-                        },
-                    )
-                self.session.commit()
-                log.info(f"Encrypted & upserted {len(items)} into '{collection_name}'")
-            else:
-                for item in items:
-                    vector = self.adjust_vector_length(item["vector"])
-                    existing = (
-                        self.session.query(DocumentChunk)
-                        .filter(DocumentChunk.id == item["id"])
-                        .first()
-                    )
-                    if existing:
-                        existing.vector = vector
-                        existing.text = item["text"]
-                        existing.vmetadata = item["metadata"]
-                        existing.collection_name = (
-                            collection_name  # Update collection_name if necessary
-                        )
-                    else:
-                        new_chunk = DocumentChunk(
-                            id=item["id"],
-                            vector=vector,
-                            collection_name=collection_name,
-                            text=item["text"],
-                            vmetadata=item["metadata"],
-                        )
-                        self.session.add(new_chunk)
-                self.session.commit()
-                log.info(
-                    f"Upserted {len(items)} items into collection '{collection_name}'."
-                )
+            written = self._write(collection_name, items, update=True)
+            log.info(f"Upserted {written} items into collection '{collection_name}'.")
         except Exception as e:
-            self.session.rollback()
             log.exception(f"Error during upsert: {e}")
             raise
 
+    def bulk_insert(
+        self,
+        collection_name: str,
+        items: Iterable[VectorItem],
+        defer_index: bool = False,
+    ) -> None:
+        """
+        Insert a large, possibly lazily produced stream of items. Only one
+        batch is held in memory at a time. With defer_index the vector index
+        is dropped during the load and rebuilt once at the end.
+        """
+        if defer_index:
+            with self.deferred_vector_index():
+                self.insert(collection_name, items)
+        else:
+            self.insert(collection_name, items)
+
+    def _get_search_statement(
+        self,
+        collection_name: str,
+        vectors: List[List[float]],
+        limit: Optional[int] = None,
+    ):
+        def vector_expr(vector):
+            return cast(array(vector), Vector(VECTOR_LENGTH))
+
+        # Create the values for query vectors
+        qid_col = column("qid", Integer)
+        q_vector_col = column("q_vector", Vector(VECTOR_LENGTH))
+        query_vectors = (
+            values(qid_col, q_vector_col)
+            .data([(idx, vector_expr(vector)) for idx, vector in enumerate(vectors)])
+            .alias("query_vectors")
+        )
+
+        result_fields = [
+            DocumentChunk.id,
+        ]
+        if PGVECTOR_PGCRYPTO:
+            result_fields.append(
+                pgcrypto_decrypt(DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text).label(
+                    "text"
+                )
+            )
+            result_fields.append(
+                pgcrypto_decrypt(
+                    DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
+                ).label("vmetadata")
+            )
+        else:
+            result_fields.append(DocumentChunk.text)
+            result_fields.append(DocumentChunk.vmetadata)
+        result_fields.append(
+            (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)).label(
+                "distance"
+            )
+        )
+
+        # Build the lateral subquery for each query vector
+        subq = (
+            select(*result_fields)
+            .where(DocumentChunk.collection_name == collection_name)
+            .order_by((DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)))
+        )
+        if limit is not None:
+            subq = subq.limit(limit)
+        subq = subq.lateral("result")
+
+        # Build the main query by joining query_vectors and the lateral subquery
+        stmt = (
+            select(
+                query_vectors.c.qid,
+                subq.c.id,
+                subq.c.text,
+                subq.c.vmetadata,
+                subq.c.distance,
+            )
+            .select_from(query_vectors)
+            .join(subq, true())
+            .order_by(query_vectors.c.qid, subq.c.distance)
+        )
+        return stmt
+
+    def _rows_to_search_result(self, results, num_queries: int) -> SearchResult:
+        ids = [[] for _ in range(num_queries)]
+        distances = [[] for _ in range(num_queries)]
+        documents = [[] for _ in range(num_queries)]
+        metadatas = [[] for _ in range(num_queries)]
+
+        for row in results:
+            qid = int(row.qid)
+            ids[qid].append(row.id)
+            # normalize and re-orders pgvec distance from [2, 0] to [0, 1] score range
+            # https://github.com/pgvector/pgvector?tab=readme-ov-file#querying
+            distances[qid].append((2.0 - row.distance) / 2.0)
+            documents[qid].append(row.text)
+            metadatas[qid].append(row.vmetadata)
+
+        return SearchResult(
+            ids=ids, distances=distances, documents=documents, metadatas=metadatas
+        )
+
     def search(
         self,
         collection_name: str,
@@ -326,99 +594,34 @@ class PgvectorClient(VectorDBBase):
 
             # Adjust query vectors to VECTOR_LENGTH
             vectors = [self.adjust_vector_length(vector) for vector in vectors]
-            num_queries = len(vectors)
-
-            def vector_expr(vector):
-                return cast(array(vector), Vector(VECTOR_LENGTH))
-
-            # Create the values for query vectors
-            qid_col = column("qid", Integer)
-            q_vector_col = column("q_vector", Vector(VECTOR_LENGTH))
-            query_vectors = (
-                values(qid_col, q_vector_col)
-                .data(
-                    [(idx, vector_expr(vector)) for idx, vector in enumerate(vectors)]
-                )
-                .alias("query_vectors")
-            )
-
-            result_fields = [
-                DocumentChunk.id,
-            ]
-            if PGVECTOR_PGCRYPTO:
-                result_fields.append(
-                    pgcrypto_decrypt(
-                        DocumentChunk.text, PGVECTOR_PGCRYPTO_KEY, Text
-                    ).label("text")
-                )
-                result_fields.append(
-                    pgcrypto_decrypt(
-                        DocumentChunk.vmetadata, PGVECTOR_PGCRYPTO_KEY, JSONB
-                    ).label("vmetadata")
-                )
-            else:
-                result_fields.append(DocumentChunk.text)
-                result_fields.append(DocumentChunk.vmetadata)
-            result_fields.append(
-                (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector)).label(
-                    "distance"
-                )
-            )
-
-            # Build the lateral subquery for each query vector
-            subq = (
-                select(*result_fields)
-                .where(DocumentChunk.collection_name == collection_name)
-                .order_by(
-                    (DocumentChunk.vector.cosine_distance(query_vectors.c.q_vector))
-                )
-            )
-            if limit is not None:
-                subq = subq.limit(limit)
-            subq = subq.lateral("result")
-
-            # Build the main query by joining query_vectors and the lateral subquery
-            stmt = (
-                select(
-                    query_vectors.c.qid,
-                    subq.c.id,
-                    subq.c.text,
-                    subq.c.vmetadata,
-                    subq.c.distance,
-                )
-                .select_from(query_vectors)
-                .join(subq, true())
-                .order_by(query_vectors.c.qid, subq.c.distance)
-            )
+            stmt = self._get_search_statement(collection_name, vectors, limit)
 
             result_proxy = self.session.execute(stmt)
             results = result_proxy.all()
+            return self._rows_to_search_result(results, len(vectors))
+        except Exception as e:
+            log.exception(f"Error during search: {e}")
+            return None
+
+    async def asearch(
+        self,
+        collection_name: str,
+        vectors: List[List[float]],
+        limit: Optional[int] = None,
+    ) -> Optional[SearchResult]:
+        if self.async_engines is None:
+            return await super().asearch(collection_name, vectors, limit)
 
-            ids = [[] for _ in range(num_queries)]
-            distances = [[] for _ in range(num_queries)]
-            documents = [[] for _ in range(num_queries)]
-            metadatas = [[] for _ in range(num_queries)]
+        try:
+            if not vectors:
+                return None
 
-            if not results:
-                return SearchResult(
-                    ids=ids,
-                    distances=distances,
-                    documents=documents,
-                    metadatas=metadatas,
-                )
+            vectors = [self.adjust_vector_length(vector) for vector in vectors]
+            stmt = self._get_search_statement(collection_name, vectors, limit)
 
-            for row in results:
-                qid = int(row.qid)
-                ids[qid].append(row.id)
-                # normalize and re-orders pgvec distance from [2, 0] to [0, 1] score range
-                # https://github.com/pgvector/pgvector?tab=readme-ov-file#querying
-                distances[qid].append((2.0 - row.distance) / 2.0)
-                documents[qid].append(row.text)
-                metadatas[qid].append(row.vmetadata)
-
-            return SearchResult(
-                ids=ids, distances=distances, documents=documents, metadatas=metadatas
-            )
+            async with self.async_engines.get().connect() as connection:
+                results = (await connection.execute(stmt)).all()
+            return self._rows_to_search_result(results, len(vectors))
         except Exception as e:
             log.exception(f"Error during search: {e}")
             return None
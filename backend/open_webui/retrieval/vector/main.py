@@ -1,6 +1,8 @@
+import asyncio
+import weakref
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 
 class VectorItem(BaseModel):
@@ -20,6 +22,25 @@ class SearchResult(GetResult):
     distances: Optional[List[List[float | int]]]
 
 
+class AsyncClientCache:
+    """
+    Creates an async client per event loop, as the connections of async
+    clients are bound to the loop they were opened in.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get(self) -> Any:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self.factory()
+            self._clients[loop] = client
+        return client
+
+
 class VectorDBBase(ABC):
     """
     Abstract base class for all vector database backends.
@@ -29,6 +50,10 @@ class VectorDBBase(ABC):
 
     Any custom vector database integration must inherit from this class and
     implement all abstract methods.
+
+    The async variants (`asearch`, `aquery`, ...) are for callers running in
+    the event loop. By default they run the sync method in a thread, backends
+    whose client library supports it override them with native async calls.
     """
 
     @abstractmethod
@@ -84,3 +109,36 @@ class VectorDBBase(ABC):
     def reset(self) -> None:
         """Reset the vector database by removing all collections or those matching a condition."""
         pass
+
+    async def ahas_collection(self, collection_name: str) -> bool:
+        return await asyncio.to_thread(self.has_collection, collection_name)
+
+    async def adelete_collection(self, collection_name: str) -> None:
+        return await asyncio.to_thread(self.delete_collection, collection_name)
+
+    async def ainsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        return await asyncio.to_thread(self.insert, collection_name, items)
+
+    async def aupsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        return await asyncio.to_thread(self.upsert, collection_name, items)
+
+    async def asearch(
+        self, collection_name: str, vectors: List[List[Union[float, int]]], limit: int
+    ) -> Optional[SearchResult]:
+        return await asyncio.to_thread(self.search, collection_name, vectors, limit)
+
+    async def aquery(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        return await asyncio.to_thread(self.query, collection_name, filter, limit)
+
+    async def aget(self, collection_name: str) -> Optional[GetResult]:
+        return await asyncio.to_thread(self.get, collection_name)
+
+    async def adelete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        return await asyncio.to_thread(self.delete, collection_name, ids, filter)
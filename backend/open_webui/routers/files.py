@@ -19,9 +19,11 @@ from fastapi import (
     Query,
 )
 from fastapi.responses import FileResponse, StreamingResponse
+from open_webui.config import ENABLE_INGESTION_QUEUE
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES
 
 from open_webui.models.users import Users
 from open_webui.models.files import (
@@ -31,6 +33,7 @@ from open_webui.models.files import (
     Files,
 )
 from open_webui.models.knowledge import Knowledges
+from open_webui.models.ingestion_jobs import IngestionJobModel, IngestionJobs
 
 from open_webui.routers.knowledge import get_knowledge, get_knowledge_list
 from open_webui.routers.retrieval import ProcessFileForm, process_file
@@ -83,6 +86,43 @@ def has_access_to_file(
 ############################
 
 
+def process_uploaded_file(
+    request: Request, file_item: FileModel, file_metadata: dict, user
+):
+    content_type = file_item.meta.get("content_type")
+    if content_type:
+        stt_supported_content_types = getattr(
+            request.app.state.config, "STT_SUPPORTED_CONTENT_TYPES", []
+        )
+
+        if any(
+            fnmatch(content_type, stt_content_type)
+            for stt_content_type in (
+                stt_supported_content_types
+                if stt_supported_content_types
+                and any(t.strip() for t in stt_supported_content_types)
+                else ["audio/*", "video/webm"]
+            )
+        ):
+            file_path = Storage.get_file(file_item.path)
+            result = transcribe(request, file_path, file_metadata)
+
+            process_file(
+                request,
+                ProcessFileForm(file_id=file_item.id, content=result.get("text", "")),
+                user=user,
+            )
+        elif (not content_type.startswith(("image/", "video/"))) or (
+            request.app.state.config.CONTENT_EXTRACTION_ENGINE == "external"
+        ):
+            process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
+    else:
+        log.info(
+            f"File type {content_type} is not provided, but trying to process anyway"
+        )
+        process_file(request, ProcessFileForm(file_id=file_item.id), user=user)
+
+
 @router.post("/", response_model=FileModelResponse)
 def upload_file(
     request: Request,
@@ -153,40 +193,22 @@ def upload_file(
                 }
             ),
         )
-        if process:
-            try:
-                if file.content_type:
-                    stt_supported_content_types = getattr(
-                        request.app.state.config, "STT_SUPPORTED_CONTENT_TYPES", []
-                    )
-
-                    if any(
-                        fnmatch(file.content_type, content_type)
-                        for content_type in (
-                            stt_supported_content_types
-                            if stt_supported_content_types
-                            and any(t.strip() for t in stt_supported_content_types)
-                            else ["audio/*", "video/webm"]
-                        )
-                    ):
-                        file_path = Storage.get_file(file_path)
-                        result = transcribe(request, file_path, file_metadata)
-
-                        process_file(
-                            request,
-                            ProcessFileForm(file_id=id, content=result.get("text", "")),
-                            user=user,
-                        )
-                    elif (not file.content_type.startswith(("image/", "video/"))) or (
-                        request.app.state.config.CONTENT_EXTRACTION_ENGINE == "external"
-                    ):
-                        process_file(request, ProcessFileForm(file_id=id), user=user)
-                else:
-                    log.info(
-                        f"File type {file.content_type} is not provided, but trying to process anyway"
-                    )
-                    process_file(request, ProcessFileForm(file_id=id), user=user)
+        if process and ENABLE_INGESTION_QUEUE and not internal:
+            # Processed by an ingestion worker, which reports the progress
+            # of the job over the socket
+            job = IngestionJobs.insert_new_job(
+                user.id, id, data={"metadata": file_metadata}
+            )
+            if job is None:
+                raise Exception("Error queuing the file for processing")
 
+            file_item = FileModelResponse(
+                **file_item.model_dump(),
+                job=job.model_dump(),
+            )
+        elif process:
+            try:
+                process_uploaded_file(request, file_item, file_metadata, user)
                 file_item = Files.get_file_by_id(id=id)
             except Exception as e:
                 log.exception(e)
@@ -214,6 +236,48 @@ def upload_file(
         )
 
 
+############################
+# Ingestion Jobs
+############################
+
+
+@router.get("/jobs", response_model=list[IngestionJobModel])
+async def get_ingestion_jobs(
+    skip: int = 0, limit: int = 50, user=Depends(get_verified_user)
+):
+    return IngestionJobs.get_jobs_by_user_id(user.id, skip=skip, limit=limit)
+
+
+@router.get("/jobs/{id}", response_model=Optional[IngestionJobModel])
+async def get_ingestion_job_by_id(id: str, user=Depends(get_verified_user)):
+    job = IngestionJobs.get_job_by_id(id)
+    if job and (job.user_id == user.id or user.role == "admin"):
+        return job
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=ERROR_MESSAGES.NOT_FOUND,
+    )
+
+
+@router.post("/jobs/{id}/retry", response_model=Optional[IngestionJobModel])
+async def retry_ingestion_job_by_id(id: str, user=Depends(get_verified_user)):
+    job = IngestionJobs.get_job_by_id(id)
+    if not job or (job.user_id != user.id and user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+    if job.status != "failed":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.DEFAULT("Only failed jobs can be retried"),
+        )
+
+    return IngestionJobs.retry_job_by_id(id)
+
+
 ############################
 # List Files
 ############################
@@ -288,6 +352,7 @@ async def delete_all_files(user=Depends(get_admin_user)):
         try:
             Storage.delete_all_files()
             VECTOR_DB_CLIENT.reset()
+            BM25_INDEXES.reset()
         except Exception as e:
             log.exception(e)
             log.error("Error deleting files")
@@ -608,9 +673,11 @@ async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
 
         result = Files.delete_file_by_id(id)
         if result:
+            IngestionJobs.delete_jobs_by_file_id(id)
             try:
                 Storage.delete_file(file.path)
                 VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                BM25_INDEXES.delete_collection(f"file-{id}")
             except Exception as e:
                 log.exception(e)
                 log.error("Error deleting files")
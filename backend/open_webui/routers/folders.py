@@ -43,6 +43,9 @@ router = APIRouter()
 @router.get("/", response_model=list[FolderModel])
 async def get_folders(user=Depends(get_verified_user)):
     folders = Folders.get_folders_by_user_id(user.id)
+    chats_by_folder_id = Chats.get_chat_title_id_lists_by_folder_ids_and_user_id(
+        [folder.id for folder in folders], user.id
+    )
 
     return [
         {
@@ -50,9 +53,7 @@ async def get_folders(user=Depends(get_verified_user)):
             "items": {
                 "chats": [
                     {"title": chat.title, "id": chat.id, "updated_at": chat.updated_at}
-                    for chat in Chats.get_chats_by_folder_id_and_user_id(
-                        folder.id, user.id
-                    )
+                    for chat in chats_by_folder_id.get(folder.id, [])
                 ]
             },
         }
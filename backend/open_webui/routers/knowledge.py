@@ -10,7 +10,10 @@ from open_webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.models.files import Files, FileModel, FileMetadataResponse
+from open_webui.models.ingestion_jobs import IngestionJobs
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES
+from open_webui.retrieval.reindex import REINDEX_JOB
 from open_webui.routers.retrieval import (
     process_file,
     ProcessFileForm,
@@ -24,6 +27,7 @@ from open_webui.utils.auth import get_verified_user
 from open_webui.utils.access_control import has_access, has_permission
 
 
+from open_webui.config import ENABLE_INGESTION_QUEUE
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.models.models import Models, ModelForm
 
@@ -174,72 +178,36 @@ async def reindex_knowledge_files(request: Request, user=Depends(get_verified_us
             detail=ERROR_MESSAGES.UNAUTHORIZED,
         )
 
-    knowledge_bases = Knowledges.get_knowledge_bases()
+    # Files are reindexed in the background, see /reindex/status for progress
+    if not REINDEX_JOB.start(request, user):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=ERROR_MESSAGES.DEFAULT("Reindexing is already in progress"),
+        )
 
-    log.info(f"Starting reindexing for {len(knowledge_bases)} knowledge bases")
+    return True
 
-    deleted_knowledge_bases = []
 
-    for knowledge_base in knowledge_bases:
-        # -- Robust error handling for missing or invalid data
-        if not knowledge_base.data or not isinstance(knowledge_base.data, dict):
-            log.warning(
-                f"Knowledge base {knowledge_base.id} has no data or invalid data ({knowledge_base.data!r}). Deleting."
-            )
-            try:
-                Knowledges.delete_knowledge_by_id(id=knowledge_base.id)
-                deleted_knowledge_bases.append(knowledge_base.id)
-            except Exception as e:
-                log.error(
-                    f"Failed to delete invalid knowledge base {knowledge_base.id}: {e}"
-                )
-            continue
-
-        try:
-            file_ids = knowledge_base.data.get("file_ids", [])
-            files = Files.get_files_by_ids(file_ids)
-            try:
-                if VECTOR_DB_CLIENT.has_collection(collection_name=knowledge_base.id):
-                    VECTOR_DB_CLIENT.delete_collection(
-                        collection_name=knowledge_base.id
-                    )
-            except Exception as e:
-                log.error(f"Error deleting collection {knowledge_base.id}: {str(e)}")
-                continue  # Skip, don't raise
-
-            failed_files = []
-            for file in files:
-                try:
-                    process_file(
-                        request,
-                        ProcessFileForm(
-                            file_id=file.id, collection_name=knowledge_base.id
-                        ),
-                        user=user,
-                    )
-                except Exception as e:
-                    log.error(
-                        f"Error processing file {file.filename} (ID: {file.id}): {str(e)}"
-                    )
-                    failed_files.append({"file_id": file.id, "error": str(e)})
-                    continue
+@router.get("/reindex/status", response_model=Optional[dict])
+async def get_reindex_status(user=Depends(get_verified_user)):
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.UNAUTHORIZED,
+        )
 
-        except Exception as e:
-            log.error(f"Error processing knowledge base {knowledge_base.id}: {str(e)}")
-            # Don't raise, just continue
-            continue
+    return REINDEX_JOB.get_status()
 
-        if failed_files:
-            log.warning(
-                f"Failed to process {len(failed_files)} files in knowledge base {knowledge_base.id}"
-            )
-            for failed in failed_files:
-                log.warning(f"File ID: {failed['file_id']}, Error: {failed['error']}")
 
-    log.info(
-        f"Reindexing completed. Deleted {len(deleted_knowledge_bases)} invalid knowledge bases: {deleted_knowledge_bases}"
-    )
-    return True
+@router.post("/reindex/cancel", response_model=bool)
+async def cancel_reindex(user=Depends(get_verified_user)):
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=ERROR_MESSAGES.UNAUTHORIZED,
+        )
+
+    return REINDEX_JOB.cancel()
 
 
 ############################
@@ -249,6 +217,8 @@ async def reindex_knowledge_files(request: Request, user=Depends(get_verified_us
 
 class KnowledgeFilesResponse(KnowledgeResponse):
     files: list[FileMetadataResponse]
+    # Ingestion jobs that add files to the knowledge base in the background
+    jobs: Optional[list[dict]] = None
 
 
 @router.get("/{id}", response_model=Optional[KnowledgeFilesResponse])
@@ -361,6 +331,30 @@ def add_file_to_knowledge_by_id(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
+
+    if ENABLE_INGESTION_QUEUE:
+        # The file is added once a worker processed it, after its upload job
+        if not file.data and not IngestionJobs.has_unfinished_upload_job(file.id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.FILE_NOT_PROCESSED,
+            )
+
+        job = IngestionJobs.insert_new_job(user.id, file.id, knowledge_id=id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.DEFAULT("Error queuing the file"),
+            )
+
+        return KnowledgeFilesResponse(
+            **knowledge.model_dump(),
+            files=Files.get_file_metadatas_by_ids(
+                (knowledge.data or {}).get("file_ids", [])
+            ),
+            jobs=[job.model_dump()],
+        )
+
     if not file.data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -451,6 +445,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEXES.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     # Add content to the vector database
     try:
@@ -522,6 +517,7 @@ def remove_file_from_knowledge_by_id(
         VECTOR_DB_CLIENT.delete(
             collection_name=knowledge.id, filter={"file_id": form_data.file_id}
         )
+        BM25_INDEXES.delete(knowledge.id, filter={"file_id": form_data.file_id})
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -532,6 +528,7 @@ def remove_file_from_knowledge_by_id(
         file_collection = f"file-{form_data.file_id}"
         if VECTOR_DB_CLIENT.has_collection(collection_name=file_collection):
             VECTOR_DB_CLIENT.delete_collection(collection_name=file_collection)
+            BM25_INDEXES.delete_collection(file_collection)
     except Exception as e:
         log.debug("This was most likely caused by bypassing embedding processing")
         log.debug(e)
@@ -630,6 +627,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
     # Clean up vector DB
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -663,6 +661,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEXES.delete_collection(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -716,6 +715,28 @@ def add_files_to_knowledge_batch(
             )
         files.append(file)
 
+    if ENABLE_INGESTION_QUEUE:
+        # Large batches go to the bulk lane, behind interactive uploads
+        jobs = []
+        for file in files:
+            job = IngestionJobs.insert_new_job(
+                user.id, file.id, knowledge_id=id, lane="bulk"
+            )
+            if job is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=ERROR_MESSAGES.DEFAULT("Error queuing the files"),
+                )
+            jobs.append(job.model_dump())
+
+        return KnowledgeFilesResponse(
+            **knowledge.model_dump(),
+            files=Files.get_file_metadatas_by_ids(
+                (knowledge.data or {}).get("file_ids", [])
+            ),
+            jobs=jobs,
+        )
+
     # Process files
     try:
         result = process_files_batch(
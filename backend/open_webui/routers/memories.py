@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import logging
 from typing import Optional
 
 from open_webui.models.memories import Memories, MemoryModel
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEXES
 from open_webui.utils.auth import get_verified_user
 from open_webui.env import SRC_LOG_LEVELS
 
@@ -51,19 +53,20 @@ async def add_memory(
 ):
     memory = Memories.insert_new_memory(user.id, form_data.content)
 
-    VECTOR_DB_CLIENT.upsert(
+    await VECTOR_DB_CLIENT.aupsert(
         collection_name=f"user-memory-{user.id}",
         items=[
             {
                 "id": memory.id,
                 "text": memory.content,
-                "vector": request.app.state.EMBEDDING_FUNCTION(
-                    memory.content, user=user
+                "vector": await run_in_threadpool(
+                    request.app.state.EMBEDDING_FUNCTION, memory.content, user=user
                 ),
                 "metadata": {"created_at": memory.created_at},
             }
         ],
     )
+    BM25_INDEXES.delete_collection(f"user-memory-{user.id}")
 
     return memory
 
@@ -82,9 +85,12 @@ class QueryMemoryForm(BaseModel):
 async def query_memory(
     request: Request, form_data: QueryMemoryForm, user=Depends(get_verified_user)
 ):
-    results = VECTOR_DB_CLIENT.search(
+    vector = await run_in_threadpool(
+        request.app.state.EMBEDDING_FUNCTION, form_data.content, user=user
+    )
+    results = await VECTOR_DB_CLIENT.asearch(
         collection_name=f"user-memory-{user.id}",
-        vectors=[request.app.state.EMBEDDING_FUNCTION(form_data.content, user=user)],
+        vectors=[vector],
         limit=form_data.k,
     )
 
@@ -98,26 +104,31 @@ async def query_memory(
 async def reset_memory_from_vector_db(
     request: Request, user=Depends(get_verified_user)
 ):
-    VECTOR_DB_CLIENT.delete_collection(f"user-memory-{user.id}")
+    await VECTOR_DB_CLIENT.adelete_collection(f"user-memory-{user.id}")
 
     memories = Memories.get_memories_by_user_id(user.id)
-    VECTOR_DB_CLIENT.upsert(
-        collection_name=f"user-memory-{user.id}",
-        items=[
-            {
-                "id": memory.id,
-                "text": memory.content,
-                "vector": request.app.state.EMBEDDING_FUNCTION(
-                    memory.content, user=user
-                ),
-                "metadata": {
-                    "created_at": memory.created_at,
-                    "updated_at": memory.updated_at,
-                },
-            }
-            for memory in memories
-        ],
-    )
+    if memories:
+        vectors = await run_in_threadpool(
+            request.app.state.EMBEDDING_FUNCTION,
+            [memory.content for memory in memories],
+            user=user,
+        )
+        await VECTOR_DB_CLIENT.aupsert(
+            collection_name=f"user-memory-{user.id}",
+            items=[
+                {
+                    "id": memory.id,
+                    "text": memory.content,
+                    "vector": vector,
+                    "metadata": {
+                        "created_at": memory.created_at,
+                        "updated_at": memory.updated_at,
+                    },
+                }
+                for memory, vector in zip(memories, vectors)
+            ],
+        )
+    BM25_INDEXES.delete_collection(f"user-memory-{user.id}")
 
     return True
 
@@ -133,7 +144,8 @@ async def delete_memory_by_user_id(user=Depends(get_verified_user)):
 
     if result:
         try:
-            VECTOR_DB_CLIENT.delete_collection(f"user-memory-{user.id}")
+            await VECTOR_DB_CLIENT.adelete_collection(f"user-memory-{user.id}")
+            BM25_INDEXES.delete_collection(f"user-memory-{user.id}")
         except Exception as e:
             log.error(e)
         return True
@@ -160,14 +172,16 @@ async def update_memory_by_id(
         raise HTTPException(status_code=404, detail="Memory not found")
 
     if form_data.content is not None:
-        VECTOR_DB_CLIENT.upsert(
+        await VECTOR_DB_CLIENT.aupsert(
             collection_name=f"user-memory-{user.id}",
             items=[
                 {
                     "id": memory.id,
                     "text": memory.content,
-                    "vector": request.app.state.EMBEDDING_FUNCTION(
-                        memory.content, user=user
+                    "vector": await run_in_threadpool(
+                        request.app.state.EMBEDDING_FUNCTION,
+                        memory.content,
+                        user=user,
                     ),
                     "metadata": {
                         "created_at": memory.created_at,
@@ -176,6 +190,7 @@ async def update_memory_by_id(
                 }
             ],
         )
+        BM25_INDEXES.delete_collection(f"user-memory-{user.id}")
 
     return memory
 
@@ -190,9 +205,10 @@ async def delete_memory_by_id(memory_id: str, user=Depends(get_verified_user)):
     result = Memories.delete_memory_by_id_and_user_id(memory_id, user.id)
 
     if result:
-        VECTOR_DB_CLIENT.delete(
+        await VECTOR_DB_CLIENT.adelete(
             collection_name=f"user-memory-{user.id}", ids=[memory_id]
         )
+        BM25_INDEXES.delete(f"user-memory-{user.id}", ids=[memory_id])
         return True
 
     return False
@@ -1,7 +1,3 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
@@ -50,6 +46,8 @@ from open_webui.utils.payload import (
     apply_model_system_prompt_to_body,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.session_pool import SESSION_POOL
+from open_webui.utils.ollama_router import OLLAMA_ROUTER, OllamaNodeLease
 from open_webui.utils.access_control import has_access
 
 
@@ -81,26 +79,27 @@ log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 async def send_get_request(url, key=None, user: UserModel = None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url,
-                headers={
-                    "Content-Type": "application/json",
-                    **({"Authorization": f"Bearer {key}"} if key else {}),
-                    **(
-                        {
-                            "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                            "X-OpenWebUI-User-Id": user.id,
-                            "X-OpenWebUI-User-Email": user.email,
-                            "X-OpenWebUI-User-Role": user.role,
-                        }
-                        if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                        else {}
-                    ),
-                },
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as response:
-                return await response.json()
+        session = SESSION_POOL.get_session(url)
+        async with session.get(
+            url,
+            headers={
+                "Content-Type": "application/json",
+                **({"Authorization": f"Bearer {key}"} if key else {}),
+                **(
+                    {
+                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                        "X-OpenWebUI-User-Id": user.id,
+                        "X-OpenWebUI-User-Email": user.email,
+                        "X-OpenWebUI-User-Role": user.role,
+                    }
+                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
+                    else {}
+                ),
+            },
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
@@ -109,10 +108,15 @@ async def send_get_request(url, key=None, user: UserModel = None):
 
 async def cleanup_response(
     response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
+    session: Optional[aiohttp.ClientSession] = None,
+    lease: Optional[OllamaNodeLease] = None,
 ):
+    if lease:
+        lease.release()
     if response:
-        response.close()
+        # Hands the connection back to the pool, or closes it if the body was
+        # not read to the end
+        response.release()
     if session:
         await session.close()
 
@@ -125,13 +129,17 @@ async def send_post_request(
     content_type: Optional[str] = None,
     user: UserModel = None,
     metadata: Optional[dict] = None,
+    node: Optional[str] = None,
 ):
+    """
+    POST to Ollama. If `node` (the base URL of the Ollama node) is given, the
+    request is counted in flight and its outcome reported to the router.
+    """
 
     r = None
+    lease = OLLAMA_ROUTER.acquire(node) if node else None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = SESSION_POOL.get_session(url)
 
         r = await session.post(
             url,
@@ -156,12 +164,13 @@ async def send_post_request(
                 ),
             },
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
 
         if r.ok is False:
             try:
                 res = await r.json()
-                await cleanup_response(r, session)
+                await cleanup_response(r)
                 if "error" in res:
                     raise HTTPException(status_code=r.status, detail=res["error"])
             except HTTPException as e:
@@ -181,12 +190,10 @@ async def send_post_request(
                 response_headers["Content-Type"] = content_type
 
             return StreamingResponse(
-                r.content,
+                stream_content(r.content, lease) if lease else r.content,
                 status_code=r.status,
                 headers=response_headers,
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(cleanup_response, response=r, lease=lease),
             )
         else:
             res = await r.json()
@@ -202,8 +209,21 @@ async def send_post_request(
             detail=detail if e else "Open WebUI: Server Connection Error",
         )
     finally:
+        if lease and not (stream and r is not None and r.ok):
+            # Only connection errors and server errors count against the node
+            lease.release(success=r is not None and r.status < 500)
         if not stream:
-            await cleanup_response(r, session)
+            await cleanup_response(r)
+
+
+async def stream_content(content: aiohttp.StreamReader, lease: OllamaNodeLease):
+    # Also releases the node if the client disconnects before the end, when
+    # the background task of the response does not run
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        lease.release()
 
 
 def get_api_key(idx, url, configs):
@@ -214,6 +234,39 @@ def get_api_key(idx, url, configs):
     )  # Legacy support
 
 
+async def get_ollama_loaded_model_names(
+    request: Request, url_idx: int
+) -> Optional[list[str]]:
+    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
+        str(url_idx),
+        request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
+    )
+
+    response = await send_get_request(f"{url}/api/ps", api_config.get("key", None))
+    if response is None:
+        return None
+
+    prefix_id = api_config.get("prefix_id", None)
+    return [
+        f"{prefix_id}.{model['model']}" if prefix_id else model["model"]
+        for model in response.get("models", [])
+    ]
+
+
+def select_ollama_url_idx(
+    request: Request, model: str, url_idxs: list[int], chat_id: Optional[str] = None
+) -> int:
+    urls = {
+        url_idx: request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+        for url_idx in url_idxs
+    }
+    OLLAMA_ROUTER.refresh_loaded_models(
+        urls, lambda url_idx: get_ollama_loaded_model_names(request, url_idx)
+    )
+    return OLLAMA_ROUTER.select(model, urls, chat_id)
+
+
 ##########################################
 #
 # API routes
@@ -316,6 +369,10 @@ async def update_config(
         if key in keys
     }
 
+    # Rebuild the model list from the new connections on next use
+    request.app.state.BASE_MODELS = []
+    await get_all_models.cache.clear()
+
     return {
         "ENABLE_OLLAMA_API": request.app.state.config.ENABLE_OLLAMA_API,
         "OLLAMA_BASE_URLS": request.app.state.config.OLLAMA_BASE_URLS,
@@ -1037,7 +1094,7 @@ async def embed(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_ollama_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1124,7 +1181,7 @@ async def embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_ollama_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1217,7 +1274,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = select_ollama_url_idx(request, model, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1239,6 +1296,7 @@ async def generate_completion(
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
+        node=url,
     )
 
 
@@ -1276,7 +1334,12 @@ class GenerateChatCompletionForm(BaseModel):
     )
 
 
-async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] = None):
+async def get_ollama_url(
+    request: Request,
+    model: str,
+    url_idx: Optional[int] = None,
+    chat_id: Optional[str] = None,
+):
     if url_idx is None:
         models = request.app.state.OLLAMA_MODELS
         if model not in models:
@@ -1284,7 +1347,9 @@ async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] =
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idx = select_ollama_url_idx(
+            request, model, models[model].get("urls", []), chat_id
+        )
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
@@ -1354,7 +1419,12 @@ async def generate_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
+    url, url_idx = await get_ollama_url(
+        request,
+        payload["model"],
+        url_idx,
+        chat_id=metadata.get("chat_id") if metadata else None,
+    )
     api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
         str(url_idx),
         request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
@@ -1372,6 +1442,7 @@ async def generate_chat_completion(
         content_type="application/x-ndjson",
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -1460,7 +1531,12 @@ async def generate_openai_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
+    url, url_idx = await get_ollama_url(
+        request,
+        payload["model"],
+        url_idx,
+        chat_id=metadata.get("chat_id") if metadata else None,
+    )
     api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
         str(url_idx),
         request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
@@ -1478,6 +1554,7 @@ async def generate_openai_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -1543,7 +1620,12 @@ async def generate_openai_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url, url_idx = await get_ollama_url(request, payload["model"], url_idx)
+    url, url_idx = await get_ollama_url(
+        request,
+        payload["model"],
+        url_idx,
+        chat_id=metadata.get("chat_id") if metadata else None,
+    )
     api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
         str(url_idx),
         request.app.state.config.OLLAMA_API_CONFIGS.get(url, {}),  # Legacy support
@@ -1560,6 +1642,7 @@ async def generate_openai_chat_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -478,7 +478,7 @@ class OpenWebUIScheduler:
             # Get user sessions from the socket pool
             from open_webui.socket.main import USER_POOL
             
-            user_sessions = USER_POOL.get(self.user_id, [])
+            user_sessions = await USER_POOL.aget_cached(self.user_id, [])
             if not user_sessions:
                 logger.info(f"No active sessions for user {self.user_id}")
                 return
@@ -513,7 +513,7 @@ class OpenWebUIScheduler:
             # Get user sessions from the socket pool
             from open_webui.socket.main import USER_POOL
             
-            user_sessions = USER_POOL.get(self.user_id, [])
+            user_sessions = await USER_POOL.aget_cached(self.user_id, [])
             if not user_sessions:
                 logger.info(f"No active sessions for user {self.user_id}")
                 return
@@ -7,7 +7,6 @@ import sys
 import time
 from typing import Dict, Set
 from redis import asyncio as aioredis
-import pycrdt as Y
 
 from open_webui.models.users import Users, UserNameResponse
 from open_webui.models.channels import Channels
@@ -19,15 +18,26 @@ from open_webui.utils.redis import (
 )
 
 from open_webui.env import (
+    CHAT_EVENT_EMIT_INTERVAL,
+    ENABLE_CHAT_EVENT_EMIT_DELTA,
     ENABLE_WEBSOCKET_SUPPORT,
     WEBSOCKET_MANAGER,
     WEBSOCKET_REDIS_URL,
     WEBSOCKET_REDIS_LOCK_TIMEOUT,
+    WEBSOCKET_USER_POOL_CACHE_TTL,
     WEBSOCKET_SENTINEL_PORT,
     WEBSOCKET_SENTINEL_HOSTS,
+    YDOC_COMPACTION_THRESHOLD,
+    YDOC_COMPACTION_INTERVAL,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock, YdocManager
+from open_webui.socket.utils import (
+    AsyncRedisDict,
+    ChatEventCoalescer,
+    LocalDict,
+    RedisLock,
+    YdocManager,
+)
 from open_webui.tasks import create_task, stop_item_tasks
 from open_webui.utils.redis import get_redis_connection
 from open_webui.utils.access_control import has_access, get_users_with_access
@@ -91,20 +101,24 @@ if WEBSOCKET_MANAGER == "redis":
     redis_sentinels = get_sentinels_from_env(
         WEBSOCKET_SENTINEL_HOSTS, WEBSOCKET_SENTINEL_PORT
     )
-    SESSION_POOL = RedisDict(
+    SESSION_POOL = AsyncRedisDict(
         "open-webui:session_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        async_redis=REDIS,
     )
-    USER_POOL = RedisDict(
+    USER_POOL = AsyncRedisDict(
         "open-webui:user_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        async_redis=REDIS,
+        cache_ttl=WEBSOCKET_USER_POOL_CACHE_TTL,
     )
-    USAGE_POOL = RedisDict(
+    USAGE_POOL = AsyncRedisDict(
         "open-webui:usage_pool",
         redis_url=WEBSOCKET_REDIS_URL,
         redis_sentinels=redis_sentinels,
+        async_redis=REDIS,
     )
 
     clean_up_lock = RedisLock(
@@ -116,17 +130,30 @@ if WEBSOCKET_MANAGER == "redis":
     aquire_func = clean_up_lock.aquire_lock
     renew_func = clean_up_lock.renew_lock
     release_func = clean_up_lock.release_lock
+
+    # Yjs updates are stored as raw bytes
+    YDOC_REDIS = get_redis_connection(
+        redis_url=WEBSOCKET_REDIS_URL,
+        redis_sentinels=redis_sentinels,
+        async_mode=True,
+        decode_responses=False,
+    )
 else:
-    SESSION_POOL = {}
-    USER_POOL = {}
-    USAGE_POOL = {}
+    SESSION_POOL = LocalDict()
+    USER_POOL = LocalDict()
+    USAGE_POOL = LocalDict()
 
     aquire_func = release_func = renew_func = lambda: True
 
+    YDOC_REDIS = None
+
 
 YDOC_MANAGER = YdocManager(
     redis=REDIS,
     redis_key_prefix="open-webui:ydoc:documents",
+    binary_redis=YDOC_REDIS,
+    compaction_threshold=YDOC_COMPACTION_THRESHOLD,
+    compaction_interval=YDOC_COMPACTION_INTERVAL,
 )
 
 
@@ -159,7 +186,9 @@ async def periodic_usage_pool_cleanup():
 
             now = int(time.time())
             send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
+            expired_model_ids = []
+            updated_usage = {}
+            for model_id, connections in await USAGE_POOL.aitems():
                 # Creating a list of sids to remove if they have timed out
                 expired_sids = [
                     sid
@@ -172,11 +201,14 @@ async def periodic_usage_pool_cleanup():
 
                 if not connections:
                     log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
+                    expired_model_ids.append(model_id)
+                elif expired_sids:
+                    updated_usage[model_id] = connections
 
                 send_usage = True
+
+            await USAGE_POOL.adelete(*expired_model_ids)
+            await USAGE_POOL.aset_many(updated_usage)
             await asyncio.sleep(TIMEOUT_DURATION)
     finally:
         release_func()
@@ -237,16 +269,26 @@ def get_active_status_by_user_id(user_id):
 
 @sio.on("usage")
 async def usage(sid, data):
-    if sid in SESSION_POOL:
+    if await SESSION_POOL.acontains(sid):
         model_id = data["model"]
         # Record the timestamp for the last update
         current_time = int(time.time())
 
         # Store the new usage data and task
-        USAGE_POOL[model_id] = {
-            **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-            sid: {"updated_at": current_time},
-        }
+        await USAGE_POOL.aset(
+            model_id,
+            {
+                **(await USAGE_POOL.aget(model_id, {})),
+                sid: {"updated_at": current_time},
+            },
+        )
+
+
+async def add_session_to_pools(sid, user):
+    await asyncio.gather(
+        SESSION_POOL.aset(sid, user.model_dump()),
+        USER_POOL.aappend(user.id, sid),
+    )
 
 
 @sio.event
@@ -259,11 +301,7 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump()
-            if user.id in USER_POOL:
-                USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-            else:
-                USER_POOL[user.id] = [sid]
+            await add_session_to_pools(sid, user)
 
 
 @sio.on("user-join")
@@ -281,11 +319,7 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump()
-    if user.id in USER_POOL:
-        USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-    else:
-        USER_POOL[user.id] = [sid]
+    await add_session_to_pools(sid, user)
 
     # Join all the channels
     channels = Channels.get_channels_by_user_id(user.id)
@@ -369,7 +403,7 @@ async def channel_events(sid, data):
                 "channel_id": data["channel_id"],
                 "message_id": data.get("message_id", None),
                 "data": event_data,
-                "user": UserNameResponse(**SESSION_POOL[sid]).model_dump(),
+                "user": UserNameResponse(**(await SESSION_POOL.aget(sid))).model_dump(),
             },
             room=room,
         )
@@ -378,7 +412,7 @@ async def channel_events(sid, data):
 @sio.on("ydoc:document:join")
 async def ydoc_document_join(sid, data):
     """Handle user joining a document"""
-    user = SESSION_POOL.get(sid)
+    user = await SESSION_POOL.aget(sid)
 
     try:
         document_id = data["document_id"]
@@ -414,14 +448,8 @@ async def ydoc_document_join(sid, data):
 
         active_session_ids = get_session_ids_from_room(f"doc_{document_id}")
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
         # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        state_update = await YDOC_MANAGER.get_state(document_id)
         await sio.emit(
             "ydoc:document:state",
             {
@@ -490,14 +518,8 @@ async def yjs_document_state(sid, data):
             log.warning(f"Document {document_id} not found")
             return
 
-        # Get the Yjs document state
-        ydoc = Y.Doc()
-        updates = await YDOC_MANAGER.get_updates(document_id)
-        for update in updates:
-            ydoc.apply_update(bytes(update))
-
         # Encode the entire document state as an update
-        state_update = ydoc.get_update()
+        state_update = await YDOC_MANAGER.get_state(document_id)
 
         await sio.emit(
             "ydoc:document:state",
@@ -529,7 +551,7 @@ async def yjs_document_update(sid, data):
 
         await YDOC_MANAGER.append_to_updates(
             document_id=document_id,
-            update=update,  # Convert list of bytes to bytes
+            update=bytes(update),  # Convert list of bytes to bytes
         )
 
         # Broadcast update to all other users in the document
@@ -548,7 +570,7 @@ async def yjs_document_update(sid, data):
         async def debounced_save():
             await asyncio.sleep(0.5)
             await document_save_handler(
-                document_id, data.get("data", {}), SESSION_POOL.get(sid)
+                document_id, data.get("data", {}), await SESSION_POOL.aget(sid)
             )
 
         if data.get("data"):
@@ -613,15 +635,11 @@ async def yjs_awareness_update(sid, data):
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
-
-        user_id = user["id"]
-        USER_POOL[user_id] = [_sid for _sid in USER_POOL[user_id] if _sid != sid]
+    user = await SESSION_POOL.aget(sid)
+    if user:
+        await SESSION_POOL.adelete(sid)
 
-        if len(USER_POOL[user_id]) == 0:
-            del USER_POOL[user_id]
+        await USER_POOL.aremove(user["id"], sid)
 
         await YDOC_MANAGER.remove_user_from_all_documents(sid)
     else:
@@ -630,12 +648,12 @@ async def disconnect(sid):
 
 
 def get_event_emitter(request_info, update_db=True):
-    async def __event_emitter__(event_data):
+    async def emit(event_data):
         user_id = request_info["user_id"]
 
         session_ids = list(
             set(
-                USER_POOL.get(user_id, [])
+                (await USER_POOL.aget_cached(user_id, []))
                 + (
                     [request_info.get("session_id")]
                     if request_info.get("session_id")
@@ -644,20 +662,27 @@ def get_event_emitter(request_info, update_db=True):
             )
         )
 
-        emit_tasks = [
-            sio.emit(
-                "chat-events",
-                {
-                    "chat_id": request_info.get("chat_id", None),
-                    "message_id": request_info.get("message_id", None),
-                    "data": event_data,
-                },
-                to=session_id,
-            )
-            for session_id in session_ids
-        ]
+        if not session_ids:
+            return
+
+        # A single emit to all sessions, one message on the Redis manager
+        await sio.emit(
+            "chat-events",
+            {
+                "chat_id": request_info.get("chat_id", None),
+                "message_id": request_info.get("message_id", None),
+                "data": event_data,
+            },
+            to=session_ids,
+        )
+
+    if CHAT_EVENT_EMIT_INTERVAL > 0:
+        emit = ChatEventCoalescer(
+            emit, CHAT_EVENT_EMIT_INTERVAL, delta=ENABLE_CHAT_EVENT_EMIT_DELTA
+        )
 
-        await asyncio.gather(*emit_tasks)
+    async def __event_emitter__(event_data):
+        await emit(event_data)
 
         if update_db:
             if "type" in event_data and event_data["type"] == "status":
@@ -1,9 +1,16 @@
+import asyncio
 import json
+import logging
+import time
 import uuid
+from open_webui.env import SRC_LOG_LEVELS
 from open_webui.utils.redis import get_redis_connection
 from typing import Optional, List, Tuple
 import pycrdt as Y
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
+
 
 class RedisLock:
     def __init__(self, redis_url, lock_name, timeout_secs, redis_sentinels=[]):
@@ -93,43 +100,508 @@ class RedisDict:
         return self[key]
 
 
+class AsyncRedisDict(RedisDict):
+    """
+    RedisDict with awaitable counterparts of its methods (`aget`, `aset`, ...)
+    for use on the event loop, backed by a pooled redis.asyncio client.
+
+    With `cache_ttl`, `aget_cached` serves values from a local cache for that
+    many seconds. Writes from this process invalidate the cache right away,
+    writes from other processes are seen once the entry expires, so it is
+    only meant for lookups, not for read-modify-write.
+    """
+
+    # List updates run as scripts so that concurrent read-modify-writes, from
+    # this process or others, cannot drop each other's items
+    APPEND_SCRIPT = """
+    local value = redis.call('HGET', KEYS[1], ARGV[1])
+    local items = value and cjson.decode(value) or {}
+    table.insert(items, cjson.decode(ARGV[2]))
+    redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(items))
+    """
+
+    REMOVE_SCRIPT = """
+    local value = redis.call('HGET', KEYS[1], ARGV[1])
+    if not value then
+        return 0
+    end
+    local item = cjson.decode(ARGV[2])
+    local items = {}
+    for _, _item in ipairs(cjson.decode(value)) do
+        if _item ~= item then
+            table.insert(items, _item)
+        end
+    end
+    if #items == 0 then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    else
+        redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(items))
+    end
+    return 1
+    """
+
+    def __init__(
+        self, name, redis_url, redis_sentinels=[], async_redis=None, cache_ttl=0
+    ):
+        super().__init__(name, redis_url, redis_sentinels)
+        self.async_redis = async_redis or get_redis_connection(
+            redis_url, redis_sentinels, async_mode=True, decode_responses=True
+        )
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+
+    def __setitem__(self, key, value):
+        self._cache.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._cache.pop(key, None)
+        super().__delitem__(key)
+
+    def clear(self):
+        self._cache.clear()
+        super().clear()
+
+    async def aget(self, key, default=None):
+        value = await self.async_redis.hget(self.name, key)
+        if value is None:
+            return default
+        return json.loads(value)
+
+    async def aget_cached(self, key, default=None):
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            value = cached[1]
+        else:
+            value = await self.aget(key)
+            if self.cache_ttl:
+                self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+        return value if value is not None else default
+
+    async def aset(self, key, value):
+        self._cache.pop(key, None)
+        await self.async_redis.hset(self.name, key, json.dumps(value))
+
+    async def aset_many(self, mapping):
+        if not mapping:
+            return
+        for key in mapping:
+            self._cache.pop(key, None)
+        await self.async_redis.hset(
+            self.name, mapping={k: json.dumps(v) for k, v in mapping.items()}
+        )
+
+    async def adelete(self, *keys):
+        if not keys:
+            return 0
+        for key in keys:
+            self._cache.pop(key, None)
+        return await self.async_redis.hdel(self.name, *keys)
+
+    async def acontains(self, key):
+        return await self.async_redis.hexists(self.name, key)
+
+    async def aitems(self):
+        return [
+            (k, json.loads(v))
+            for k, v in (await self.async_redis.hgetall(self.name)).items()
+        ]
+
+    async def aappend(self, key, item):
+        """Append `item` to the list stored at `key`, atomically."""
+        self._cache.pop(key, None)
+        await self.async_redis.eval(
+            self.APPEND_SCRIPT, 1, self.name, key, json.dumps(item)
+        )
+
+    async def aremove(self, key, item):
+        """
+        Remove `item` from the list stored at `key`, atomically, deleting the
+        key once the list is empty.
+        """
+        self._cache.pop(key, None)
+        await self.async_redis.eval(
+            self.REMOVE_SCRIPT, 1, self.name, key, json.dumps(item)
+        )
+
+
+class LocalDict(dict):
+    """In-memory stand-in for AsyncRedisDict when Redis is not used."""
+
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aget_cached(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value):
+        self[key] = value
+
+    async def aset_many(self, mapping):
+        self.update(mapping)
+
+    async def adelete(self, *keys):
+        return len([self.pop(key) for key in keys if key in self])
+
+    async def acontains(self, key):
+        return key in self
+
+    async def aitems(self):
+        return list(self.items())
+
+    async def aappend(self, key, item):
+        self[key] = [*self.get(key, []), item]
+
+    async def aremove(self, key, item):
+        items = [_item for _item in self.get(key, []) if _item != item]
+        if items:
+            self[key] = items
+        else:
+            self.pop(key, None)
+
+
+class ChatEventCoalescer:
+    """
+    Emits the streamed `chat:completion` content events of a message at most
+    once per `interval` seconds, sending only the latest content. Any other
+    event first flushes the pending content, so the order of events is kept.
+
+    With `delta`, content that extends the last emitted content is sent as a
+    `chat:message:delta` event carrying only the appended text.
+    """
+
+    CONTENT_EVENT_TYPES = {"message", "replace", "chat:message", "chat:message:delta"}
+
+    def __init__(self, emit, interval: float, delta: bool = False):
+        self.emit = emit
+        self.interval = interval
+        self.delta = delta
+
+        self._pending = None
+        self._sent = None
+        self._emitted_at = 0.0
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _get_content(event) -> Optional[str]:
+        if isinstance(event, dict) and event.get("type") == "chat:completion":
+            data = event.get("data")
+            if (
+                isinstance(data, dict)
+                and data.keys() == {"content"}
+                and isinstance(data["content"], str)
+            ):
+                return data["content"]
+        return None
+
+    async def __call__(self, event):
+        content = self._get_content(event)
+        if content is None:
+            await self.flush()
+
+            event_type = event.get("type") if isinstance(event, dict) else None
+            data = event.get("data") if isinstance(event, dict) else None
+            if event_type == "chat:completion" and isinstance(data, dict):
+                self._sent = data.get("content", self._sent)
+            elif event_type in self.CONTENT_EVENT_TYPES:
+                # The client changed the content, next time send it whole
+                self._sent = None
+            await self.emit(event)
+            return
+
+        self._pending = content
+        elapsed = time.monotonic() - self._emitted_at
+        if elapsed >= self.interval:
+            await self.flush()
+        elif self._task is None:
+            self._task = asyncio.create_task(self._flush_later(self.interval - elapsed))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            self._task = None
+
+        async with self._lock:
+            content = self._pending
+            self._pending = None
+            if content is None:
+                return
+
+            self._emitted_at = time.monotonic()
+            if self.delta and self._sent is not None and content.startswith(self._sent):
+                event = {
+                    "type": "chat:message:delta",
+                    "data": {"content": content[len(self._sent) :]},
+                }
+            else:
+                event = {"type": "chat:completion", "data": {"content": content}}
+            self._sent = content
+
+            if event["data"]["content"] or event["type"] == "chat:completion":
+                await self.emit(event)
+
+
+def merge_updates(updates: List[bytes]) -> bytes:
+    """Encode the document resulting from `updates` as a single update."""
+    ydoc = Y.Doc()
+    for update in updates:
+        ydoc.apply_update(update)
+    return ydoc.get_update()
+
+
 class YdocManager:
+    """
+    Keeps the Yjs updates of collaborative documents, in Redis when shared
+    between workers.
+
+    Updates are appended as raw bytes to the tail of a document. Once the tail
+    reaches `compaction_threshold` updates, and every `compaction_interval`
+    seconds, it is merged into a snapshot of the document, so that loading a
+    document applies the snapshot and a short tail instead of every update
+    ever made. Updates are stored through `binary_redis`, a client that does
+    not decode responses.
+    """
+
+    # Seconds a compaction lock lasts without being renewed
+    COMPACTION_LOCK_TIMEOUT = 60
+
+    # The compaction lock scripts only act while the lock holds the token of
+    # the compaction, so that one that lost its lock (e.g. by outliving it)
+    # cannot release the next one's lock or overwrite its newer snapshot
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    RENEW_LOCK_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    # KEYS: lock, snapshot, tail, legacy updates
+    # ARGV: lock token, snapshot, number of tail updates merged into it
+    SAVE_SNAPSHOT_SCRIPT = """
+    if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+        return 0
+    end
+    redis.call('SET', KEYS[2], ARGV[2])
+    redis.call('LTRIM', KEYS[3], tonumber(ARGV[3]), -1)
+    redis.call('DEL', KEYS[4])
+    return 1
+    """
+
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = "open-webui:ydoc:documents",
+        binary_redis=None,
+        compaction_threshold: int = 500,
+        compaction_interval: float = 300,
     ):
         self._updates = {}
         self._users = {}
         self._redis = redis
+        self._binary_redis = binary_redis
         self._redis_key_prefix = redis_key_prefix
 
+        self.compaction_threshold = compaction_threshold
+        self.compaction_interval = compaction_interval
+        # Documents being compacted by this process
+        self._compacting = set()
+        self._tasks = set()
+
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
+        update = bytes(update)
+
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
+            redis_key = f"{self._redis_key_prefix}:{document_id}:tail"
+            length = await self._binary_redis.rpush(redis_key, update)
         else:
             if document_id not in self._updates:
                 self._updates[document_id] = []
             self._updates[document_id].append(update)
+            length = len(self._updates[document_id])
+
+        if self.compaction_threshold and length >= self.compaction_threshold:
+            if document_id not in self._compacting:
+                task = asyncio.create_task(self.compact(document_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
 
     async def get_updates(self, document_id: str) -> List[bytes]:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            updates, _ = await self._get_redis_updates(document_id)
+            return updates
         else:
             return self._updates.get(document_id, [])
 
+    async def _get_redis_updates(self, document_id: str) -> Tuple[List[bytes], int]:
+        """Get the updates of a document, and how many of them are the tail."""
+        # Read atomically, so that a concurrent compaction cannot move updates
+        # from the tail to the snapshot in between
+        async with self._binary_redis.pipeline(transaction=True) as pipe:
+            pipe.get(f"{self._redis_key_prefix}:{document_id}:snapshot")
+            pipe.lrange(f"{self._redis_key_prefix}:{document_id}:tail", 0, -1)
+            # Updates stored as JSON lists of ints by previous versions
+            pipe.lrange(f"{self._redis_key_prefix}:{document_id}:updates", 0, -1)
+            snapshot, tail, legacy_updates = await pipe.execute()
+
+        updates = (
+            ([snapshot] if snapshot else [])
+            + [bytes(json.loads(update)) for update in legacy_updates]
+            + tail
+        )
+        return updates, len(tail)
+
+    async def get_state(self, document_id: str) -> bytes:
+        """Get the whole document encoded as a single update."""
+        updates = await self.get_updates(document_id)
+        if len(updates) == 1:
+            return updates[0]
+        return await asyncio.to_thread(merge_updates, updates)
+
+    async def compact(self, document_id: str):
+        """Merge the tail of updates of a document into its snapshot."""
+        document_id = document_id.replace(":", "_")
+        if document_id in self._compacting:
+            return
+
+        self._compacting.add(document_id)
+        try:
+            if self._redis:
+                await self._compact_redis(document_id)
+            else:
+                updates = self._updates.get(document_id)
+                if not updates or len(updates) < 2:
+                    return
+
+                count = len(updates)
+                snapshot = await asyncio.to_thread(merge_updates, updates[:count])
+                # Updates appended meanwhile stay in the tail
+                if self._updates.get(document_id) is updates:
+                    updates[:count] = [snapshot]
+        except Exception as e:
+            log.error(f"Error compacting document {document_id}: {e}")
+        finally:
+            self._compacting.discard(document_id)
+
+    async def _compact_redis(self, document_id: str):
+        snapshot_key = f"{self._redis_key_prefix}:{document_id}:snapshot"
+        tail_key = f"{self._redis_key_prefix}:{document_id}:tail"
+        legacy_key = f"{self._redis_key_prefix}:{document_id}:updates"
+        lock_key = f"{self._redis_key_prefix}:{document_id}:compaction_lock"
+
+        # Only one worker may trim the tail at a time
+        lock_token = str(uuid.uuid4())
+        if not await self._redis.set(
+            lock_key, lock_token, nx=True, ex=self.COMPACTION_LOCK_TIMEOUT
+        ):
+            return
+
+        renewal = asyncio.create_task(self._renew_compaction_lock(lock_key, lock_token))
+        try:
+            updates, tail_length = await self._get_redis_updates(document_id)
+            if len(updates) < 2:
+                return
+
+            snapshot = await asyncio.to_thread(merge_updates, updates)
+
+            # Updates appended meanwhile stay in the tail
+            saved = await self._binary_redis.eval(
+                self.SAVE_SNAPSHOT_SCRIPT,
+                4,
+                lock_key,
+                snapshot_key,
+                tail_key,
+                legacy_key,
+                lock_token,
+                snapshot,
+                tail_length,
+            )
+            if not saved:
+                log.warning(
+                    f"Lost the compaction lock of document {document_id}, discarding its snapshot"
+                )
+                return
+
+            log.debug(f"Compacted {len(updates)} updates of document {document_id}")
+        finally:
+            renewal.cancel()
+            await self._redis.eval(self.RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+
+    async def _renew_compaction_lock(self, lock_key: str, lock_token: str):
+        """Keep the lock of a running compaction, e.g. one merging many updates."""
+        while True:
+            await asyncio.sleep(self.COMPACTION_LOCK_TIMEOUT / 3)
+            renewed = await self._redis.eval(
+                self.RENEW_LOCK_SCRIPT,
+                1,
+                lock_key,
+                lock_token,
+                self.COMPACTION_LOCK_TIMEOUT,
+            )
+            if not renewed:
+                return
+
+    async def periodic_compaction(self):
+        while True:
+            await asyncio.sleep(self.compaction_interval)
+
+            try:
+                if self._redis:
+                    document_ids = await self._get_redis_document_ids()
+                else:
+                    document_ids = list(self._updates.keys())
+
+                for document_id in document_ids:
+                    await self.compact(document_id)
+            except Exception as e:
+                log.error(f"Error compacting documents: {e}")
+
+    async def _get_redis_document_ids(self) -> set:
+        """Get the ids of the documents with updates, without blocking Redis."""
+        document_ids = set()
+        cursor = 0
+        while True:
+            # Incremental SCAN instead of KEYS, which walks the whole keyspace
+            # in one command. A cursor loop rather than scan_iter, which the
+            # Sentinel proxy cannot wrap
+            cursor, keys = await self._redis.scan(
+                cursor, match=f"{self._redis_key_prefix}:*", count=1000
+            )
+            document_ids.update(
+                key.split(":")[-2]
+                for key in keys
+                if key.endswith(":tail") or key.endswith(":updates")
+            )
+            if not cursor:
+                return document_ids
+
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            return await self._redis.exists(redis_key) > 0
+            return (
+                await self._redis.exists(
+                    f"{self._redis_key_prefix}:{document_id}:snapshot",
+                    f"{self._redis_key_prefix}:{document_id}:tail",
+                    f"{self._redis_key_prefix}:{document_id}:updates",
+                )
+                > 0
+            )
         else:
             return document_id in self._updates
 
@@ -188,8 +660,11 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.delete(redis_key)
+            await self._redis.delete(
+                f"{self._redis_key_prefix}:{document_id}:snapshot",
+                f"{self._redis_key_prefix}:{document_id}:tail",
+                f"{self._redis_key_prefix}:{document_id}:updates",
+            )
             redis_users_key = f"{self._redis_key_prefix}:{document_id}:users"
             await self._redis.delete(redis_users_key)
         else:
@@ -0,0 +1,204 @@
+from test.util.abstract_sqlite_test import AbstractSqliteTest
+
+
+class TestChatMessages(AbstractSqliteTest):
+    def setup_method(self):
+        from open_webui.models.chats import ChatForm, Chats
+
+        self.chats = Chats
+        self.chat = self.chats.insert_new_chat(
+            "1",
+            ChatForm(
+                chat={
+                    "title": "chat1",
+                    "history": {
+                        "currentId": "m2",
+                        "messages": {
+                            "m1": {
+                                "id": "m1",
+                                "parentId": None,
+                                "role": "user",
+                                "content": "Hello",
+                                "timestamp": 1,
+                            },
+                            "m2": {
+                                "id": "m2",
+                                "parentId": "m1",
+                                "role": "assistant",
+                                "content": "",
+                                "model": "llama3",
+                                "timestamp": 2,
+                            },
+                        },
+                    },
+                }
+            ),
+        )
+
+    def get_stored_chat(self):
+        from open_webui.internal.db import get_db
+        from open_webui.models.chats import Chat
+
+        with get_db() as db:
+            return db.get(Chat, self.chat.id).chat
+
+    def count_chat_messages(self):
+        return self.execute(
+            "SELECT COUNT(*) FROM chat_message WHERE chat_id = :chat_id",
+            chat_id=self.chat.id,
+        )[0][0]
+
+    def test_upsert_overlays_existing_message(self):
+        message = self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": "Hi there", "done": True}
+        )
+
+        # Seeded from the message of the chat JSON
+        assert message == {
+            "id": "m2",
+            "parentId": "m1",
+            "role": "assistant",
+            "content": "Hi there",
+            "model": "llama3",
+            "timestamp": 2,
+            "done": True,
+        }
+
+        history = self.chats.get_chat_by_id(self.chat.id).chat["history"]
+        assert history["messages"]["m2"] == message
+        assert history["messages"]["m1"]["content"] == "Hello"
+        assert history["currentId"] == "m2"
+
+        # The chat JSON itself is not rewritten
+        stored = self.get_stored_chat()
+        assert stored["history"]["messages"]["m2"]["content"] == ""
+
+    def test_upsert_new_message_becomes_current(self):
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id,
+            "m3",
+            {"id": "m3", "parentId": "m2", "role": "user", "content": "Again"},
+        )
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": "Edited"}
+        )
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id,
+            "m4",
+            {"id": "m4", "parentId": "m3", "role": "assistant", "content": "Reply"},
+        )
+
+        history = self.chats.get_chat_by_id(self.chat.id).chat["history"]
+        assert set(history["messages"]) == {"m1", "m2", "m3", "m4"}
+        assert history["messages"]["m2"]["content"] == "Edited"
+        assert history["messages"]["m4"]["parentId"] == "m3"
+        assert history["currentId"] == "m4"
+
+    def test_non_string_content_is_kept(self):
+        content = [{"type": "text", "text": "Hi"}]
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": content}
+        )
+
+        message = self.chats.get_message_by_id_and_message_id(self.chat.id, "m2")
+        assert message["content"] == content
+        assert message["role"] == "assistant"
+
+    def test_add_message_status(self):
+        assert (
+            self.chats.add_message_status_to_chat_by_id_and_message_id(
+                self.chat.id, "missing", {"description": "Searching"}
+            )
+            is None
+        )
+
+        self.chats.add_message_status_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"description": "Searching"}
+        )
+        message = self.chats.add_message_status_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"description": "Done", "done": True}
+        )
+
+        assert message["statusHistory"] == [
+            {"description": "Searching"},
+            {"description": "Done", "done": True},
+        ]
+        assert (
+            self.chats.get_messages_by_chat_id(self.chat.id)["m2"]["statusHistory"]
+            == message["statusHistory"]
+        )
+        # Status updates alone do not change the current message
+        history = self.chats.get_chat_by_id(self.chat.id).chat["history"]
+        assert history["currentId"] == "m2"
+
+    def test_full_update_supersedes_messages(self):
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": "Streamed"}
+        )
+        assert self.count_chat_messages() == 1
+
+        chat = self.chats.get_chat_by_id(self.chat.id).chat
+        self.chats.update_chat_by_id(self.chat.id, chat)
+
+        assert self.count_chat_messages() == 0
+        stored = self.get_stored_chat()
+        assert stored["history"]["messages"]["m2"]["content"] == "Streamed"
+        assert (
+            self.chats.get_chat_by_id(self.chat.id).chat["history"]["messages"]["m2"][
+                "content"
+            ]
+            == "Streamed"
+        )
+
+    def test_delete_chat_deletes_messages(self):
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": "Streamed"}
+        )
+        assert self.chats.delete_chat_by_id(self.chat.id)
+        assert self.count_chat_messages() == 0
+
+    def test_readers_overlay_messages(self):
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat.id, "m2", {"content": "Streamed"}
+        )
+
+        def content(chat):
+            return chat.chat["history"]["messages"]["m2"]["content"]
+
+        id = self.chat.id
+        assert content(self.chats.update_chat_share_id_by_id(id, "share")) == "Streamed"
+        assert (
+            content(
+                self.chats.add_chat_tag_by_id_and_user_id_and_tag_name(id, "1", "t")
+            )
+            == "Streamed"
+        )
+        assert (
+            content(self.chats.get_chat_list_by_user_id_and_tag_name("1", "t")[0])
+            == "Streamed"
+        )
+        assert content(self.chats.get_chat_list_by_user_id("1")[0]) == "Streamed"
+        assert content(self.chats.get_chat_list_by_chat_ids([id])[0]) == "Streamed"
+        assert (
+            content(self.chats.get_chats_by_user_id_and_search_text("1", "hello")[0])
+            == "Streamed"
+        )
+
+        chat = self.chats.update_chat_folder_id_by_id_and_user_id(id, "1", "folder")
+        assert content(chat) == "Streamed"
+        assert (
+            content(self.chats.get_chats_by_folder_id_and_user_id("folder", "1")[0])
+            == "Streamed"
+        )
+        assert (
+            content(self.chats.get_chats_by_folder_ids_and_user_id(["folder"], "1")[0])
+            == "Streamed"
+        )
+
+        assert content(self.chats.toggle_chat_pinned_by_id(id)) == "Streamed"
+        assert content(self.chats.get_pinned_chats_by_user_id("1")[0]) == "Streamed"
+
+        assert content(self.chats.toggle_chat_archive_by_id(id)) == "Streamed"
+        assert (
+            content(self.chats.get_archived_chat_list_by_user_id("1")[0]) == "Streamed"
+        )
@@ -0,0 +1,140 @@
+from unittest.mock import patch
+
+from test.util.abstract_sqlite_test import AbstractSqliteTest
+
+
+class TestChatSearch(AbstractSqliteTest):
+    def setup_method(self):
+        from open_webui.models.chat_search import ChatSearches
+        from open_webui.models.chats import Chats
+
+        self.chats = Chats
+        self.chat_searches = ChatSearches
+
+        self.title_match = self.insert_chat("Python tips", ["How do I sort a dict?"])
+        self.content_match = self.insert_chat(
+            "Dinner", ["Any recipe ideas?", "Try a pythonesque spaghetti."]
+        )
+        self.both_match = self.insert_chat(
+            "Python debugging", ["My python script crashes", "Use the python debugger"]
+        )
+        self.no_match = self.insert_chat("Weather", ["Will it rain tomorrow?"])
+        self.insert_chat("Python", ["python"], user_id="2")
+
+        for idx, chat in enumerate(
+            [self.title_match, self.content_match, self.both_match, self.no_match]
+        ):
+            self.execute(
+                "UPDATE chat SET updated_at = :updated_at WHERE id = :id",
+                id=chat.id,
+                updated_at=1000 + idx,
+            )
+
+    def insert_chat(self, title, contents, user_id="1"):
+        from open_webui.models.chats import ChatForm
+
+        messages = {
+            f"m{idx}": {
+                "id": f"m{idx}",
+                "role": "user" if idx % 2 == 0 else "assistant",
+                "content": content,
+            }
+            for idx, content in enumerate(contents)
+        }
+        return self.chats.insert_new_chat(
+            user_id,
+            ChatForm(chat={"title": title, "history": {"messages": messages}}),
+        )
+
+    def search(self, search_text, **kwargs):
+        return [
+            chat.id
+            for chat in self.chats.get_chats_by_user_id_and_search_text(
+                "1", search_text, **kwargs
+            )
+        ]
+
+    def test_index_is_available(self):
+        from open_webui.internal.db import get_db
+
+        with get_db() as db:
+            assert self.chat_searches.is_available(db)
+
+    def test_title_matches_rank_first(self):
+        assert self.search("python") == [
+            self.both_match.id,
+            self.title_match.id,
+            self.content_match.id,
+        ]
+
+    def test_prefix_matching(self):
+        assert self.search("pyth") == [
+            self.both_match.id,
+            self.title_match.id,
+            self.content_match.id,
+        ]
+        # Every word must match
+        assert self.search("pyth spag") == [self.content_match.id]
+        assert self.search("tomorrow rain") == [self.no_match.id]
+        assert self.search("thon") == []
+
+    def test_search_is_case_and_punctuation_insensitive(self):
+        assert self.search("DICT?") == [self.title_match.id]
+        assert self.search('"sort" (a)') == [self.title_match.id]
+
+    def test_tag_filters(self):
+        self.chats.add_chat_tag_by_id_and_user_id_and_tag_name(
+            self.title_match.id, "1", "Work Stuff"
+        )
+        self.chats.add_chat_tag_by_id_and_user_id_and_tag_name(
+            self.content_match.id, "1", "Work Stuff"
+        )
+        self.chats.add_chat_tag_by_id_and_user_id_and_tag_name(
+            self.content_match.id, "1", "food"
+        )
+
+        assert self.search("tag:work_stuff pyth") == [
+            self.title_match.id,
+            self.content_match.id,
+        ]
+        assert self.search("tag:work_stuff tag:food") == [self.content_match.id]
+        assert self.search("pyth tag:none") == [self.both_match.id]
+        # Only tags, newest first
+        assert self.search("tag:work_stuff") == [
+            self.content_match.id,
+            self.title_match.id,
+        ]
+
+    def test_archived_chats(self):
+        self.chats.toggle_chat_archive_by_id(self.both_match.id)
+
+        assert self.search("debug") == []
+        assert self.search("debug", include_archived=True) == [self.both_match.id]
+
+    def test_pagination(self):
+        assert self.search("pyth", skip=1, limit=1) == [self.title_match.id]
+
+    def test_index_follows_updates_and_deletes(self):
+        chat = self.chats.get_chat_by_id(self.no_match.id).chat
+        self.chats.update_chat_by_id(
+            self.no_match.id,
+            {**chat, "title": "Python weather", "history": {"messages": {}}},
+        )
+        assert self.search("python") == [
+            self.no_match.id,
+            self.both_match.id,
+            self.title_match.id,
+            self.content_match.id,
+        ]
+        assert self.search("rain") == []
+
+        self.chats.delete_chat_by_id(self.both_match.id)
+        assert self.search("python") == [
+            self.no_match.id,
+            self.title_match.id,
+            self.content_match.id,
+        ]
+
+    def test_like_search_without_index(self):
+        with patch.object(self.chat_searches, "_sqlite_fts_available", False):
+            assert self.search("python t") == [self.title_match.id]
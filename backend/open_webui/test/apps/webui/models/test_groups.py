@@ -0,0 +1,153 @@
+import importlib.util
+import json
+from unittest.mock import patch
+
+from test.util.abstract_sqlite_test import AbstractSqliteTest
+
+
+class TestGroups(AbstractSqliteTest):
+    def setup_method(self):
+        from open_webui.models.groups import Groups
+
+        self.groups = Groups
+        self.groups.membership_cache.invalidate()
+
+    def insert_group(self, name, user_ids):
+        from open_webui.models.groups import GroupUpdateForm
+
+        return self.groups.insert_new_group(
+            "admin",
+            GroupUpdateForm(name=name, description="", user_ids=user_ids),
+        )
+
+    def get_members(self):
+        """The group_member rows, as group id -> sorted user ids."""
+        members = {}
+        for group_id, user_id in self.execute(
+            "SELECT group_id, user_id FROM group_member ORDER BY user_id"
+        ):
+            members.setdefault(group_id, []).append(user_id)
+        return members
+
+    def assert_members_in_sync(self):
+        assert self.get_members() == {
+            group.id: sorted(set(group.user_ids))
+            for group in self.groups.get_groups()
+            if group.user_ids
+        }
+
+    def get_group_names(self, user_id):
+        return sorted(
+            group.name for group in self.groups.get_groups_by_member_id(user_id)
+        )
+
+    def test_members_follow_writes(self):
+        from open_webui.models.groups import GroupUpdateForm
+
+        staff = self.insert_group("staff", ["1", "2"])
+        admins = self.insert_group("admins", ["1", "1"])
+        self.assert_members_in_sync()
+
+        self.groups.update_group_by_id(
+            staff.id, GroupUpdateForm(name="staff", description="", user_ids=["2", "3"])
+        )
+        self.assert_members_in_sync()
+        # Updates without user_ids keep the members
+        self.groups.update_group_by_id(
+            staff.id, GroupUpdateForm(name="team", description="")
+        )
+        assert self.get_members()[staff.id] == ["2", "3"]
+
+        self.groups.add_users_to_group(admins.id, ["2", "4"])
+        self.assert_members_in_sync()
+
+        self.groups.remove_users_from_group(admins.id, ["1"])
+        self.assert_members_in_sync()
+
+        self.groups.remove_user_from_all_groups("2")
+        self.assert_members_in_sync()
+        assert self.get_members() == {staff.id: ["3"], admins.id: ["4"]}
+
+        self.groups.delete_group_by_id(staff.id)
+        assert self.get_members() == {admins.id: ["4"]}
+
+    def test_writes_invalidate_cache(self):
+        from open_webui.models.groups import GroupUpdateForm
+
+        staff = self.insert_group("staff", ["1"])
+        assert self.get_group_names("1") == ["staff"]
+        assert self.get_group_names("2") == []
+
+        admins = self.insert_group("admins", ["2"])
+        assert self.get_group_names("2") == ["admins"]
+
+        self.groups.update_group_by_id(
+            staff.id, GroupUpdateForm(name="staff", description="", user_ids=["2"])
+        )
+        assert self.get_group_names("1") == []
+        assert self.get_group_names("2") == ["admins", "staff"]
+
+        self.groups.add_users_to_group(admins.id, ["1"])
+        assert self.get_group_names("1") == ["admins"]
+
+        self.groups.remove_users_from_group(admins.id, ["2"])
+        assert self.get_group_names("2") == ["staff"]
+
+        self.groups.remove_user_from_all_groups("1")
+        assert self.get_group_names("1") == []
+
+        self.groups.delete_group_by_id(staff.id)
+        assert self.get_group_names("2") == []
+
+    def test_cache_is_used_until_invalidated(self):
+        self.insert_group("staff", ["1"])
+        assert self.get_group_names("1") == ["staff"]
+
+        # Not written through the table, so not seen until invalidated
+        self.execute("DELETE FROM group_member")
+        assert self.get_group_names("1") == ["staff"]
+
+        self.groups.membership_cache.invalidate()
+        assert self.get_group_names("1") == []
+
+    def test_request_scope_without_ttl(self):
+        self.insert_group("staff", ["1"])
+
+        with patch.object(self.groups.membership_cache, "ttl", 0):
+            with self.groups.membership_cache.request_scope():
+                assert self.get_group_names("1") == ["staff"]
+                self.execute("DELETE FROM group_member")
+                # Cached for the rest of the request
+                assert self.get_group_names("1") == ["staff"]
+
+            assert self.get_group_names("1") == []
+
+    def test_migration_backfills_members(self):
+        from alembic.migration import MigrationContext
+        from alembic.operations import Operations
+        from open_webui.env import OPEN_WEBUI_DIR
+
+        staff = self.insert_group("staff", ["1", "2"])
+        empty = self.insert_group("empty", [])
+        self.execute(
+            'UPDATE "group" SET user_ids = :user_ids WHERE id = :id',
+            id=empty.id,
+            user_ids=json.dumps(None),
+        )
+        self.execute("DROP TABLE group_member")
+
+        spec = importlib.util.spec_from_file_location(
+            "add_group_member_table",
+            OPEN_WEBUI_DIR
+            / "migrations"
+            / "versions"
+            / "b7d4e2a9c3f1_add_group_member_table.py",
+        )
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+
+        with self.engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade()
+
+        assert self.get_members() == {staff.id: ["1", "2"]}
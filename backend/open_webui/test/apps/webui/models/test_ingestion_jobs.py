@@ -0,0 +1,145 @@
+import threading
+import time
+
+from test.util.abstract_sqlite_test import AbstractSqliteTest
+
+
+class TestIngestionJobs(AbstractSqliteTest):
+    def setup_method(self):
+        from open_webui.models.ingestion_jobs import IngestionJobs
+
+        self.jobs = IngestionJobs
+
+    def set_job(self, id, **values):
+        self.execute(
+            f"UPDATE ingestion_job SET {', '.join(f'{key} = :{key}' for key in values)} WHERE id = :id",
+            id=id,
+            **values,
+        )
+
+    def test_claims_oldest_job_of_first_lane(self):
+        bulk = self.jobs.insert_new_job("1", "f1", "kb1", lane="bulk")
+        first = self.jobs.insert_new_job("1", "f2")
+        second = self.jobs.insert_new_job("1", "f3")
+        self.set_job(first.id, created_at=first.created_at - 1)
+        scheduled = self.jobs.insert_new_job("1", "f4")
+        self.set_job(scheduled.id, scheduled_at=int(time.time()) + 60)
+
+        lanes = ["interactive", "bulk"]
+        claimed = [
+            self.jobs.claim_next_job("worker", lanes, timeout=60, max_attempts=3)
+            for _ in range(4)
+        ]
+
+        assert [job.id if job else None for job in claimed] == [
+            first.id,
+            second.id,
+            bulk.id,
+            None,
+        ]
+        assert claimed[0].status == "processing"
+        assert claimed[0].attempts == 1
+        assert claimed[0].worker_id == "worker"
+
+    def test_knowledge_job_waits_for_upload_job(self):
+        upload = self.jobs.insert_new_job("1", "f1")
+        knowledge = self.jobs.insert_new_job("1", "f1", "kb1", lane="bulk")
+
+        assert (
+            self.jobs.claim_next_job("worker", ["bulk"], timeout=60, max_attempts=3)
+            is None
+        )
+        assert (
+            self.jobs.claim_next_job("worker", ["interactive"], 60, 3).id == upload.id
+        )
+        assert (
+            self.jobs.claim_next_job("worker", ["bulk"], timeout=60, max_attempts=3)
+            is None
+        )
+
+        self.jobs.update_job_status_by_id(upload.id, "completed")
+        assert self.jobs.claim_next_job("worker", ["bulk"], 60, 3).id == knowledge.id
+
+    def test_concurrent_claims(self):
+        ids = {self.jobs.insert_new_job("1", f"f{idx}").id for idx in range(5)}
+
+        barrier = threading.Barrier(8)
+        claimed = []
+
+        def work(worker_id):
+            barrier.wait()
+            while True:
+                job = self.jobs.claim_next_job(worker_id, ["interactive"], 60, 3)
+                if job is None:
+                    return
+                claimed.append((job.id, worker_id))
+
+        threads = [
+            threading.Thread(target=work, args=(f"worker-{idx}",)) for idx in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Every job was claimed by exactly one worker
+        assert sorted(id for id, _ in claimed) == sorted(ids)
+        for id, worker_id in claimed:
+            job = self.jobs.get_job_by_id(id)
+            assert job.worker_id == worker_id
+            assert job.attempts == 1
+
+    def test_job_of_dead_worker_is_taken_over(self):
+        job = self.jobs.insert_new_job("1", "f1")
+        assert self.jobs.claim_next_job("worker-1", ["interactive"], 60, 3).id == job.id
+
+        # Heartbeats keep the job with its worker
+        assert self.jobs.touch_job_by_id(job.id, "worker-1")
+        assert self.jobs.claim_next_job("worker-2", ["interactive"], 60, 3) is None
+
+        self.set_job(job.id, updated_at=int(time.time()) - 61)
+        claimed = self.jobs.claim_next_job("worker-2", ["interactive"], 60, 3)
+
+        assert claimed.id == job.id
+        assert claimed.worker_id == "worker-2"
+        assert claimed.attempts == 2
+        # The first worker learns that it lost the job
+        assert not self.jobs.touch_job_by_id(job.id, "worker-1")
+        assert self.jobs.touch_job_by_id(job.id, "worker-2")
+
+    def test_job_of_dead_workers_fails_after_max_attempts(self):
+        job = self.jobs.insert_new_job("1", "f1")
+        for attempt in range(1, 3):
+            claimed = self.jobs.claim_next_job("worker", ["interactive"], 60, 2)
+            assert claimed.attempts == attempt
+            self.set_job(job.id, updated_at=int(time.time()) - 61)
+
+        assert self.jobs.claim_next_job("worker", ["interactive"], 60, 2) is None
+        job = self.jobs.get_job_by_id(job.id)
+        assert job.status == "failed"
+        assert job.attempts == 2
+        assert job.error
+
+    def test_status_update_of_worker_that_lost_the_job(self):
+        job = self.jobs.insert_new_job("1", "f1")
+        self.jobs.claim_next_job("worker-1", ["interactive"], 60, 3)
+        self.set_job(job.id, updated_at=int(time.time()) - 61)
+        self.jobs.claim_next_job("worker-2", ["interactive"], 60, 3)
+
+        assert (
+            self.jobs.update_job_status_by_id(
+                job.id, "failed", error="error", worker_id="worker-1"
+            )
+            is None
+        )
+        assert self.jobs.get_job_by_id(job.id).status == "processing"
+
+        job = self.jobs.update_job_status_by_id(
+            job.id, "completed", worker_id="worker-2"
+        )
+        assert job.status == "completed"
+        # Not processing anymore, so the job cannot be updated again
+        assert (
+            self.jobs.update_job_status_by_id(job.id, "failed", worker_id="worker-2")
+            is None
+        )
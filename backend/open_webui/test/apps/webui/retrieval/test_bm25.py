@@ -0,0 +1,61 @@
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from open_webui.retrieval.bm25 import BM25IndexManager
+from open_webui.retrieval.vector.main import GetResult
+
+
+def get_result(*texts):
+    return GetResult(
+        ids=[[f"id-{text}" for text in texts]],
+        documents=[list(texts)],
+        metadatas=[[{"file_id": text} for text in texts]],
+    )
+
+
+class TestBM25IndexManager:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.vector_db = MagicMock()
+        self.patch = patch("open_webui.retrieval.bm25.VECTOR_DB_CLIENT", self.vector_db)
+        self.patch.start()
+
+    def teardown_method(self):
+        self.patch.stop()
+        self.dir.cleanup()
+
+    def search(self, indexes, query):
+        return [
+            text for text, _, _ in indexes.get("kb", build=False).search(query, k=10)
+        ]
+
+    def test_rebuild_replaces_index(self):
+        indexes = BM25IndexManager(self.dir.name, max_size=10)
+        self.vector_db.get.return_value = get_result("old apple", "old pear")
+        indexes.get("kb")
+
+        self.vector_db.get.return_value = get_result("new apple")
+        indexes.rebuild("kb")
+
+        assert self.search(indexes, "apple") == ["new apple"]
+        # Read by another worker from disk
+        other = BM25IndexManager(self.dir.name, max_size=10)
+        assert self.search(other, "apple pear") == ["new apple"]
+
+    def test_rebuild_drops_index_changed_while_fetching(self):
+        indexes = BM25IndexManager(self.dir.name, max_size=10)
+        self.vector_db.get.return_value = get_result("old apple")
+        indexes.get("kb")
+
+        def add_while_fetching(collection_name):
+            indexes.add(
+                "kb",
+                [{"id": "id-added", "text": "added apple", "metadata": {}}],
+            )
+            return get_result("new apple")
+
+        self.vector_db.get.side_effect = add_while_fetching
+        indexes.rebuild("kb")
+
+        # Built from the vector DB when searched next
+        assert indexes.get("kb", build=False) is None
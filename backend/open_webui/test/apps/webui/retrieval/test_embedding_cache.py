@@ -0,0 +1,49 @@
+import tempfile
+
+import pytest
+
+from open_webui.retrieval.embedding_cache import EmbeddingCache
+
+
+def embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+class TestEmbeddingCache:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = EmbeddingCache(self.dir.name, max_size=10, max_disk_size=100)
+
+    def teardown_method(self):
+        self.dir.cleanup()
+
+    def get_embeddings(self, text, embed=embed):
+        return self.cache.get_embeddings("ollama", "model", text, None, embed)
+
+    def test_embeds_missing_texts_once(self):
+        calls = []
+
+        def counting_embed(texts):
+            calls.append(texts)
+            return embed(texts)
+
+        assert self.get_embeddings(["a", "bb"], counting_embed) == embed(["a", "bb"])
+        assert self.get_embeddings(["bb", "ccc", "ccc"], counting_embed) == embed(
+            ["bb", "ccc", "ccc"]
+        )
+        assert self.get_embeddings("a", counting_embed) == embed(["a"])[0]
+        assert calls == [["a", "bb"], ["ccc"]]
+
+        # Read from disk by another worker
+        other = EmbeddingCache(self.dir.name, max_size=10, max_disk_size=100)
+        assert other.get_embeddings(
+            "ollama", "model", ["ccc"], None, counting_embed
+        ) == embed(["ccc"])
+        assert len(calls) == 2
+
+    def test_rejects_wrong_number_of_embeddings(self):
+        with pytest.raises(ValueError, match="Expected 2 embeddings"):
+            self.get_embeddings(["a", "bb"], lambda texts: embed(texts)[:1])
+
+        # Nothing was cached under the wrong text
+        assert self.get_embeddings(["a", "bb"]) == embed(["a", "bb"])
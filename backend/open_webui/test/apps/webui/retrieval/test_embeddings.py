@@ -0,0 +1,135 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from open_webui.retrieval import utils
+from open_webui.retrieval.utils import (
+    EmbeddingRequestError,
+    agenerate_batch_embeddings,
+    agenerate_embeddings,
+)
+
+
+class FakeResponse:
+    def __init__(self, status: int, body):
+        self.status = status
+        self.body = body
+        self.headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def text(self):
+        return self.body
+
+    async def json(self):
+        return self.body
+
+
+@pytest.mark.parametrize(
+    "status, detail, too_large",
+    [
+        (413, "Payload Too Large", True),
+        (
+            400,
+            "This model's maximum context length is 8192 tokens, however you requested 9000 tokens",
+            True,
+        ),
+        (400, "Too many inputs. The max number of inputs is 16.", True),
+        (500, '{"error":"the input length exceeds the context length"}', True),
+        (400, "Invalid model name", False),
+        (401, "Incorrect API key provided", False),
+        (429, "Too many tokens per request", False),
+        (500, "Internal server error", False),
+    ],
+)
+def test_too_large(status, detail, too_large):
+    assert EmbeddingRequestError(status, detail).too_large == too_large
+
+
+def embed_texts(texts):
+    return asyncio.run(
+        agenerate_embeddings("openai", "model", texts, batch_size=8, url="http://x")
+    )
+
+
+def test_rejected_batches_are_split():
+    batches = []
+
+    async def generate(engine, model, texts, *args):
+        batches.append(texts)
+        if len(texts) > 2:
+            raise EmbeddingRequestError(413, "Payload Too Large")
+        return [[float(len(text))] for text in texts]
+
+    texts = ["a" * idx for idx in range(1, 8)]
+    with patch.object(utils, "agenerate_batch_embeddings", generate):
+        assert embed_texts(texts) == [[float(len(text))] for text in texts]
+
+    assert batches[0] == texts
+    assert sorted(len(batch) for batch in batches if len(batch) <= 2) == [
+        1,
+        2,
+        2,
+        2,
+    ]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        EmbeddingRequestError(400, "Invalid model name"),
+        EmbeddingRequestError(401, "Incorrect API key provided"),
+    ],
+)
+def test_other_errors_fail_fast(error):
+    generate = MagicMock(side_effect=error)
+
+    async def agenerate(*args):
+        return generate(*args)
+
+    with patch.object(utils, "agenerate_batch_embeddings", agenerate):
+        assert embed_texts(["a", "b", "c"]) is None
+
+    generate.assert_called_once()
+
+
+def test_context_length_error_is_not_retried():
+    session = MagicMock()
+    session.post.return_value = FakeResponse(
+        500, '{"error":"the input length exceeds the context length"}'
+    )
+
+    with patch.object(utils.SESSION_POOL, "get_session", return_value=session):
+        with pytest.raises(EmbeddingRequestError) as exc_info:
+            asyncio.run(
+                agenerate_batch_embeddings(
+                    "ollama", "model", ["a", "b"], "http://ollama"
+                )
+            )
+
+    assert exc_info.value.too_large
+    session.post.assert_called_once()
+
+
+def test_server_errors_are_retried():
+    session = MagicMock()
+    session.post.side_effect = [
+        FakeResponse(500, "Internal server error"),
+        FakeResponse(200, {"embeddings": [[1.0], [2.0]]}),
+    ]
+
+    with patch.object(utils.SESSION_POOL, "get_session", return_value=session):
+        with patch.object(utils.asyncio, "sleep", return_value=None) as sleep:
+            assert asyncio.run(
+                agenerate_batch_embeddings(
+                    "ollama", "model", ["a", "b"], "http://ollama"
+                )
+            ) == [[1.0], [2.0]]
+
+    assert session.post.call_count == 2
+    sleep.assert_called_once()
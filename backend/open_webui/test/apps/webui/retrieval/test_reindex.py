@@ -0,0 +1,258 @@
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from open_webui.retrieval.reindex import KnowledgeReindexJob
+
+
+def get_request():
+    request = MagicMock()
+    request.app.state.config.RAG_EMBEDDING_ENGINE = ""
+    request.app.state.config.RAG_EMBEDDING_MODEL = "model"
+    request.app.state.EMBEDDING_FUNCTION = MagicMock(
+        side_effect=lambda texts, prefix, user: [[float(len(text))] for text in texts]
+    )
+    return request
+
+
+def prepare(request, knowledge_id, file_id):
+    if file_id == "broken":
+        raise ValueError("broken file")
+    texts = [f"{file_id} chunk {idx}" for idx in range(2)]
+    return texts, [{"file_id": file_id} for _ in texts]
+
+
+class TestKnowledgeReindexJob:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.job = KnowledgeReindexJob(self.dir.name, workers=2, batch_size=3)
+        # Run the job in the calling thread
+        self.job._run_in_background = self.job._run
+
+        self.vector_db = MagicMock()
+        self.vector_db.has_collection.return_value = True
+        self.knowledges = MagicMock()
+        self.files = MagicMock()
+        self.bm25_indexes = MagicMock()
+        self.patches = [
+            patch("open_webui.retrieval.reindex.VECTOR_DB_CLIENT", self.vector_db),
+            patch("open_webui.retrieval.reindex.BM25_INDEXES", self.bm25_indexes),
+            patch("open_webui.retrieval.reindex.Knowledges", self.knowledges),
+            patch("open_webui.retrieval.reindex.Files", self.files),
+            patch("open_webui.retrieval.reindex.Users", MagicMock()),
+            patch.object(KnowledgeReindexJob, "_prepare", side_effect=prepare),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+        self.dir.cleanup()
+
+    def get_inserted_files(self):
+        return sorted(
+            (
+                call.kwargs["collection_name"],
+                call.kwargs["items"][0]["metadata"]["file_id"],
+            )
+            for call in self.vector_db.insert.call_args_list
+        )
+
+    def write_state(self, **state):
+        with open(os.path.join(self.dir.name, "state.json"), "w") as f:
+            json.dump(
+                {
+                    "id": "job",
+                    "status": "running",
+                    "user_id": "1",
+                    "embedding_engine": "",
+                    "embedding_model": "model",
+                    "tasks": None,
+                    "done": [],
+                    "failed_files": [],
+                    "deleted_knowledge_bases": [],
+                    "cleared_knowledge_bases": [],
+                    "error": None,
+                    "created_at": 0,
+                    "updated_at": 0,
+                    **state,
+                },
+                f,
+            )
+
+    def test_start_plans_and_reindexes_all_files(self):
+        self.knowledges.get_knowledge_bases.return_value = [
+            SimpleNamespace(id="kb1", data={"file_ids": ["f1", "f2", "broken"]}),
+            SimpleNamespace(id="kb2", data={"file_ids": ["f3"]}),
+            SimpleNamespace(id="invalid", data=None),
+        ]
+        self.files.get_file_metadatas_by_ids.side_effect = lambda ids: [
+            SimpleNamespace(id=id) for id in ids
+        ]
+
+        assert self.job.start(get_request(), SimpleNamespace(id="1"))
+
+        status = self.job.get_status()
+        assert status["status"] == "completed"
+        assert status["total_files"] == 4
+        assert status["processed_files"] == 4
+        assert status["deleted_knowledge_bases"] == ["invalid"]
+        assert status["failed_files"] == [
+            {"knowledge_id": "kb1", "file_id": "broken", "error": "broken file"}
+        ]
+        self.knowledges.delete_knowledge_by_id.assert_called_once_with(id="invalid")
+
+        assert self.get_inserted_files() == [
+            ("kb1", "f1"),
+            ("kb1", "f2"),
+            ("kb2", "f3"),
+        ]
+        # Every collection is dropped once, before its first new chunks
+        assert sorted(
+            call.kwargs["collection_name"]
+            for call in self.vector_db.delete_collection.call_args_list
+        ) == ["kb1", "kb2"]
+        assert sorted(status["cleared_knowledge_bases"]) == ["kb1", "kb2"]
+        # Keyword indexes are replaced once their knowledge base is done
+        assert sorted(
+            call.args[0] for call in self.bm25_indexes.rebuild.call_args_list
+        ) == ["kb1", "kb2"]
+        self.bm25_indexes.add.assert_not_called()
+        self.bm25_indexes.delete_collection.assert_not_called()
+
+        # No job left behind to resume or cancel
+        assert not self.job.resume(get_request())
+        assert not self.job.cancel()
+
+    def test_resume_skips_done_files(self):
+        self.write_state(
+            tasks=[["kb1", "f1"], ["kb1", "f2"], ["kb2", "f3"]],
+            done=["kb1/f1"],
+            cleared_knowledge_bases=["kb1"],
+        )
+
+        assert self.job.resume(get_request())
+
+        assert self.job.get_status()["status"] == "completed"
+        assert self.get_inserted_files() == [("kb1", "f2"), ("kb2", "f3")]
+        # The chunks inserted before the restart are kept
+        assert [
+            call.kwargs["collection_name"]
+            for call in self.vector_db.delete_collection.call_args_list
+        ] == ["kb2"]
+        # Chunks of an unfinished file are replaced
+        self.vector_db.delete.assert_any_call(
+            collection_name="kb1", filter={"file_id": "f2"}
+        )
+        self.knowledges.get_knowledge_bases.assert_not_called()
+        assert sorted(
+            call.args[0] for call in self.bm25_indexes.rebuild.call_args_list
+        ) == ["kb1", "kb2"]
+
+    def test_resume_indexes_knowledge_bases_done_before_restart(self):
+        self.write_state(
+            tasks=[["kb1", "f1"], ["kb2", "f2"]],
+            done=["kb1/f1"],
+            cleared_knowledge_bases=["kb1"],
+        )
+        self.vector_db.has_collection.side_effect = lambda collection_name: (
+            collection_name == "kb1"
+        )
+
+        assert self.job.resume(get_request())
+
+        self.bm25_indexes.rebuild.assert_any_call("kb1")
+
+    def test_failed_knowledge_base_keeps_keyword_index(self):
+        self.knowledges.get_knowledge_bases.return_value = [
+            SimpleNamespace(id="kb1", data={"file_ids": ["broken"]})
+        ]
+        self.files.get_file_metadatas_by_ids.side_effect = lambda ids: [
+            SimpleNamespace(id=id) for id in ids
+        ]
+
+        assert self.job.start(get_request(), SimpleNamespace(id="1"))
+
+        # Nothing was reindexed, so the old chunks stay searchable
+        self.vector_db.delete_collection.assert_not_called()
+        self.bm25_indexes.rebuild.assert_not_called()
+        self.bm25_indexes.delete_collection.assert_not_called()
+
+    @pytest.mark.parametrize("status", ["completed", "cancelled"])
+    def test_resume_ignores_finished_jobs(self, status):
+        self.write_state(status=status, tasks=[["kb1", "f1"]])
+        assert not self.job.resume(get_request())
+
+    def test_start_restarts_job_of_other_model(self):
+        self.write_state(
+            embedding_model="old",
+            tasks=[["kb1", "f1"]],
+            cleared_knowledge_bases=["kb1"],
+        )
+        self.knowledges.get_knowledge_bases.return_value = [
+            SimpleNamespace(id="kb1", data={"file_ids": ["f1", "f2"]})
+        ]
+        self.files.get_file_metadatas_by_ids.side_effect = lambda ids: [
+            SimpleNamespace(id=id) for id in ids
+        ]
+
+        assert self.job.start(get_request(), SimpleNamespace(id="1"))
+
+        assert self.job.get_status()["processed_files"] == 2
+        assert self.get_inserted_files() == [("kb1", "f1"), ("kb1", "f2")]
+        self.vector_db.delete_collection.assert_called_once_with(collection_name="kb1")
+
+    def test_job_is_locked(self):
+        self.write_state(tasks=[["kb1", "f1"]])
+        assert self.job._acquire()
+
+        other = KnowledgeReindexJob(self.dir.name, workers=1, batch_size=1)
+        assert not other.resume(get_request())
+        assert not other.start(get_request(), SimpleNamespace(id="1"))
+        assert other.get_status()["status"] == "running"
+
+        self.job._release()
+        assert other.get_status()["status"] == "interrupted"
+
+    def test_cancel_from_other_worker(self):
+        self.write_state(tasks=[["kb1", "f1"]])
+        assert self.job._acquire()
+
+        other = KnowledgeReindexJob(self.dir.name, workers=1, batch_size=1)
+        assert other.cancel()
+        assert self.job._is_cancelled()
+
+        # The job stops before its next batch
+        self.job.state = self.job._read_state()
+        self.job._run(get_request())
+
+        assert self.job.get_status()["status"] == "cancelled"
+        self.vector_db.insert.assert_not_called()
+        self.bm25_indexes.rebuild.assert_not_called()
+        assert not os.path.exists(os.path.join(self.dir.name, "cancel"))
+
+    def test_cancel_indexes_unfinished_knowledge_bases(self):
+        self.write_state(
+            tasks=[["kb1", "f1"], ["kb1", "f2"], ["kb2", "f3"]],
+            cleared_knowledge_bases=["kb1"],
+        )
+        self.job.batch_size = 1
+        self.job.workers = 1
+        assert self.job._acquire()
+        self.job.state = self.job._read_state()
+
+        def cancel_after_first_batch(*args, **kwargs):
+            self.job.cancel()
+
+        self.vector_db.insert.side_effect = cancel_after_first_batch
+        self.job._run(get_request())
+
+        assert self.job.get_status()["status"] == "cancelled"
+        assert self.get_inserted_files() == [("kb1", "f1")]
+        # Matches the chunks reindexed so far
+        self.bm25_indexes.rebuild.assert_called_once_with("kb1")
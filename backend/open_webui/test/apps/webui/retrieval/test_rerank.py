@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.documents import Document
+
+from open_webui.retrieval import utils
+from open_webui.retrieval.models.base_reranker import BaseReranker
+from open_webui.retrieval.utils import (
+    LazyModel,
+    get_rerank_scores,
+    get_reranking_function,
+)
+
+QUERY_DOCUMENTS = [
+    ("apple", [Document(page_content="apple pie"), Document(page_content="pear tart")]),
+    (
+        "pear",
+        [
+            Document(page_content="pear tart"),
+            Document(page_content="apple pie"),
+            Document(page_content="pear tart"),
+        ],
+    ),
+]
+SCORES = [[1.0, 0.0], [1.0, 0.0, 1.0]]
+
+
+def score(query, document):
+    return 1.0 if query in document else 0.0
+
+
+class SingleQueryReranker(BaseReranker):
+    """Scores every document against the first query, like ExternalReranker."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, sentences, user=None):
+        self.calls.append(sentences)
+        query = sentences[0][0]
+        return [score(query, document) for _, document in sentences]
+
+
+class CrossEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, sentences):
+        self.calls.append(sentences)
+        return [score(query, document) for query, document in sentences]
+
+
+@pytest.fixture(autouse=True)
+def no_rerank_cache():
+    with patch.object(utils, "RERANK_SCORE_CACHE", None):
+        yield
+
+
+@pytest.mark.parametrize("engine", ["", "external"])
+def test_single_query_reranker_is_called_per_query(engine):
+    reranker = SingleQueryReranker()
+    reranking_function = get_reranking_function(engine, "model", reranker)
+
+    assert get_rerank_scores(QUERY_DOCUMENTS, None, reranking_function) == SCORES
+    assert reranker.calls == [
+        [("apple", "apple pie"), ("apple", "pear tart")],
+        [("pear", "pear tart"), ("pear", "apple pie")],
+    ]
+
+
+def test_lazy_single_query_reranker_is_called_per_query():
+    reranker = SingleQueryReranker()
+    lazy_model = LazyModel(lambda: reranker)
+    reranking_function = get_reranking_function("", "model", lazy_model)
+
+    # Not built before the first prediction
+    assert lazy_model._model is None
+    assert get_rerank_scores(QUERY_DOCUMENTS, None, reranking_function) == SCORES
+    assert len(reranker.calls) == 2
+
+
+def test_cross_encoder_scores_all_queries_at_once():
+    reranker = CrossEncoder()
+    reranking_function = get_reranking_function("", "model", reranker)
+
+    assert get_rerank_scores(QUERY_DOCUMENTS, None, reranking_function) == SCORES
+    assert reranker.calls == [
+        [
+            ("apple", "apple pie"),
+            ("apple", "pear tart"),
+            ("pear", "pear tart"),
+            ("pear", "apple pie"),
+        ]
+    ]
+
+
+def test_embedding_similarity_without_reranker():
+    vectors = {
+        "apple": [1.0, 0.0],
+        "pear": [0.0, 2.0],
+        "apple pie": [3.0, 0.0],
+        "pear tart": [0.0, 1.0],
+    }
+    calls = []
+
+    def embedding_function(texts, prefix):
+        calls.append(texts)
+        return [vectors[text] for text in texts]
+
+    assert get_rerank_scores(QUERY_DOCUMENTS, embedding_function, None) == SCORES
+    # Every distinct text is embedded once
+    assert calls == [["apple", "pear"], ["apple pie", "pear tart"]]
+
+
+def test_no_documents():
+    assert get_rerank_scores([("apple", []), ("pear", [])], None, None) == [[], []]
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import fakeredis
+import pycrdt as Y
+
+from open_webui.socket import utils
+from open_webui.socket.utils import YdocManager
+
+PREFIX = "open-webui:ydoc:documents"
+
+
+def get_manager(**kwargs):
+    server = fakeredis.FakeServer()
+    return YdocManager(
+        redis=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+        binary_redis=fakeredis.aioredis.FakeRedis(server=server),
+        compaction_threshold=0,
+        **kwargs,
+    )
+
+
+class Editor:
+    """A client editing a text document, producing one update per edit."""
+
+    def __init__(self):
+        self.doc = Y.Doc()
+        self.text = self.doc.get("text", type=Y.Text)
+
+    def edit(self, value: str) -> bytes:
+        state = self.doc.get_state()
+        self.text += value
+        return self.doc.get_update(state)
+
+
+async def get_text(manager, document_id):
+    doc = Y.Doc()
+    doc.apply_update(await manager.get_state(document_id))
+    return str(doc.get("text", type=Y.Text))
+
+
+async def append(manager, editor, values, document_id="doc"):
+    for value in values:
+        await manager.append_to_updates(document_id, editor.edit(value))
+
+
+def blocking_merge(started: threading.Event, resume: threading.Event):
+    """merge_updates that waits for the test between reading and merging."""
+    merge_updates = utils.merge_updates
+
+    def merge(updates):
+        started.set()
+        resume.wait(10)
+        return merge_updates(updates)
+
+    return merge
+
+
+async def wait_for(event: threading.Event):
+    while not event.is_set():
+        await asyncio.sleep(0.01)
+
+
+def test_compaction():
+    async def run():
+        manager = get_manager()
+        editor = Editor()
+        await append(manager, editor, ["a", "b", "c"])
+
+        await manager.compact("doc")
+
+        assert await get_text(manager, "doc") == "abc"
+        assert await manager._binary_redis.llen(f"{PREFIX}:doc:tail") == 0
+        assert await manager._redis.get(f"{PREFIX}:doc:compaction_lock") is None
+
+        await append(manager, editor, ["d"])
+        await manager.compact("doc")
+        assert await get_text(manager, "doc") == "abcd"
+
+    asyncio.run(run())
+
+
+def test_append_during_compaction():
+    async def run():
+        manager = get_manager()
+        editor = Editor()
+        await append(manager, editor, ["a", "b"])
+
+        started, resume = threading.Event(), threading.Event()
+        with patch.object(utils, "merge_updates", blocking_merge(started, resume)):
+            compaction = asyncio.create_task(manager.compact("doc"))
+            await wait_for(started)
+            await append(manager, editor, ["c", "d"])
+            resume.set()
+            await compaction
+
+        # The updates appended meanwhile stay in the tail
+        assert await manager._binary_redis.llen(f"{PREFIX}:doc:tail") == 2
+        assert await get_text(manager, "doc") == "abcd"
+
+    asyncio.run(run())
+
+
+def test_compaction_that_lost_its_lock_is_discarded():
+    async def run():
+        manager = get_manager()
+        editor = Editor()
+        await append(manager, editor, ["a", "b"])
+        lock_key = f"{PREFIX}:doc:compaction_lock"
+
+        started, resume = threading.Event(), threading.Event()
+        with patch.object(utils, "merge_updates", blocking_merge(started, resume)):
+            compaction = asyncio.create_task(manager.compact("doc"))
+            await wait_for(started)
+            # The lock expired and another worker took it over
+            await manager._redis.set(lock_key, "other")
+            resume.set()
+            await compaction
+
+        assert await manager._binary_redis.get(f"{PREFIX}:doc:snapshot") is None
+        assert await manager._binary_redis.llen(f"{PREFIX}:doc:tail") == 2
+        # The other worker's lock is kept
+        assert await manager._redis.get(lock_key) == "other"
+
+    asyncio.run(run())
+
+
+def test_lock_is_renewed_during_long_compaction():
+    async def run():
+        manager = get_manager()
+        manager.COMPACTION_LOCK_TIMEOUT = 1
+        editor = Editor()
+        await append(manager, editor, ["a", "b"])
+
+        started, resume = threading.Event(), threading.Event()
+        with patch.object(utils, "merge_updates", blocking_merge(started, resume)):
+            compaction = asyncio.create_task(manager.compact("doc"))
+            await wait_for(started)
+            await asyncio.sleep(2)
+            resume.set()
+            await compaction
+
+        assert await manager._binary_redis.llen(f"{PREFIX}:doc:tail") == 0
+        assert await get_text(manager, "doc") == "ab"
+
+    asyncio.run(run())
+
+
+def test_periodic_compaction_finds_documents():
+    async def run():
+        manager = get_manager()
+        for idx in range(50):
+            await manager.add_user(f"other-{idx}", "user")
+        await append(manager, Editor(), ["a", "b"], "doc-1")
+        await append(manager, Editor(), ["c"], "doc-2")
+
+        assert await manager._get_redis_document_ids() == {"doc-1", "doc-2"}
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+
+class AbstractSqliteTest:
+    """
+    Runs model tests against a SQLite database in a temporary file, migrated
+    like the app's database on startup. Tables are emptied after each test.
+    """
+
+    DATABASE_URL = None
+
+    def setup_class(cls):
+        cls.db_dir = tempfile.TemporaryDirectory()
+        cls.DATABASE_URL = f"sqlite:///{Path(cls.db_dir.name) / 'webui.db'}"
+        os.environ.setdefault("DATABASE_URL", cls.DATABASE_URL)
+
+        from alembic import command
+        from alembic.config import Config
+
+        import open_webui.env
+        from open_webui.env import OPEN_WEBUI_DIR
+        from open_webui.internal.db import SessionLocal, handle_peewee_migration
+
+        handle_peewee_migration(cls.DATABASE_URL)
+
+        alembic_cfg = Config(OPEN_WEBUI_DIR / "alembic.ini")
+        alembic_cfg.set_main_option(
+            "script_location", str(OPEN_WEBUI_DIR / "migrations")
+        )
+        # migrations/env.py connects to open_webui.env.DATABASE_URL
+        with patch.object(open_webui.env, "DATABASE_URL", cls.DATABASE_URL):
+            command.upgrade(alembic_cfg, "head")
+
+        cls.engine = create_engine(
+            cls.DATABASE_URL, connect_args={"check_same_thread": False}
+        )
+        cls._engine = SessionLocal.kw["bind"]
+        SessionLocal.configure(bind=cls.engine)
+
+    def teardown_method(self):
+        from open_webui.internal.db import Base
+
+        with self.engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+    def teardown_class(cls):
+        from open_webui.internal.db import SessionLocal
+
+        SessionLocal.configure(bind=cls._engine)
+        cls.engine.dispose()
+        cls.db_dir.cleanup()
+
+    def execute(self, sql: str, **params):
+        with self.engine.begin() as conn:
+            result = conn.execute(text(sql), params)
+            return result.fetchall() if result.returns_rows else None
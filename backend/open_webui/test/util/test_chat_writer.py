@@ -0,0 +1,150 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from open_webui.utils import chat_writer
+from open_webui.utils.chat_writer import ChatMessageWriter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch.object(chat_writer.time, "monotonic", clock):
+        yield clock
+
+
+@pytest.fixture
+def writes():
+    writes = []
+
+    def upsert(chat_id, message_id, message):
+        writes.append((chat_id, message_id, message))
+        return message
+
+    with (
+        patch.object(
+            chat_writer.Chats, "upsert_message_to_chat_by_id_and_message_id", upsert
+        ),
+        patch.object(chat_writer.Chats, "update_chat_search_by_id"),
+    ):
+        yield writes
+
+
+def test_written_once_per_interval(clock, writes):
+    writer = ChatMessageWriter(interval=1, buffer_size=1000)
+
+    writer.upsert("chat", "m1", {"content": "a"})
+    clock.now += 0.5
+    writer.upsert("chat", "m1", {"content": "ab", "done": False})
+    assert writes == []
+
+    clock.now += 0.5
+    writer.upsert("chat", "m1", {"content": "abc"})
+    assert writes == [("chat", "m1", {"content": "abc", "done": False})]
+
+    clock.now += 0.5
+    writer.upsert("chat", "m1", {"content": "abcd"})
+    assert len(writes) == 1
+
+
+def test_written_once_content_grew(clock, writes):
+    writer = ChatMessageWriter(interval=60, buffer_size=4)
+
+    writer.upsert("chat", "m1", {"content": "abc"})
+    assert writes == []
+    writer.upsert("chat", "m1", {"content": "abcd"})
+    assert writes == [("chat", "m1", {"content": "abcd"})]
+
+    # Measured from the content written last
+    writer.upsert("chat", "m1", {"content": "abcdefg"})
+    assert len(writes) == 1
+    writer.upsert("chat", "m1", {"content": "abcdefgh"})
+    assert writes[-1] == ("chat", "m1", {"content": "abcdefgh"})
+
+
+def test_messages_are_buffered_separately(clock, writes):
+    writer = ChatMessageWriter(interval=60, buffer_size=3)
+
+    writer.upsert("chat", "m1", {"content": "ab"})
+    writer.upsert("chat", "m2", {"content": "ab"})
+    writer.upsert("other", "m1", {"content": "abc"})
+
+    assert writes == [("other", "m1", {"content": "abc"})]
+
+
+def test_flush(clock, writes):
+    writer = ChatMessageWriter(interval=60, buffer_size=1000)
+    writer.upsert("chat", "m1", {"content": "ab", "done": False})
+
+    writer.flush("chat", "m1", {"done": True})
+    assert writes == [("chat", "m1", {"content": "ab", "done": True})]
+    chat_writer.Chats.update_chat_search_by_id.assert_called_once_with("chat")
+
+    # No longer buffered
+    writer.flush_all()
+    assert len(writes) == 1
+
+
+def test_flush_stale(clock, writes):
+    writer = ChatMessageWriter(interval=1, buffer_size=1000)
+    writer.upsert("chat", "m1", {"content": "a"})
+    writer.upsert("chat", "m2", {"content": "a"})
+
+    clock.now += 0.5
+    writer.upsert("chat", "m2", {"content": "ab"})
+    writer.flush_stale()
+    assert writes == []
+
+    clock.now += 0.5
+    writer.flush_stale()
+    assert sorted(writes) == [
+        ("chat", "m1", {"content": "a"}),
+        ("chat", "m2", {"content": "ab"}),
+    ]
+
+    # Streams without updates since the last flush are dropped
+    clock.now += 1
+    writer.flush_stale()
+    assert writer._buffers == {}
+    assert len(writes) == 2
+
+
+def test_flush_all_on_shutdown(writes):
+    writer = ChatMessageWriter(interval=60, buffer_size=1000)
+
+    async def run():
+        task = asyncio.create_task(writer.periodic_flush())
+        await asyncio.sleep(0)
+        writer.upsert("chat", "m1", {"content": "a"})
+        writer.upsert("chat", "m2", {"content": "b"})
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert sorted(writes) == [
+        ("chat", "m1", {"content": "a"}),
+        ("chat", "m2", {"content": "b"}),
+    ]
+    assert writer._buffers == {}
+
+
+def test_write_errors_do_not_raise(clock):
+    writer = ChatMessageWriter(interval=60, buffer_size=1)
+
+    with patch.object(
+        chat_writer.Chats,
+        "upsert_message_to_chat_by_id_and_message_id",
+        side_effect=RuntimeError("database is locked"),
+    ):
+        writer.upsert("chat", "m1", {"content": "a"})
+        writer.flush_all()
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from open_webui.utils.content_blocks import (
+    ContentBlockSerializer,
+    ContentBuffer,
+    ContentTagScanner,
+)
+
+REASONING_TAGS = [
+    ("<think>", "</think>"),
+    ("<thinking>", "</thinking>"),
+    ("◁think▷", "◁/think▷"),
+]
+SOLUTION_TAGS = [("<|begin_of_solution|>", "<|end_of_solution|>")]
+
+MESSAGES = [
+    "Hello, this is a plain answer\nwith a few lines.\n",
+    "<think>Let me think\nabout it.\n> quoted\nDone</think>\n\nThe answer is 42.",
+    "Intro text <thinking>step 1\nstep 2\n</thinking> middle ◁think▷again◁/think▷ end",
+    '<think type="x">first</think>text<|begin_of_solution|>solved<|end_of_solution|>',
+    "no closing <think>still thinking\n" + "long line " * 100,
+    "before\n" * 50 + "<think>" + "thought\n" * 80 + "</think>" + "after\n" * 50,
+]
+
+
+def chunk(text, rng):
+    chunks = []
+    i = 0
+    while i < len(text):
+        size = rng.choice([1, 2, 3, 5, 8, 40, 300])
+        chunks.append(text[i : i + size])
+        i += size
+    return chunks
+
+
+def stream(chunks, incremental):
+    """
+    Feed the chunks like the middleware does and return the serialized content
+    after every delta. The reference rescans and re-serializes every block from
+    scratch on each delta.
+    """
+    content_blocks = [{"type": "text", "content": ""}]
+    content = ContentBuffer()
+    scanner = ContentTagScanner()
+    serializer = ContentBlockSerializer()
+
+    outputs = []
+    for value in chunks:
+        content.append(value)
+        content_blocks[-1]["content"] = content_blocks[-1]["content"] + value
+        if not incremental:
+            scanner = ContentTagScanner()
+            serializer = ContentBlockSerializer()
+
+        scanner.handle("reasoning", REASONING_TAGS, content_blocks, content)
+        scanner.handle("solution", SOLUTION_TAGS, content_blocks, content)
+
+        outputs.append(
+            (
+                serializer.serialize(content_blocks),
+                serializer.serialize(content_blocks, raw=True),
+            )
+        )
+    return outputs, content.getvalue()
+
+
+@pytest.mark.parametrize("message", MESSAGES, ids=range(len(MESSAGES)))
+def test_incremental_matches_full_rescan(message):
+    rng = random.Random(message)
+    for _ in range(20):
+        chunks = chunk(message, rng)
+        assert stream(chunks, incremental=True) == stream(chunks, incremental=False)
+
+
+def test_content_buffer():
+    buffer = ContentBuffer("abc")
+    for value in ["de", "", "fghij", "k"]:
+        buffer.append(value)
+
+    assert len(buffer) == 11
+    assert buffer.getvalue() == "abcdefghijk"
+
+    buffer.append("<think>x</think>l")
+    buffer.sub(r"<think>.*?</think>", "")
+    assert len(buffer) == 12
+    assert str(buffer) == "abcdefghijkl"
@@ -0,0 +1,251 @@
+import asyncio
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+from fastapi import HTTPException
+
+from open_webui.routers import ollama
+from open_webui.utils import ollama_router
+from open_webui.utils.ollama_router import OllamaRouter
+
+URLS = {0: "http://node-0", 1: "http://node-1", 2: "http://node-2"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch.object(ollama_router.time, "monotonic", clock):
+        yield clock
+
+
+def get_router(**kwargs):
+    return OllamaRouter(
+        **{"failure_threshold": 2, "cooldown": 30, "enable_affinity": True, **kwargs}
+    )
+
+
+def test_prefers_nodes_with_model_loaded():
+    router = get_router()
+    router.get_node(URLS[1]).loaded_models = {"llama3"}
+    router.get_node(URLS[1]).in_flight = 10
+
+    for _ in range(20):
+        assert router.select("llama3", URLS) == 1
+
+
+def test_picks_least_busy_of_two_nodes():
+    router = get_router()
+    router.get_node(URLS[0]).in_flight = 5
+
+    # Any two nodes sampled include an idle one
+    for idx in range(20):
+        assert router.select(f"model-{idx}", URLS) != 0
+
+    router = get_router()
+    router.get_node(URLS[0]).in_flight = 1
+    assert router.select("llama3", {0: URLS[0], 1: URLS[1]}) == 1
+
+
+def test_selected_node_counts_as_resident():
+    router = get_router()
+    url_idx = router.select("llama3", URLS)
+
+    assert "llama3" in router.get_node(URLS[url_idx]).loaded_models
+    for _ in range(20):
+        assert router.select("llama3", URLS) == url_idx
+
+
+def test_chat_affinity():
+    router = get_router()
+    router.get_node(URLS[0]).loaded_models = {"llama3"}
+    router.get_node(URLS[1]).loaded_models = {"llama3"}
+    router.get_node(URLS[2]).loaded_models = {"llama3"}
+
+    url_idx = router.select("llama3", URLS, chat_id="chat")
+    # Sticks to the node even when it is the busiest
+    router.get_node(URLS[url_idx]).in_flight = 10
+    for _ in range(20):
+        assert router.select("llama3", URLS, chat_id="chat") == url_idx
+
+    # The url_idx of the node may change with the configuration
+    moved = {idx: URLS[(url_idx + idx) % 3] for idx in range(3)}
+    assert router.select("llama3", moved, chat_id="chat") == 0
+
+
+def test_chat_affinity_disabled():
+    router = get_router(enable_affinity=False)
+    url_idx = router.select("llama3", {0: URLS[0], 1: URLS[1]}, chat_id="chat")
+    router.get_node(URLS[url_idx]).in_flight = 10
+    router.get_node(URLS[1 - url_idx]).loaded_models = {"llama3"}
+
+    assert router.select("llama3", {0: URLS[0], 1: URLS[1]}, chat_id="chat") == (
+        1 - url_idx
+    )
+
+
+def test_ejected_node_is_avoided(clock):
+    router = get_router()
+    router.get_node(URLS[0]).loaded_models = {"llama3"}
+    router.select("llama3", URLS, chat_id="chat")
+
+    for _ in range(2):
+        router.acquire(URLS[0]).release(success=False)
+    assert router.get_stats()[URLS[0]]["ejected"]
+
+    for _ in range(20):
+        assert router.select("llama3", URLS, chat_id="chat") != 0
+
+
+def test_all_nodes_ejected(clock):
+    router = get_router(failure_threshold=1)
+    for url in URLS.values():
+        router.acquire(url).release(success=False)
+
+    assert router.select("llama3", URLS) in URLS
+
+
+def test_circuit_breaker(clock):
+    router = get_router()
+    node = router.get_node(URLS[0])
+
+    router.acquire(URLS[0]).release(success=False)
+    assert not node.is_ejected(clock.now)
+    router.acquire(URLS[0]).release(success=False)
+    assert node.is_ejected(clock.now)
+
+    # Tried again after the cooldown, and ejected again on the first failure
+    clock.now += 31
+    assert not node.is_ejected(clock.now)
+    router.acquire(URLS[0]).release(success=False)
+    assert node.is_ejected(clock.now)
+
+    # Recovered once a request succeeds
+    clock.now += 31
+    router.acquire(URLS[0]).release()
+    assert node.failures == 0
+    router.acquire(URLS[0]).release(success=False)
+    assert not node.is_ejected(clock.now)
+    assert node.in_flight == 0
+
+
+def test_lease_is_released_once():
+    router = get_router(failure_threshold=1)
+    lease = router.acquire(URLS[0])
+    assert router.get_node(URLS[0]).in_flight == 1
+
+    lease.release(success=False)
+    lease.release(success=False)
+    lease.release()
+
+    node = router.get_node(URLS[0])
+    assert node.in_flight == 0
+    assert node.failures == 1
+
+
+class Content:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class Response:
+    def __init__(self, status=200, body=None):
+        self.status = status
+        self.ok = status < 400
+        self.headers = {"Content-Type": "application/x-ndjson"}
+        self.content = Content([b'{"done": false}\n', b'{"done": true}\n'])
+        self.body = body or {}
+        self.released = 0
+
+    async def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    def release(self):
+        self.released += 1
+
+
+class Session:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+
+    async def post(self, url, **kwargs):
+        if self.error:
+            raise self.error
+        return self.response
+
+
+def send_post_request(router, session, **kwargs):
+    with (
+        patch.object(ollama, "OLLAMA_ROUTER", router),
+        patch.object(ollama.SESSION_POOL, "get_session", return_value=session),
+    ):
+        return asyncio.run(_send_post_request(**kwargs))
+
+
+async def _send_post_request(**kwargs):
+    response = await ollama.send_post_request(
+        f"{URLS[0]}/api/chat", b"{}", node=URLS[0], **kwargs
+    )
+    if kwargs.get("stream", True):
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert chunks == [b'{"done": false}\n', b'{"done": true}\n']
+        await response.background()
+    return response
+
+
+def test_streamed_request_releases_lease_once():
+    router = get_router(failure_threshold=1)
+    response = Response()
+    send_post_request(router, Session(response))
+
+    node = router.get_node(URLS[0])
+    assert node.in_flight == 0
+    assert node.failures == 0
+    assert response.released == 1
+
+
+def test_request_releases_lease_once():
+    router = get_router(failure_threshold=1)
+    send_post_request(router, Session(Response(body={"done": True})), stream=False)
+
+    assert router.get_node(URLS[0]).in_flight == 0
+
+
+@pytest.mark.parametrize(
+    "session, failures",
+    [
+        (Session(error=aiohttp.ClientConnectionError("refused")), 1),
+        (Session(Response(500, {"error": "model crashed"})), 1),
+        (Session(Response(404, {"error": "model not found"})), 0),
+    ],
+)
+@pytest.mark.parametrize("stream", [True, False])
+def test_failed_request_releases_lease_once(session, failures, stream):
+    router = get_router()
+    with pytest.raises(HTTPException):
+        send_post_request(router, session, stream=stream)
+
+    node = router.get_node(URLS[0])
+    assert node.in_flight == 0
+    # Only connection errors and server errors count against the node
+    assert node.failures == failures
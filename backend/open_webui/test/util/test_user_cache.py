@@ -0,0 +1,154 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from open_webui.utils import user_cache
+from open_webui.utils.user_cache import LastActiveWriter, UserCache
+
+
+def user(id, api_key=None, name="user"):
+    return SimpleNamespace(id=id, api_key=api_key, name=name)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch.object(user_cache.time, "monotonic", clock):
+        yield clock
+
+
+def test_cached_until_ttl(clock):
+    cache = UserCache(ttl=60)
+    cache.set(user("1"))
+
+    assert cache.get("1").id == "1"
+    clock.now += 61
+    assert cache.get("1") is None
+
+
+def test_disabled_without_ttl():
+    cache = UserCache(ttl=0)
+    cache.set(user("1"))
+
+    assert cache.get("1") is None
+
+
+def test_get_by_api_key():
+    cache = UserCache(ttl=60)
+    cache.set(user("1", api_key="sk-1"))
+
+    assert cache.get_by_api_key("sk-1").id == "1"
+    assert cache.get_by_api_key("sk-2") is None
+
+    # The key was regenerated since it was cached
+    cache.set(user("1", api_key="sk-2"))
+    assert cache.get_by_api_key("sk-1") is None
+    assert cache.get_by_api_key("sk-2").id == "1"
+
+
+def test_invalidate():
+    cache = UserCache(ttl=60)
+    cache.set(user("1", api_key="sk-1"))
+    cache.set(user("2"))
+
+    cache.invalidate("1")
+    assert cache.get("1") is None
+    assert cache.get_by_api_key("sk-1") is None
+    assert cache.get("2") is not None
+
+    cache.invalidate()
+    assert cache.get("2") is None
+
+
+def test_user_loaded_before_invalidation_is_not_cached():
+    cache = UserCache(ttl=60)
+
+    generation = cache.generation
+    stale = user("1", name="old")
+    # Updated and invalidated while the old user was being loaded
+    cache.invalidate("1")
+    cache.set(stale, generation)
+    assert cache.get("1") is None
+
+    generation = cache.generation
+    cache.set(user("1", name="new"), generation)
+    assert cache.get("1").name == "new"
+
+
+def test_cleared_when_full():
+    cache = UserCache(ttl=60)
+    with patch.object(UserCache, "MAX_ENTRIES", 2):
+        cache.set(user("1"))
+        cache.set(user("2"))
+        cache.set(user("3"))
+
+    assert cache.get("1") is None
+    assert cache.get("3") is not None
+
+
+class Writes:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, user_ids, timestamp):
+        self.calls.append(sorted(user_ids))
+
+
+def test_touches_are_coalesced(clock):
+    write = Writes()
+    writer = LastActiveWriter(60, write)
+
+    writer.touch("1")
+    writer.touch("2")
+    writer.touch("1")
+    writer.flush()
+    writer.flush()
+    assert write.calls == [["1", "2"]]
+
+    # Written at most once per interval
+    clock.now += 30
+    writer.touch("1")
+    writer.flush()
+    assert write.calls == [["1", "2"]]
+
+    clock.now += 31
+    writer.touch("1")
+    writer.flush()
+    assert write.calls == [["1", "2"], ["1"]]
+
+
+def test_write_errors_do_not_raise():
+    def write(user_ids, timestamp):
+        raise RuntimeError("database is locked")
+
+    writer = LastActiveWriter(60, write)
+    writer.touch("1")
+    writer.flush()
+
+    assert not writer._pending
+
+
+def test_periodic_flush_flushes_on_cancel():
+    write = Writes()
+    writer = LastActiveWriter(60, write)
+
+    async def run():
+        task = asyncio.create_task(writer.periodic_flush())
+        await asyncio.sleep(0)
+        writer.touch("1")
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert write.calls == [["1"]]
@@ -22,6 +22,7 @@ from typing import Optional, Union, List, Dict
 from opentelemetry import trace
 
 from open_webui.models.users import Users
+from open_webui.utils.user_cache import LastActiveWriter
 
 from open_webui.constants import ERROR_MESSAGES
 
@@ -34,6 +35,7 @@ from open_webui.env import (
     STATIC_DIR,
     SRC_LOG_LEVELS,
     WEBUI_AUTH_TRUSTED_EMAIL_HEADER,
+    USER_LAST_ACTIVE_INTERVAL,
 )
 
 from fastapi import BackgroundTasks, Depends, HTTPException, Request, Response, status
@@ -49,6 +51,10 @@ log.setLevel(SRC_LOG_LEVELS["OAUTH"])
 SESSION_SECRET = WEBUI_SECRET_KEY
 ALGORITHM = "HS256"
 
+LAST_ACTIVE_WRITER = LastActiveWriter(
+    USER_LAST_ACTIVE_INTERVAL, Users.update_users_last_active_by_ids
+)
+
 ##############
 # Auth Utils
 ##############
@@ -206,6 +212,24 @@ def get_http_authorization_cred(auth_header: Optional[str]):
         return None
 
 
+def get_user_by_id_cached(id: str):
+    user = Users.cache.get(id)
+    if user is None:
+        generation = Users.cache.generation
+        user = Users.get_user_by_id(id)
+        Users.cache.set(user, generation)
+    return user
+
+
+def get_user_by_api_key_cached(api_key: str):
+    user = Users.cache.get_by_api_key(api_key)
+    if user is None:
+        generation = Users.cache.generation
+        user = Users.get_user_by_api_key(api_key)
+        Users.cache.set(user, generation)
+    return user
+
+
 def get_current_user(
     request: Request,
     response: Response,
@@ -270,7 +294,7 @@ def get_current_user(
         )
 
     if data is not None and "id" in data:
-        user = Users.get_user_by_id(data["id"])
+        user = get_user_by_id_cached(data["id"])
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -300,10 +324,8 @@ def get_current_user(
                 current_span.set_attribute("client.user.role", user.role)
                 current_span.set_attribute("client.auth.type", "jwt")
 
-            # Refresh the user's last active timestamp asynchronously
-            # to prevent blocking the request
-            if background_tasks:
-                background_tasks.add_task(Users.update_user_last_active_by_id, user.id)
+            # Refresh the user's last active timestamp in the next batched write
+            LAST_ACTIVE_WRITER.touch(user.id)
         return user
     else:
         raise HTTPException(
@@ -313,7 +335,7 @@ def get_current_user(
 
 
 def get_current_user_by_api_key(api_key: str):
-    user = Users.get_user_by_api_key(api_key)
+    user = get_user_by_api_key_cached(api_key)
 
     if user is None:
         raise HTTPException(
@@ -329,7 +351,7 @@ def get_current_user_by_api_key(api_key: str):
             current_span.set_attribute("client.user.role", user.role)
             current_span.set_attribute("client.auth.type", "api_key")
 
-        Users.update_user_last_active_by_id(user.id)
+        LAST_ACTIVE_WRITER.touch(user.id)
 
     return user
 
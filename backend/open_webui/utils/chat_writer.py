@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_BUFFER_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ChatMessageWriter:
+    """
+    Write-behind buffer for messages that are still being generated.
+
+    Every upsert is merged into an in-memory buffer for its (chat_id,
+    message_id) and written to the database at most once per `interval`
+    seconds, or earlier once the content grew by `buffer_size` characters.
+    Buffers are flushed explicitly on completion or cancellation, by
+    `periodic_flush` when a stream stalls, and by `flush_all` on shutdown.
+    """
+
+    def __init__(self, interval: float, buffer_size: int):
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._buffers: dict[tuple[str, str], dict] = {}
+
+    @staticmethod
+    def _get_size(message: dict) -> int:
+        content = message.get("content")
+        return len(content) if isinstance(content, str) else 0
+
+    def _write(self, key: tuple[str, str], buffer: dict):
+        message = buffer["message"]
+        buffer["message"] = {}
+        buffer["flushed_at"] = time.monotonic()
+
+        if not message:
+            return None
+
+        buffer["flushed_size"] = self._get_size(message) or buffer["flushed_size"]
+
+        chat_id, message_id = key
+        try:
+            return Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, message
+            )
+        except Exception as e:
+            log.exception(f"Error saving message {message_id} of chat {chat_id}: {e}")
+            return None
+
+    def upsert(self, chat_id: str, message_id: str, message: dict):
+        key = (chat_id, message_id)
+        now = time.monotonic()
+
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = {"message": {}, "flushed_at": now, "flushed_size": 0}
+            self._buffers[key] = buffer
+
+        buffer["message"].update(message)
+
+        if (
+            now - buffer["flushed_at"] >= self.interval
+            or self._get_size(buffer["message"]) - buffer["flushed_size"]
+            >= self.buffer_size
+        ):
+            self._write(key, buffer)
+
+    def flush(self, chat_id: str, message_id: str, message: Optional[dict] = None):
+        """
+        Write any buffered changes of the message, merged with `message`, and
+        stop buffering it.
+        """
+        key = (chat_id, message_id)
+        buffer = self._buffers.pop(
+            key, {"message": {}, "flushed_at": 0, "flushed_size": 0}
+        )
+
+        if message:
+            buffer["message"].update(message)
+
+        result = self._write(key, buffer)
+
+        # The message is complete, make it searchable
+        Chats.update_chat_search_by_id(chat_id)
+        return result
+
+    def flush_stale(self):
+        now = time.monotonic()
+        for key, buffer in list(self._buffers.items()):
+            if now - buffer["flushed_at"] < self.interval:
+                continue
+
+            if buffer["message"]:
+                self._write(key, buffer)
+            else:
+                # Nothing was written since the last flush, the stream is gone
+                self._buffers.pop(key, None)
+
+    def flush_all(self):
+        for key in list(self._buffers.keys()):
+            buffer = self._buffers.pop(key, None)
+            if buffer:
+                self._write(key, buffer)
+
+    async def periodic_flush(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                self.flush_stale()
+        except asyncio.CancelledError:
+            self.flush_all()
+            raise
+
+
+CHAT_MESSAGE_WRITER = ChatMessageWriter(
+    REALTIME_CHAT_SAVE_INTERVAL, REALTIME_CHAT_SAVE_BUFFER_SIZE
+)
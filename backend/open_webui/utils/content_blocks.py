@@ -0,0 +1,393 @@
+import html
+import json
+import re
+import time
+
+# Characters re-scanned behind the previously scanned position of a block so
+# that tags (including their attributes) split across streamed deltas are
+# still detected, without re-running the tag regexes over the whole message.
+TAG_SCAN_LOOKBACK = 256
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    backtick_segments = content.split("```")
+    # Even number of segments means the last backticks are opening a new block
+    return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
+
+
+def extract_attributes(tag_content):
+    """Extract attributes from a tag if they exist."""
+    attributes = {}
+    if not tag_content:  # Ensure tag_content is not None
+        return attributes
+    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+    matches = re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content)
+    for key, value in matches:
+        attributes[key] = value
+    return attributes
+
+
+def get_start_tag_pattern(start_tag):
+    if start_tag.startswith("<") and start_tag.endswith(">"):
+        # Match start tag e.g., <tag> or <tag attr="value">
+        return rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+    return rf"{re.escape(start_tag)}"
+
+
+class ContentBuffer:
+    """
+    Append-only buffer for the raw streamed content of a message.
+
+    Deltas are collected as parts and only joined when the value is read,
+    instead of copying the whole accumulated string on every delta. Content
+    blocks hold plain strings: the block receiving deltas is serialized into
+    the message on every delta anyway, which copies it in full.
+    """
+
+    def __init__(self, content: str = ""):
+        self._parts = [content] if content else []
+        self._value = content
+        self._length = len(content)
+
+    def append(self, value: str):
+        self._parts.append(value)
+        self._length += len(value)
+        self._value = None
+
+    def getvalue(self) -> str:
+        if self._value is None:
+            self._value = "".join(self._parts)
+            self._parts = [self._value] if self._value else []
+        return self._value
+
+    def sub(self, pattern, repl, flags=0):
+        self._value = re.sub(pattern, repl, self.getvalue(), flags=flags)
+        self._parts = [self._value] if self._value else []
+        self._length = len(self._value)
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        return self.getvalue()
+
+
+class ContentTagScanner:
+    """
+    Detects reasoning, code interpreter and solution tags in streamed content.
+
+    Only the last content block is inspected, starting from where the previous
+    scan of that block stopped minus a bounded lookback window, so the cost of
+    each delta is proportional to the delta rather than the whole message.
+    """
+
+    def __init__(self, lookback: int = TAG_SCAN_LOOKBACK):
+        self.lookback = lookback
+        self._patterns = {}
+        # content_type -> (block, number of characters already scanned)
+        self._scanned = {}
+
+    def _get_pattern(self, start_tag):
+        pattern = self._patterns.get(start_tag)
+        if pattern is None:
+            pattern = re.compile(get_start_tag_pattern(start_tag))
+            self._patterns[start_tag] = pattern
+        return pattern
+
+    def _get_scan_start(self, content_type, block, lookback):
+        scanned_block, scanned = self._scanned.get(content_type, (None, 0))
+        if scanned_block is not block or scanned > len(block["content"]):
+            return 0
+        return max(0, scanned - lookback)
+
+    def _set_scanned(self, content_type, block):
+        self._scanned[content_type] = (block, len(block["content"]))
+
+    def handle(self, content_type, tags, content_blocks, content: ContentBuffer):
+        """
+        Process the last content block for the given tags, splitting it into
+        new blocks when a start or end tag is found. Returns True if an end
+        tag closed a block of `content_type`.
+        """
+        end_flag = False
+
+        if content_blocks[-1]["type"] == "text":
+            block = content_blocks[-1]
+            scan_start = self._get_scan_start(content_type, block, self.lookback)
+            scanned_content = block["content"][scan_start:]
+
+            for start_tag, end_tag in tags:
+                match = self._get_pattern(start_tag).search(scanned_content)
+                if match:
+                    attr_content = (
+                        match.group(1) if match.re.groups and match.group(1) else ""
+                    )  # Ensure it's not None
+                    attributes = extract_attributes(attr_content)
+
+                    # Capture everything before and after the matched tag
+                    before_tag = block["content"][: scan_start + match.start()]
+                    after_tag = scanned_content[match.end() :]
+
+                    # Keep only the content before the tag in the current text block
+                    block["content"] = before_tag
+                    if not block["content"]:
+                        content_blocks.pop()
+
+                    # Append the new block
+                    content_blocks.append(
+                        {
+                            "type": content_type,
+                            "start_tag": start_tag,
+                            "end_tag": end_tag,
+                            "attributes": attributes,
+                            "content": "",
+                            "started_at": time.time(),
+                        }
+                    )
+
+                    if after_tag:
+                        content_blocks[-1]["content"] = after_tag
+                        end_flag = self.handle(
+                            content_type, tags, content_blocks, content
+                        )
+
+                    return end_flag
+
+            self._set_scanned(content_type, block)
+
+        elif content_blocks[-1]["type"] == content_type:
+            block = content_blocks[-1]
+            start_tag = block["start_tag"]
+            end_tag = block["end_tag"]
+
+            scan_start = self._get_scan_start(content_type, block, len(end_tag) - 1)
+
+            # Check if the block has the end tag
+            if end_tag not in block["content"][scan_start:]:
+                self._set_scanned(content_type, block)
+                return end_flag
+
+            end_flag = True
+
+            block_content = block["content"]
+            # Strip start and end tags from the content
+            start_tag_pattern = rf"<{re.escape(start_tag)}(.*?)>"
+            block_content = re.sub(start_tag_pattern, "", block_content).strip()
+
+            split_content = block_content.split(end_tag, 1)
+
+            # Content inside the tag
+            block_content = split_content[0].strip() if split_content else ""
+
+            # Leftover content (everything after `</tag>`)
+            leftover_content = (
+                split_content[1].strip() if len(split_content) > 1 else ""
+            )
+
+            if block_content:
+                block["content"] = block_content
+                block["ended_at"] = time.time()
+                block["duration"] = int(block["ended_at"] - block["started_at"])
+
+                # Reset the content_blocks by appending a new text block
+                if content_type != "code_interpreter":
+                    content_blocks.append(
+                        {
+                            "type": "text",
+                            "content": leftover_content,
+                        }
+                    )
+            else:
+                # Remove the block if content is empty
+                content_blocks.pop()
+                content_blocks.append(
+                    {
+                        "type": "text",
+                        "content": leftover_content,
+                    }
+                )
+
+            # Clean processed content
+            content.sub(
+                rf"{get_start_tag_pattern(start_tag)}(.|\n)*?{re.escape(end_tag)}",
+                "",
+                flags=re.DOTALL,
+            )
+
+        return end_flag
+
+
+class ContentBlockSerializer:
+    """
+    Serializes content blocks into message content.
+
+    The rendered content of every block but the last one is cached and reused
+    as long as those blocks are unchanged, so while streaming only the block
+    currently receiving deltas is re-rendered.
+    """
+
+    def __init__(self):
+        # raw -> (keys of the cached leading blocks, serialized content)
+        self._prefix = {}
+        # (block, raw content prefix, rendered lines of that prefix)
+        self._reasoning = None
+
+    @staticmethod
+    def _get_block_key(block):
+        # Blocks are only ever mutated by reassigning these fields, so comparing
+        # them (by identity first) is enough to detect a change.
+        return (
+            id(block),
+            block["type"],
+            block["content"],
+            block.get("results"),
+            block.get("duration"),
+            block.get("output"),
+            block.get("attributes"),
+        )
+
+    def serialize(self, content_blocks, raw=False):
+        if not content_blocks:
+            return ""
+
+        leading_blocks = content_blocks[:-1]
+        keys = [self._get_block_key(block) for block in leading_blocks]
+
+        cached_keys, content = self._prefix.get(raw, (None, ""))
+        if cached_keys != keys:
+            content = ""
+            for block in leading_blocks:
+                content = self._serialize_block(content, block, raw)
+            self._prefix[raw] = (keys, content)
+
+        content = self._serialize_block(content, content_blocks[-1], raw)
+        return content.strip()
+
+    @staticmethod
+    def _render_reasoning_lines(content):
+        return [
+            (f"> {line}" if not line.startswith(">") else line)
+            for line in content.splitlines()
+        ]
+
+    def _render_reasoning(self, block):
+        block_content = block["content"]
+
+        # Reuse the lines rendered on previous deltas of the same block
+        memo = self._reasoning
+        if memo and memo[0] is block and block_content.startswith(memo[1]):
+            _, raw_prefix, rendered_lines = memo
+        else:
+            raw_prefix, rendered_lines = "", []
+
+        tail = block_content[len(raw_prefix) :]
+
+        # Only memoize complete lines, the last line may still grow
+        newline_idx = tail.rfind("\n") + 1
+        if newline_idx:
+            rendered_lines.extend(self._render_reasoning_lines(tail[:newline_idx]))
+            raw_prefix = block_content[: len(raw_prefix) + newline_idx]
+            tail = tail[newline_idx:]
+        self._reasoning = (block, raw_prefix, rendered_lines)
+
+        return "\n".join(rendered_lines + self._render_reasoning_lines(tail))
+
+    def _serialize_block(self, content, block, raw=False):
+        if block["type"] == "text":
+            content = f"{content}{block['content'].strip()}\n"
+        elif block["type"] == "tool_calls":
+            tool_calls = block.get("content", [])
+            results = block.get("results", [])
+
+            if results:
+
+                tool_calls_display_content = ""
+                for tool_call in tool_calls:
+
+                    tool_call_id = tool_call.get("id", "")
+                    tool_name = tool_call.get("function", {}).get("name", "")
+                    tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                    tool_result = None
+                    tool_result_files = None
+                    for result in results:
+                        if tool_call_id == result.get("tool_call_id", ""):
+                            tool_result = result.get("content", None)
+                            tool_result_files = result.get("files", None)
+                            break
+
+                    if tool_result:
+                        tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}">\n<summary>Tool Executed</summary>\n</details>\n'
+                    else:
+                        tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
+
+                if not raw:
+                    content = f"{content}\n{tool_calls_display_content}\n\n"
+            else:
+                tool_calls_display_content = ""
+
+                for tool_call in tool_calls:
+                    tool_call_id = tool_call.get("id", "")
+                    tool_name = tool_call.get("function", {}).get("name", "")
+                    tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                    tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>'
+
+                if not raw:
+                    content = f"{content}\n{tool_calls_display_content}\n\n"
+
+        elif block["type"] == "reasoning":
+            reasoning_duration = block.get("duration", None)
+
+            if raw:
+                content = f'{content}\n{block["start_tag"]}{block["content"]}{block["end_tag"]}\n'
+            else:
+                reasoning_display_content = self._render_reasoning(block)
+
+                if reasoning_duration is not None:
+                    content = f'{content}\n<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+                else:
+                    content = f'{content}\n<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+        elif block["type"] == "code_interpreter":
+            attributes = block.get("attributes", {})
+            output = block.get("output", None)
+            lang = attributes.get("lang", "")
+            code = block["content"]
+
+            content_stripped, original_whitespace = split_content_and_whitespace(
+                content
+            )
+            if is_opening_code_block(content_stripped):
+                # Remove trailing backticks that would open a new block
+                content = content_stripped.rstrip("`").rstrip() + original_whitespace
+            else:
+                # Keep content as is - either closing backticks or no backticks
+                content = content_stripped + original_whitespace
+
+            if output:
+                output = html.escape(json.dumps(output))
+
+                if raw:
+                    content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{code}\n</code_interpreter>\n```output\n{output}\n```\n'
+                else:
+                    content = f'{content}\n<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{code}\n```\n</details>\n'
+            else:
+                if raw:
+                    content = f'{content}\n<code_interpreter type="code" lang="{lang}">\n{code}\n</code_interpreter>\n'
+                else:
+                    content = f'{content}\n<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{code}\n```\n</details>\n'
+
+        else:
+            block_content = str(block["content"]).strip()
+            content = f"{content}{block['type']}: {block_content}\n"
+
+        return content
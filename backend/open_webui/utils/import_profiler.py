@@ -0,0 +1,121 @@
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+# Read here rather than in open_webui.env, which is one of the imports measured
+ENABLE_IMPORT_PROFILING = (
+    os.environ.get("ENABLE_IMPORT_PROFILING", "False").lower() == "true"
+)
+
+
+class ImportProfiler:
+    """
+    Measures the time spent importing each module, like `python -X importtime`:
+    the cumulative time of a module includes the modules it imported, its self
+    time does not.
+
+    Works by wrapping `builtins.__import__` while installed, so submodules
+    loaded by `importlib.import_module` or a `from package import submodule`
+    are counted in the module importing them.
+    """
+
+    def __init__(self):
+        # module -> [self time, cumulative time], in seconds
+        self.timings: dict[str, list[float]] = {}
+        self.installed_at: Optional[float] = None
+        self.uninstalled_at: Optional[float] = None
+
+        self._import = None
+        self._local = threading.local()
+
+    @property
+    def installed(self) -> bool:
+        return self._import is not None
+
+    def install(self):
+        if self.installed:
+            return
+        self._import = builtins.__import__
+        self.installed_at = time.perf_counter()
+        builtins.__import__ = self._profiled_import
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        builtins.__import__ = self._import
+        self._import = None
+        self.uninstalled_at = time.perf_counter()
+
+    def _profiled_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        module_count = len(sys.modules)
+        # Time spent in the imports done by this one
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+
+            # Imports of modules already loaded only cost a lookup
+            if len(sys.modules) != module_count:
+                timing = self.timings.setdefault(
+                    self._resolve_name(name, globals, level), [0.0, 0.0]
+                )
+                timing[0] += elapsed - children
+                timing[1] += elapsed
+
+    @staticmethod
+    def _resolve_name(name, globals, level) -> str:
+        if level == 0:
+            return name
+        try:
+            package = (globals or {}).get("__package__") or ""
+            return importlib.util.resolve_name("." * level + name, package)
+        except Exception:
+            return "." * level + name
+
+    def get_report(self, limit: int = 25) -> str:
+        end = self.uninstalled_at or time.perf_counter()
+        lines = [
+            f"Imported {len(self.timings)} modules in "
+            f"{sum(self_time for self_time, _ in self.timings.values()):.2f}s, "
+            f"{end - self.installed_at:.2f}s from the first import to startup",
+        ]
+
+        packages = defaultdict(float)
+        for name, (self_time, _) in self.timings.items():
+            packages[name.split(".")[0]] += self_time
+
+        lines.append("Slowest packages (self time of their modules):")
+        for package, self_time in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[:limit]:
+            lines.append(f"  {self_time * 1000:10.1f} ms  {package}")
+
+        lines.append("Slowest modules (self | cumulative):")
+        for name, (self_time, cumulative) in sorted(
+            self.timings.items(), key=lambda item: item[1][1], reverse=True
+        )[:limit]:
+            lines.append(
+                f"  {self_time * 1000:10.1f} ms | {cumulative * 1000:10.1f} ms  {name}"
+            )
+
+        return "\n".join(lines)
+
+
+IMPORT_PROFILER = ImportProfiler()
+
+if ENABLE_IMPORT_PROFILING:
+    IMPORT_PROFILER.install()
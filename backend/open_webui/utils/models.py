@@ -2,6 +2,7 @@ import time
 import logging
 import asyncio
 import sys
+from collections import OrderedDict
 
 from aiocache import cached
 from fastapi import Request
@@ -11,6 +12,7 @@ from open_webui.functions import get_function_models
 
 
 from open_webui.models.functions import Functions
+from open_webui.models.groups import Groups
 from open_webui.models.models import Models
 
 
@@ -76,6 +78,175 @@ async def get_all_base_models(request: Request, user: UserModel = None):
     return function_models + openai_models + ollama_models
 
 
+# Process action_ids to get the actions
+def get_action_items_from_module(function, module):
+    actions = []
+    if hasattr(module, "actions"):
+        actions = module.actions
+        return [
+            {
+                "id": f"{function.id}.{action['id']}",
+                "name": action.get("name", f"{function.name} ({action['id']})"),
+                "description": function.meta.description,
+                "icon": action.get(
+                    "icon_url",
+                    function.meta.manifest.get("icon_url", None)
+                    or getattr(module, "icon_url", None)
+                    or getattr(module, "icon", None),
+                ),
+            }
+            for action in actions
+        ]
+    else:
+        return [
+            {
+                "id": function.id,
+                "name": function.name,
+                "description": function.meta.description,
+                "icon": function.meta.manifest.get("icon_url", None)
+                or getattr(module, "icon_url", None)
+                or getattr(module, "icon", None),
+            }
+        ]
+
+
+# Process filter_ids to get the filters
+def get_filter_items_from_module(function, module):
+    return [
+        {
+            "id": function.id,
+            "name": function.name,
+            "description": function.meta.description,
+            "icon": function.meta.manifest.get("icon_url", None)
+            or getattr(module, "icon_url", None)
+            or getattr(module, "icon", None),
+        }
+    ]
+
+
+class ModelRegistry:
+    """
+    The functions and custom models the model list is built from.
+
+    Both are reloaded only when a cheap fingerprint of their table changes, so
+    building the model list does not query every function and model each time.
+    updated_at has a granularity of one second, so rows updated in the same
+    second as the last load are always treated as changed.
+
+    The custom models each user can read are memoized per user and group set
+    until the custom models change.
+    """
+
+    MAX_ACCESS_VIEWS = 1000
+
+    def __init__(self):
+        self.functions_stamp = None
+        self.functions_loaded_at = 0
+        self.actions = {}
+        self.filters = {}
+        self.global_action_ids = []
+        self.global_filter_ids = []
+        # function_id -> action/filter items built from the function module
+        self.function_items = {}
+
+        self.models_stamp = None
+        self.models_loaded_at = 0
+        self.custom_models = []
+        self.custom_models_by_id = {}
+        # (user id, group ids) -> ids of the custom models the user can read
+        self.access_views = OrderedDict()
+
+    @staticmethod
+    def _is_stale(stamp, current_stamp, loaded_at) -> bool:
+        return stamp != current_stamp or any(
+            (row[1] or 0) >= loaded_at for row in current_stamp
+        )
+
+    def refresh(self):
+        loaded_at = int(time.time())
+        functions_stamp = Functions.get_functions_stamp()
+        if self._is_stale(
+            self.functions_stamp, functions_stamp, self.functions_loaded_at
+        ):
+            functions = Functions.get_functions(active_only=True)
+            self.actions = {
+                function.id: function
+                for function in functions
+                if function.type == "action"
+            }
+            self.filters = {
+                function.id: function
+                for function in functions
+                if function.type == "filter"
+            }
+            self.global_action_ids = [
+                function.id for function in self.actions.values() if function.is_global
+            ]
+            self.global_filter_ids = [
+                function.id for function in self.filters.values() if function.is_global
+            ]
+            self.function_items = {}
+
+            self.functions_stamp = functions_stamp
+            self.functions_loaded_at = loaded_at
+
+        models_stamp = Models.get_models_stamp()
+        if self._is_stale(self.models_stamp, models_stamp, self.models_loaded_at):
+            self.custom_models = Models.get_all_models()
+            self.custom_models_by_id = {
+                custom_model.id: custom_model for custom_model in self.custom_models
+            }
+            self.access_views.clear()
+
+            self.models_stamp = models_stamp
+            self.models_loaded_at = loaded_at
+
+    def get_readable_model_ids(self, user, user_group_ids: set[str]) -> set[str]:
+        key = (user.id, frozenset(user_group_ids))
+        model_ids = self.access_views.get(key)
+        if model_ids is not None:
+            self.access_views.move_to_end(key)
+            return model_ids
+
+        model_ids = {
+            custom_model.id
+            for custom_model in self.custom_models
+            if user.id == custom_model.user_id
+            or has_access(
+                user.id,
+                type="read",
+                access_control=custom_model.access_control,
+                user_group_ids=user_group_ids,
+            )
+        }
+        self.access_views[key] = model_ids
+        if len(self.access_views) > self.MAX_ACCESS_VIEWS:
+            self.access_views.popitem(last=False)
+        return model_ids
+
+    def get_function_items(self, request, function_id: str, type: str) -> list[dict]:
+        items = self.function_items.get(function_id)
+        if items is None:
+            function_module, _, _ = get_function_module_from_cache(request, function_id)
+
+            if type == "action":
+                items = get_action_items_from_module(
+                    self.actions[function_id], function_module
+                )
+            elif getattr(function_module, "toggle", None):
+                items = get_filter_items_from_module(
+                    self.filters[function_id], function_module
+                )
+            else:
+                items = []
+            self.function_items[function_id] = items
+
+        return [item.copy() for item in items]
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
 async def get_all_models(request, refresh: bool = False, user: UserModel = None):
     if (
         request.app.state.MODELS
@@ -129,58 +300,39 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             ]
         models = models + arena_models
 
-    global_action_ids = [
-        function.id for function in Functions.get_global_action_functions()
-    ]
-    enabled_action_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("action", active_only=True)
-    ]
-
-    global_filter_ids = [
-        function.id for function in Functions.get_global_filter_functions()
-    ]
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
+    MODEL_REGISTRY.refresh()
 
-    custom_models = Models.get_all_models()
-    for custom_model in custom_models:
+    # Index the models by id, and ollama models by their name without the tag
+    # as well, Ollama may return model ids in different formats (e.g., 'llama3'
+    # vs. 'llama3:7b')
+    models_by_id = {}
+    for model in models:
+        models_by_id.setdefault(model["id"], []).append(model)
+        if model.get("owned_by") == "ollama":
+            name = model["id"].split(":")[0]
+            if name != model["id"]:
+                models_by_id.setdefault(name, []).append(model)
+
+    removed_models = set()
+    for custom_model in MODEL_REGISTRY.custom_models:
         if custom_model.base_model_id is None:
             # Applied directly to a base model
-            for model in models:
-                if custom_model.id == model["id"] or (
-                    model.get("owned_by") == "ollama"
-                    and custom_model.id
-                    == model["id"].split(":")[
-                        0
-                    ]  # Ollama may return model ids in different formats (e.g., 'llama3' vs. 'llama3:7b')
-                ):
-                    if custom_model.is_active:
-                        model["name"] = custom_model.name
-                        model["info"] = custom_model.model_dump()
-
-                        # Set action_ids and filter_ids
-                        action_ids = []
-                        filter_ids = []
-
-                        if "info" in model and "meta" in model["info"]:
-                            action_ids.extend(
-                                model["info"]["meta"].get("actionIds", [])
-                            )
-                            filter_ids.extend(
-                                model["info"]["meta"].get("filterIds", [])
-                            )
-
-                        model["action_ids"] = action_ids
-                        model["filter_ids"] = filter_ids
-                    else:
-                        models.remove(model)
-
-        elif custom_model.is_active and (
-            custom_model.id not in [model["id"] for model in models]
-        ):
+            for model in models_by_id.get(custom_model.id, []):
+                if custom_model.is_active:
+                    model["name"] = custom_model.name
+                    model["info"] = custom_model.model_dump()
+
+                    # Set action_ids and filter_ids
+                    model["action_ids"] = list(
+                        model["info"]["meta"].get("actionIds", None) or []
+                    )
+                    model["filter_ids"] = list(
+                        model["info"]["meta"].get("filterIds", None) or []
+                    )
+                else:
+                    removed_models.add(id(model))
+
+        elif custom_model.is_active and custom_model.id not in models_by_id:
             owned_by = "openai"
             pipe = None
 
@@ -206,104 +358,51 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
                 if "filterIds" in meta:
                     filter_ids.extend(meta["filterIds"])
 
-            models.append(
-                {
-                    "id": f"{custom_model.id}",
-                    "name": custom_model.name,
-                    "object": "model",
-                    "created": custom_model.created_at,
-                    "owned_by": owned_by,
-                    "info": custom_model.model_dump(),
-                    "preset": True,
-                    **({"pipe": pipe} if pipe is not None else {}),
-                    "action_ids": action_ids,
-                    "filter_ids": filter_ids,
-                }
-            )
-
-    # Process action_ids to get the actions
-    def get_action_items_from_module(function, module):
-        actions = []
-        if hasattr(module, "actions"):
-            actions = module.actions
-            return [
-                {
-                    "id": f"{function.id}.{action['id']}",
-                    "name": action.get("name", f"{function.name} ({action['id']})"),
-                    "description": function.meta.description,
-                    "icon": action.get(
-                        "icon_url",
-                        function.meta.manifest.get("icon_url", None)
-                        or getattr(module, "icon_url", None)
-                        or getattr(module, "icon", None),
-                    ),
-                }
-                for action in actions
-            ]
-        else:
-            return [
-                {
-                    "id": function.id,
-                    "name": function.name,
-                    "description": function.meta.description,
-                    "icon": function.meta.manifest.get("icon_url", None)
-                    or getattr(module, "icon_url", None)
-                    or getattr(module, "icon", None),
-                }
-            ]
-
-    # Process filter_ids to get the filters
-    def get_filter_items_from_module(function, module):
-        return [
-            {
-                "id": function.id,
-                "name": function.name,
-                "description": function.meta.description,
-                "icon": function.meta.manifest.get("icon_url", None)
-                or getattr(module, "icon_url", None)
-                or getattr(module, "icon", None),
+            model = {
+                "id": f"{custom_model.id}",
+                "name": custom_model.name,
+                "object": "model",
+                "created": custom_model.created_at,
+                "owned_by": owned_by,
+                "info": custom_model.model_dump(),
+                "preset": True,
+                **({"pipe": pipe} if pipe is not None else {}),
+                "action_ids": action_ids,
+                "filter_ids": filter_ids,
             }
-        ]
+            models.append(model)
+            models_by_id.setdefault(model["id"], []).append(model)
 
-    def get_function_module_by_id(function_id):
-        function_module, _, _ = get_function_module_from_cache(request, function_id)
-        return function_module
+    if removed_models:
+        models = [model for model in models if id(model) not in removed_models]
 
     for model in models:
         action_ids = [
             action_id
-            for action_id in list(set(model.pop("action_ids", []) + global_action_ids))
-            if action_id in enabled_action_ids
+            for action_id in list(
+                set(model.pop("action_ids", []) + MODEL_REGISTRY.global_action_ids)
+            )
+            if action_id in MODEL_REGISTRY.actions
         ]
         filter_ids = [
             filter_id
-            for filter_id in list(set(model.pop("filter_ids", []) + global_filter_ids))
-            if filter_id in enabled_filter_ids
+            for filter_id in list(
+                set(model.pop("filter_ids", []) + MODEL_REGISTRY.global_filter_ids)
+            )
+            if filter_id in MODEL_REGISTRY.filters
         ]
 
         model["actions"] = []
         for action_id in action_ids:
-            action_function = Functions.get_function_by_id(action_id)
-            if action_function is None:
-                raise Exception(f"Action not found: {action_id}")
-
-            function_module = get_function_module_by_id(action_id)
             model["actions"].extend(
-                get_action_items_from_module(action_function, function_module)
+                MODEL_REGISTRY.get_function_items(request, action_id, "action")
             )
 
         model["filters"] = []
         for filter_id in filter_ids:
-            filter_function = Functions.get_function_by_id(filter_id)
-            if filter_function is None:
-                raise Exception(f"Filter not found: {filter_id}")
-
-            function_module = get_function_module_by_id(filter_id)
-
-            if getattr(function_module, "toggle", None):
-                model["filters"].extend(
-                    get_filter_items_from_module(filter_function, function_module)
-                )
+            model["filters"].extend(
+                MODEL_REGISTRY.get_function_items(request, filter_id, "filter")
+            )
 
     log.debug(f"get_all_models() returned {len(models)} models")
 
@@ -311,7 +410,32 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
     return models
 
 
+def get_filtered_models(models, user):
+    # Look up the groups of the user once instead of for every model
+    user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user.id)}
+    readable_model_ids = MODEL_REGISTRY.get_readable_model_ids(user, user_group_ids)
+
+    filtered_models = []
+    for model in models:
+        if model.get("arena"):
+            if has_access(
+                user.id,
+                type="read",
+                access_control=model.get("info", {})
+                .get("meta", {})
+                .get("access_control", {}),
+                user_group_ids=user_group_ids,
+            ):
+                filtered_models.append(model)
+        elif model["id"] in readable_model_ids:
+            filtered_models.append(model)
+
+    return filtered_models
+
+
 def check_model_access(user, model):
+    user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user.id)}
+
     if model.get("arena"):
         if not has_access(
             user.id,
@@ -319,16 +443,12 @@ def check_model_access(user, model):
             access_control=model.get("info", {})
             .get("meta", {})
             .get("access_control", {}),
+            user_group_ids=user_group_ids,
         ):
             raise Exception("Model not found")
     else:
-        model_info = Models.get_model_by_id(model.get("id"))
-        if not model_info:
-            raise Exception("Model not found")
-        elif not (
-            user.id == model_info.user_id
-            or has_access(
-                user.id, type="read", access_control=model_info.access_control
-            )
+        MODEL_REGISTRY.refresh()
+        if model.get("id") not in MODEL_REGISTRY.get_readable_model_ids(
+            user, user_group_ids
         ):
             raise Exception("Model not found")
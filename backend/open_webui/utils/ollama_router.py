@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import (
+    OLLAMA_LOADED_MODELS_TTL,
+    OLLAMA_CIRCUIT_BREAKER_THRESHOLD,
+    OLLAMA_CIRCUIT_BREAKER_COOLDOWN,
+    ENABLE_OLLAMA_CHAT_AFFINITY,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
+
+
+class OllamaNode:
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+
+        # Circuit breaker: consecutive failures, and until when (monotonic
+        # time) the node is ejected once they reach the threshold
+        self.failures = 0
+        self.ejected_until = 0.0
+
+        # Models resident in the node's memory, as last reported by /api/ps
+        self.loaded_models: set[str] = set()
+        self.loaded_models_at: Optional[float] = None
+        self.refreshing = False
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+
+class OllamaNodeLease:
+    """An in-flight request to a node, released exactly once."""
+
+    def __init__(self, router: "OllamaRouter", node: OllamaNode):
+        self.router = router
+        self.node = node
+        self.released = False
+
+    def release(self, success: bool = True):
+        if self.released:
+            return
+        self.released = True
+        self.router._release(self.node, success)
+
+
+class OllamaRouter:
+    """
+    Picks the Ollama node serving each request among the nodes that have its
+    model.
+
+    Nodes that already have the model loaded are preferred, so that requests
+    do not make the nodes swap models in and out of memory; among those, the
+    least busy of two random nodes (power of two choices) is picked. Nodes
+    failing repeatedly are ejected for a cooldown, after which they are tried
+    again and ejected on their first failure until one request succeeds.
+    Turns of the same chat stick to the node of the previous turn while it
+    stays healthy, to reuse its KV cache.
+
+    The state is per process: in-flight counts only cover the requests of
+    this worker, and loaded models are polled from each node's /api/ps.
+    """
+
+    MAX_AFFINITY_ENTRIES = 10000
+
+    def __init__(
+        self,
+        loaded_models_ttl: float = OLLAMA_LOADED_MODELS_TTL,
+        failure_threshold: int = OLLAMA_CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = OLLAMA_CIRCUIT_BREAKER_COOLDOWN,
+        enable_affinity: bool = ENABLE_OLLAMA_CHAT_AFFINITY,
+    ):
+        self.loaded_models_ttl = loaded_models_ttl
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.enable_affinity = enable_affinity
+
+        # base url -> node
+        self.nodes: dict[str, OllamaNode] = {}
+        # (chat_id, model) -> base url of the node of the last turn
+        self._affinity: OrderedDict[tuple[str, str], str] = OrderedDict()
+        # Keeps the refresh tasks referenced until they are done
+        self._tasks: set[asyncio.Task] = set()
+
+    def get_node(self, url: str) -> OllamaNode:
+        node = self.nodes.get(url)
+        if node is None:
+            node = self.nodes[url] = OllamaNode(url)
+        return node
+
+    def refresh_loaded_models(
+        self,
+        urls: dict[int, str],
+        get_loaded_models: Callable[[int], Awaitable[Optional[list[str]]]],
+    ):
+        """
+        Poll the loaded models of the nodes `urls` (url_idx -> base url) whose
+        list is older than the TTL, in the background. `get_loaded_models`
+        returns the models loaded on a node, or None if it could not tell.
+        """
+        now = time.monotonic()
+        for url_idx, url in urls.items():
+            node = self.get_node(url)
+            if node.refreshing or (
+                node.loaded_models_at is not None
+                and now - node.loaded_models_at < self.loaded_models_ttl
+            ):
+                continue
+
+            node.refreshing = True
+            task = asyncio.create_task(
+                self._refresh_loaded_models(node, get_loaded_models(url_idx))
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_loaded_models(
+        self, node: OllamaNode, loaded_models: Awaitable[Optional[list[str]]]
+    ):
+        try:
+            models = await loaded_models
+            if models is not None:
+                node.loaded_models = set(models)
+        except Exception as e:
+            log.debug(f"Failed to get the loaded models of {node.url}: {e}")
+        finally:
+            node.loaded_models_at = time.monotonic()
+            node.refreshing = False
+
+    def select(
+        self, model: str, urls: dict[int, str], chat_id: Optional[str] = None
+    ) -> int:
+        """Pick the url_idx of the node to send a request for `model` to."""
+        now = time.monotonic()
+        nodes = {url_idx: self.get_node(url) for url_idx, url in urls.items()}
+
+        # If every node is ejected, try them anyway rather than failing
+        candidates = {
+            url_idx: node for url_idx, node in nodes.items() if not node.is_ejected(now)
+        } or nodes
+
+        url_idx = None
+        affinity_key = (chat_id, model) if chat_id and self.enable_affinity else None
+        if affinity_key:
+            affinity_url = self._affinity.get(affinity_key)
+            url_idx = next(
+                (
+                    url_idx
+                    for url_idx, node in candidates.items()
+                    if node.url == affinity_url
+                ),
+                None,
+            )
+
+        if url_idx is None:
+            resident = {
+                url_idx: node
+                for url_idx, node in candidates.items()
+                if model in node.loaded_models
+            }
+            pool = list((resident or candidates).items())
+            if len(pool) > 2:
+                pool = random.sample(pool, 2)
+            else:
+                random.shuffle(pool)
+            url_idx, _ = min(pool, key=lambda item: item[1].in_flight)
+
+        node = nodes[url_idx]
+        # The node loads the model to serve the request
+        node.loaded_models.add(model)
+
+        if affinity_key:
+            self._affinity[affinity_key] = node.url
+            self._affinity.move_to_end(affinity_key)
+            if len(self._affinity) > self.MAX_AFFINITY_ENTRIES:
+                self._affinity.popitem(last=False)
+
+        return url_idx
+
+    def acquire(self, url: str) -> OllamaNodeLease:
+        node = self.get_node(url)
+        node.in_flight += 1
+        return OllamaNodeLease(self, node)
+
+    def _release(self, node: OllamaNode, success: bool):
+        node.in_flight -= 1
+
+        if success:
+            node.failures = 0
+            node.ejected_until = 0.0
+            return
+
+        node.failures += 1
+        if node.failures >= self.failure_threshold:
+            if not node.is_ejected(time.monotonic()):
+                log.warning(
+                    f"Ejecting Ollama node {node.url} for {self.cooldown}s "
+                    f"after {node.failures} consecutive failures"
+                )
+            node.ejected_until = time.monotonic() + self.cooldown
+
+    def get_stats(self) -> dict[str, dict]:
+        now = time.monotonic()
+        return {
+            url: {
+                "in_flight": node.in_flight,
+                "failures": node.failures,
+                "ejected": node.is_ejected(now),
+                "loaded_models": sorted(node.loaded_models),
+            }
+            for url, node in self.nodes.items()
+        }
+
+
+OLLAMA_ROUTER = OllamaRouter()
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import weakref
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_POOL_SIZE,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_base_url(url: str) -> str:
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+class ClientSessionPool:
+    """
+    Keeps one aiohttp session per upstream base URL for the lifetime of the
+    app, so requests to the same Ollama / OpenAI server reuse open (TLS)
+    connections instead of paying the handshake every time.
+
+    Responses from a pooled session must be released, not the session closed,
+    for their connection to go back to the pool. Sessions are bound to the
+    event loop they were created in, so every loop gets its own.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = AIOHTTP_CLIENT_POOL_SIZE,
+        keepalive_timeout: float = AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    ):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        # event loop -> base_url -> session
+        self._sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, aiohttp.ClientSession]
+        ] = weakref.WeakKeyDictionary()
+        # base_url -> counters
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def _get_trace_config(self, base_url: str) -> aiohttp.TraceConfig:
+        stats = self.stats.setdefault(
+            base_url,
+            {
+                "requests": 0,
+                "active_requests": 0,
+                "errors": 0,
+                "connections_created": 0,
+                "connections_reused": 0,
+            },
+        )
+
+        async def on_request_start(session, context, params):
+            stats["requests"] += 1
+            stats["active_requests"] += 1
+
+        async def on_request_end(session, context, params):
+            stats["active_requests"] -= 1
+
+        async def on_request_exception(session, context, params):
+            stats["active_requests"] -= 1
+            stats["errors"] += 1
+
+        async def on_connection_create_end(session, context, params):
+            stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            stats["connections_reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """Return the pooled session of the upstream `url` belongs to."""
+        base_url = get_base_url(url)
+        sessions = self._sessions.setdefault(asyncio.get_running_loop(), {})
+
+        session = sessions.get(base_url)
+        if session is not None and not session.closed:
+            return session
+
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            ),
+            trust_env=True,
+            trace_configs=[self._get_trace_config(base_url)],
+        )
+        sessions[base_url] = session
+        return session
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        return {base_url: dict(stats) for base_url, stats in self.stats.items()}
+
+    async def close(self):
+        current_loop = asyncio.get_running_loop()
+        for loop, sessions in list(self._sessions.items()):
+            for base_url, session in sessions.items():
+                if session.closed:
+                    continue
+                try:
+                    if loop is current_loop:
+                        await session.close()
+                    elif loop.is_running():
+                        await asyncio.wrap_future(
+                            asyncio.run_coroutine_threadsafe(session.close(), loop)
+                        )
+                except Exception as e:
+                    log.warning(f"Error closing session of {base_url}: {e}")
+        self._sessions.clear()
+
+
+SESSION_POOL = ClientSessionPool()
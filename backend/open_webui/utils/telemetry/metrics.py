@@ -8,8 +8,14 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* webui.upstream.requests, webui.upstream.errors (counters)
+* webui.upstream.requests.active (gauge)
+* webui.upstream.connections.created, webui.upstream.connections.reused
+  (counters)
+* webui.embedding_cache.hits, webui.embedding_cache.misses (counters)
 
-Attributes used: http.method, http.route, http.status_code
+Attributes used: http.method, http.route, http.status_code, upstream (the base
+URL of the Ollama / OpenAI connection)
 
 If you wish to add more attributes (e.g. user-agent) you can, but beware of
 high-cardinality label sets.
@@ -36,6 +42,9 @@ from open_webui.env import OTEL_SERVICE_NAME, OTEL_EXPORTER_OTLP_ENDPOINT
 
 from open_webui.socket.main import get_active_user_ids
 from open_webui.models.users import Users
+from open_webui.utils.session_pool import SESSION_POOL
+from open_webui.utils.ollama_router import OLLAMA_ROUTER
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -127,6 +136,88 @@ def setup_metrics(app: FastAPI) -> None:
         callbacks=[observe_active_users],
     )
 
+    # Connection pool of the Ollama / OpenAI connections, per upstream
+    def observe_upstream(key: str):
+        def callback(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [
+                metrics.Observation(value=stats[key], attributes={"upstream": url})
+                for url, stats in SESSION_POOL.get_stats().items()
+            ]
+
+        return callback
+
+    for name, key, description in [
+        ("webui.upstream.requests", "requests", "Requests sent to the upstream"),
+        ("webui.upstream.errors", "errors", "Failed requests to the upstream"),
+        (
+            "webui.upstream.connections.created",
+            "connections_created",
+            "Connections opened to the upstream",
+        ),
+        (
+            "webui.upstream.connections.reused",
+            "connections_reused",
+            "Requests sent over a pooled keep-alive connection",
+        ),
+    ]:
+        meter.create_observable_counter(
+            name=name,
+            description=description,
+            unit="1",
+            callbacks=[observe_upstream(key)],
+        )
+
+    meter.create_observable_gauge(
+        name="webui.upstream.requests.active",
+        description="Requests to the upstream waiting for a response",
+        unit="1",
+        callbacks=[observe_upstream("active_requests")],
+    )
+
+    # Load and health of the Ollama nodes, as seen by the request router
+    def observe_ollama_nodes(key: str):
+        def callback(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [
+                metrics.Observation(value=int(stats[key]), attributes={"node": url})
+                for url, stats in OLLAMA_ROUTER.get_stats().items()
+            ]
+
+        return callback
+
+    meter.create_observable_gauge(
+        name="webui.ollama.requests.in_flight",
+        description="Requests in flight to the Ollama node",
+        unit="1",
+        callbacks=[observe_ollama_nodes("in_flight")],
+    )
+
+    meter.create_observable_gauge(
+        name="webui.ollama.ejected",
+        description="Whether the Ollama node is ejected by its circuit breaker",
+        unit="1",
+        callbacks=[observe_ollama_nodes("ejected")],
+    )
+
+    if EMBEDDING_CACHE is not None:
+        for name, description in [
+            ("hits", "Embeddings served from the embedding cache"),
+            ("misses", "Embeddings that were not cached yet"),
+        ]:
+            meter.create_observable_counter(
+                name=f"webui.embedding_cache.{name}",
+                description=description,
+                unit="1",
+                callbacks=[
+                    lambda options, name=name: [
+                        metrics.Observation(value=getattr(EMBEDDING_CACHE, name))
+                    ]
+                ],
+            )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
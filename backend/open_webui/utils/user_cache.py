@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.redis import get_redis_connection
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class UserCache:
+    """
+    Caches users by id, and the id of the user of each API key, for `ttl`
+    seconds.
+
+    Writes that change a user call `invalidate`. With Redis, the invalidation
+    is also published on a channel and applied by a listener thread in every
+    other process. Every invalidation starts a new `generation`; a user loaded
+    before it may be stale, so `set` skips it.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(
+        self,
+        ttl: float,
+        redis_url: Optional[str] = None,
+        redis_sentinels=[],
+        redis_key_prefix: str = "open-webui",
+    ):
+        self.ttl = ttl
+        self._users: dict[str, tuple[float, Any]] = {}
+        self._api_keys: dict[str, str] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self._redis = None
+        self._channel = f"{redis_key_prefix}:user_cache:_channel"
+        if ttl > 0 and redis_url:
+            self._redis = get_redis_connection(
+                redis_url, redis_sentinels, decode_responses=True
+            )
+            threading.Thread(
+                target=self._listen, name="user-cache-listener", daemon=True
+            ).start()
+
+    def get(self, user_id: str) -> Optional[Any]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            self._users.pop(user_id, None)
+            return None
+        return user
+
+    def get_by_api_key(self, api_key: str) -> Optional[Any]:
+        user_id = self._api_keys.get(api_key)
+        if user_id is None:
+            return None
+
+        user = self.get(user_id)
+        # The key may have been regenerated since it was cached
+        if user is None or user.api_key != api_key:
+            self._api_keys.pop(api_key, None)
+            return None
+        return user
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, user, generation: Optional[int] = None) -> None:
+        """
+        Cache a user. `generation` is the generation read before the user was
+        loaded: if it changed meanwhile, the user may be stale and is skipped.
+        """
+        if self.ttl <= 0 or user is None:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if len(self._users) >= self.MAX_ENTRIES:
+                self._users.clear()
+                self._api_keys.clear()
+
+            self._users[user.id] = (time.monotonic() + self.ttl, user)
+            if user.api_key:
+                self._api_keys[user.api_key] = user.id
+
+    def _drop(self, user_id: Optional[str]) -> None:
+        with self._lock:
+            self._generation += 1
+
+            if user_id is None:
+                self._users.clear()
+                self._api_keys.clear()
+                return
+
+            entry = self._users.pop(user_id, None)
+            if entry is not None and entry[1].api_key:
+                self._api_keys.pop(entry[1].api_key, None)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop a user, or every user if no id is given, in all processes."""
+        self._drop(user_id)
+
+        if self._redis is not None:
+            try:
+                self._redis.publish(self._channel, json.dumps({"user_id": user_id}))
+            except Exception as e:
+                log.error(f"Error publishing user cache invalidation: {e}")
+
+    def _listen(self):
+        pubsub = None
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+
+                # Invalidations published while not subscribed are lost
+                self._drop(None)
+
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._drop(json.loads(message["data"]).get("user_id"))
+            except Exception as e:
+                log.warning(f"User cache listener error, reconnecting: {e}")
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                time.sleep(1)
+
+
+class LastActiveWriter:
+    """
+    Coalesces last_active_at updates. A user is written at most once per
+    `interval` seconds, and all pending users are written together by
+    `periodic_flush` with one timestamp.
+    """
+
+    def __init__(self, interval: float, write: Callable[[list[str], int], Any]):
+        self.interval = interval
+        self.write = write
+        self._pending: set[str] = set()
+        self._touched_at: dict[str, float] = {}
+
+    def touch(self, user_id: str) -> None:
+        now = time.monotonic()
+        if now - self._touched_at.get(user_id, float("-inf")) < self.interval:
+            return
+
+        self._touched_at[user_id] = now
+        self._pending.add(user_id)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        user_ids, self._pending = self._pending, set()
+        try:
+            self.write(list(user_ids), int(time.time()))
+        except Exception as e:
+            log.exception(f"Error updating last active time of users: {e}")
+
+        # Forget users that were not active within the last interval
+        now = time.monotonic()
+        for user_id, touched_at in list(self._touched_at.items()):
+            if now - touched_at >= self.interval:
+                self._touched_at.pop(user_id, None)
+
+    async def periodic_flush(self):
+        try:
+            while True:
+                await asyncio.sleep(max(self.interval, 1))
+                await asyncio.to_thread(self.flush)
+        except asyncio.CancelledError:
+            self.flush()
+            raise